@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    allocation.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Allocation of a new park to a vehicle.
+
+A strategy is a feasibility predicate of the ParkingIndex plus a candidate
+ordering, which tells in which groups of areas the park is looked for given
+the group of the area the vehicle is going to. The AllocationEngine computes
+the candidate groups of every (strategy, area) pair once, so a call only costs
+one ParkingIndex query and, on success, one replaceStop.
+"""
+
+from __future__ import absolute_import
+
+from coordinatorLog import Lazy, allocationLog
+
+
+# Candidate orderings: function (origin group, groups of the strategy) -> groups to look at, in order
+def sameGroupFirst(origin, groupNames):
+    if origin in groupNames:
+        return (origin,) + tuple(name for name in groupNames if name != origin)
+    return tuple(groupNames)
+
+
+def inOrder(origin, groupNames):
+    return tuple(groupNames)
+
+
+class Strategy(object):
+    __slots__ = ("predicate", "ordering", "groupNames", "checkStops")
+
+    # predicate: name of a parkingIndex predicate
+    # checkStops: give up when the vehicle does not have stops anymore
+    def __init__(self, predicate, ordering, groupNames, checkStops=True):
+        self.predicate = predicate
+        self.ordering = ordering
+        self.groupNames = tuple(groupNames)
+        self.checkStops = checkStops
+
+
+class AllocationEngine(object):
+
+    def __init__(self, index, snapshot, strategies):
+        self.index = index
+        self.snapshot = snapshot
+        self.strategies = dict(strategies)
+        for name, strategy in self.strategies.items():
+            if strategy.predicate not in index.predicates:
+                raise ValueError("Strategy '%s' uses the unknown predicate '%s'" % (name, strategy.predicate))
+        self.candidates = {}  # (strategy, park area) -> groups to look at
+        for name, strategy in self.strategies.items():
+            for parkArea in index.areas:
+                origin = index.group[index.position[parkArea]]
+                self.candidates[(name, parkArea)] = strategy.ordering(origin, strategy.groupNames)
+
+    # Function to get the groups where strategy name looks for a park for a vehicle going to parkArea
+    def candidateGroups(self, name, parkArea):
+        groupNames = self.candidates.get((name, parkArea))
+        if groupNames is None:
+            strategy = self.strategies[name]
+            groupNames = strategy.ordering(None, strategy.groupNames)
+        return groupNames
+
+    # Function to send the vehicle to the park chosen by the strategy, it returns "End" if there is none
+    def allocate(self, name, idVehicle, parkArea, duration, stopPos):
+        strategy = self.strategies[name]
+        if strategy.checkStops:
+            contStops = len(list(self.snapshot.getStops(idVehicle)))
+            allocationLog.debug("Stops: %s", Lazy(self.snapshot.getStops, idVehicle))
+            # In case the vehicle does not have stops
+            if contStops < 1:
+                return "End"
+
+        newParkArea = self.index.first(strategy.predicate, self.candidateGroups(name, parkArea))
+        if newParkArea is None:
+            return "End"
+        allocationLog.debug("Changing park...")
+        self.snapshot.replaceStop(idVehicle, stopPos, newParkArea, duration)
+        return newParkArea
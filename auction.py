@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    auction.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Sealed-bid auction of the reservations of the parking areas.
+
+During a step the vehicles that want a reservation submit one bid (a price
+per SLOT_DURATION of park) for their area. At the end of the step every area
+sells the reservations it has left to the highest bids not below the reserve
+price, all the areas being cleared together by clearAuction with NumPy.
+Winners of an area pay the same price:
+    uniform: the lowest accepted bid when the area is contended
+    second: the highest rejected bid when the area is contended
+and the reserve price otherwise. Requires NumPy.
+"""
+
+from __future__ import absolute_import
+
+import numpy as np
+
+RULES = ("uniform", "second")
+
+
+# Function to clear the auctions of all the areas at once
+# areas: area of each bid, bids: amount of each bid, slots: reservations for sale in each area
+# It returns, for each bid, if it won and the price its area is sold at
+def clearAuction(areas, bids, slots, reservePrice, rule="uniform"):
+    areas = np.asarray(areas, dtype=np.int64)
+    bids = np.asarray(bids, dtype=np.float64)
+    slots = np.asarray(slots, dtype=np.int64)
+    if rule not in RULES:
+        raise ValueError("Unknown auction rule '%s', use one of %s" % (rule, ", ".join(RULES)))
+
+    # Bids sorted by area, then from the highest one
+    order = np.lexsort((-bids, areas))
+    sortedAreas = areas[order]
+    sortedBids = bids[order]
+    areaStart = np.searchsorted(sortedAreas, np.arange(len(slots)))
+    rank = np.arange(len(bids)) - areaStart[sortedAreas]
+
+    eligible = np.bincount(areas[bids >= reservePrice], minlength=len(slots))
+    winners = np.minimum(slots, eligible)
+    contended = (eligible > slots) & (slots > 0)
+    if rule == "uniform":
+        pricePos = areaStart + slots - 1
+    else:
+        pricePos = areaStart + slots
+    pricePos = np.clip(pricePos, 0, max(len(bids) - 1, 0))
+    prices = np.where(contended, sortedBids[pricePos], reservePrice)
+    prices = np.maximum(prices, reservePrice)
+
+    won = np.empty(len(bids), dtype=bool)
+    won[order] = rank < winners[sortedAreas]
+    return won, prices[areas]
+
+
+class SealedBidAuction(object):
+
+    # index: ParkingIndex telling how many reservations each area has left
+    def __init__(self, index, reservePrice, rule="uniform"):
+        if rule not in RULES:
+            raise ValueError("Unknown auction rule '%s', use one of %s" % (rule, ", ".join(RULES)))
+        self.index = index
+        self.reservePrice = reservePrice
+        self.rule = rule
+        self.keys = []
+        self.areas = []
+        self.bids = []
+
+    def __len__(self):
+        return len(self.bids)
+
+    def bid(self, key, parkArea, amount):
+        self.keys.append(key)
+        self.areas.append(self.index.position[parkArea])
+        self.bids.append(amount)
+
+    # Function to sell the reservations, it returns (key, park area, won, price) for each bid
+    def clear(self):
+        keys, areas, bids = self.keys, self.areas, self.bids
+        self.keys, self.areas, self.bids = [], [], []
+        if not bids:
+            return []
+
+        index = self.index
+        reservations = np.array([index.getReservations(parkArea) for parkArea in index.areas], dtype=np.int64)
+        slots = np.maximum(np.array(index.capacity, dtype=np.int64) - np.array(index.threshold, dtype=np.int64)
+                           - reservations, 0)
+        won, prices = clearAuction(areas, bids, slots, self.reservePrice, self.rule)
+        return [(key, index.areas[area], bool(win), float(price))
+                for key, area, win, price in zip(keys, areas, won, prices)]
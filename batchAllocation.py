@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    batchAllocation.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Allocation of a new park to all the vehicles that need one in a step at once.
+
+During the step the vehicles are only collected; solve() then assigns them
+greedily by priority (review stars, then arrival order) over a cost matrix
+whose rows are the vehicles and whose columns are the parking areas. The cost
+of an area is its rank in the candidate ordering of the strategy of the
+vehicle, followed by the areas of the fallback strategy; areas that do not
+satisfy the predicate with the reservations already assigned in the batch are
+skipped. Requires NumPy.
+"""
+
+from __future__ import absolute_import
+
+import numpy as np
+
+from coordinatorLog import Lazy, allocationLog
+
+
+class BatchRequest(object):
+    __slots__ = ("key", "idVehicle", "strategy", "parkArea", "duration", "stopPos", "priority", "failed")
+
+    def __init__(self, key, idVehicle, strategy, parkArea, duration, stopPos, priority):
+        self.key = key  # Returned as it is with the decision
+        self.idVehicle = idVehicle
+        self.strategy = strategy
+        self.parkArea = parkArea
+        self.duration = duration
+        self.stopPos = stopPos
+        self.priority = priority
+        self.failed = False  # The strategy of the vehicle was skipped
+
+
+class BatchAllocator(object):
+
+    # engine: AllocationEngine whose strategies and candidate groups are used
+    # fallback: strategy used when the strategy of a vehicle does not find a park
+    def __init__(self, engine, fallback="outOfTown"):
+        self.engine = engine
+        self.index = engine.index
+        self.fallback = fallback
+        self.fallbackGroups = set(engine.strategies[fallback].groupNames)
+        self.columns = list(self.index.areas)
+        self.capacity = np.array(self.index.capacity, dtype=np.int64)
+        self.requests = []
+        self.rows = {}  # (strategy, park area) -> (cost row, [(predicate, columns)])
+
+    def __len__(self):
+        return len(self.requests)
+
+    # Function to compute the cost row of a vehicle going to parkArea with strategy name
+    def _row(self, name, parkArea):
+        row = self.rows.get((name, parkArea))
+        if row is not None:
+            return row
+        cost = np.full(len(self.columns), np.inf)
+        masks = []
+        rank = 0
+        steps = [name] if name == self.fallback else [name, self.fallback]
+        for step in steps:
+            strategy = self.engine.strategies[step]
+            mask = np.zeros(len(self.columns), dtype=bool)
+            for groupName in self.engine.candidateGroups(step, parkArea):
+                for area in self.index.groupAreas[groupName]:
+                    column = self.index.position[area]
+                    if cost[column] == np.inf:
+                        cost[column] = rank
+                        mask[column] = True
+                        rank += 1
+            masks.append((strategy.predicate, mask))
+        row = (cost, masks)
+        self.rows[(name, parkArea)] = row
+        return row
+
+    # Function to add a vehicle to the batch, vehicles going to a fallback area only look there
+    def request(self, key, idVehicle, strategy, parkArea, duration, stopPos, priority=0):
+        request = BatchRequest(key, idVehicle, strategy, parkArea, duration, stopPos, priority)
+        if parkArea in self.index and self.index.group[self.index.position[parkArea]] in self.fallbackGroups:
+            request.strategy = self.fallback
+        elif self.engine.strategies[strategy].checkStops:
+            # In case the vehicle does not have stops only the fallback is left
+            allocationLog.debug("Stops: %s", Lazy(self.engine.snapshot.getStops, idVehicle))
+            if len(list(self.engine.snapshot.getStops(idVehicle))) < 1:
+                request.strategy = self.fallback
+                request.failed = True
+        self.requests.append(request)
+
+    # Function to assign the parks of every collected vehicle
+    # It returns (key, old park, new park or "End", True if the strategy failed and the fallback was used)
+    def solve(self):
+        requests = self.requests
+        self.requests = []
+        if not requests:
+            return []
+
+        index = self.index
+        if index.occupancyStale:
+            index.refreshOccupancy()
+        reservations = np.array([index.getReservations(area) for area in self.columns], dtype=np.int64)
+        threshold = np.array(index.threshold, dtype=np.int64)
+        occupancy = np.array(index.occupancy, dtype=np.int64)
+        predicates = index.predicates
+        feasible = dict((name, np.asarray(test(reservations, threshold, occupancy, self.capacity), dtype=bool))
+                        for name, test in predicates.items())
+
+        def updateColumn(column):
+            for name, test in predicates.items():
+                feasible[name][column] = test(reservations[column], threshold[column], occupancy[column],
+                                              self.capacity[column])
+
+        decisions = []
+        priorities = np.array([request.priority for request in requests])
+        for pos in np.argsort(-priorities, kind="stable"):
+            request = requests[pos]
+            cost, masks = self._row(request.strategy, request.parkArea)
+            allowed = np.zeros(len(self.columns), dtype=bool)
+            for predicate, mask in masks:
+                allowed |= mask & feasible[predicate]
+            column = int(np.argmin(np.where(allowed, cost, np.inf)))
+            strategyFailed = request.failed or (request.strategy != self.fallback
+                                                and not (allowed[column] and masks[0][1][column]))
+            if not allowed[column]:
+                decisions.append((request.key, request.parkArea, "End", strategyFailed))
+                continue
+
+            newParkArea = self.columns[column]
+            reservations[column] += 1
+            updateColumn(column)
+            if request.parkArea in index:
+                oldColumn = index.position[request.parkArea]
+                reservations[oldColumn] -= 1
+                updateColumn(oldColumn)
+            allocationLog.debug("Changing park...")
+            self.engine.snapshot.replaceStop(request.idVehicle, request.stopPos, newParkArea, request.duration)
+            decisions.append((request.key, request.parkArea, newParkArea, strategyFailed))
+        return decisions
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    areaScaling.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Measures the time the coordinator spends in each simulation step while the
+number of parking areas grows.
+
+For every number of districts a scenario is built in a temporary directory and
+run with the stand-in simulator, the fleet staying the same. The time between
+the end of a simulation step and the start of the next one is the time of the
+coordinator.
+
+    python3 benchmarks/areaScaling.py --districts 2,8,32,128 --double-rows 4
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import time
+import optparse
+import tempfile
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner  # noqa
+import fakeTraci  # noqa
+from data.config import Config  # noqa
+from data import buildScenario  # noqa
+
+COLUMNS = ["districts", "areas", "slots", "steps", "meanMs", "p50Ms", "p99Ms", "maxMs", "seconds"]
+
+
+class TimedFakeTraci(fakeTraci.FakeTraci):
+    """Stand-in simulator keeping the time the coordinator spends between two simulation steps."""
+
+    def __init__(self):
+        super(TimedFakeTraci, self).__init__()
+        self.stepTimes = []
+        self.stepEnd = None
+
+    def simulationStep(self, step=0.):
+        start = time.perf_counter()
+        if self.stepEnd is not None:
+            self.stepTimes.append(start - self.stepEnd)
+        super(TimedFakeTraci, self).simulationStep(step)
+        self.stepEnd = time.perf_counter()
+
+
+def percentile(values, fraction):
+    return values[int(round(fraction * (len(values) - 1)))]
+
+
+# Function to build and run the scenario of config, it returns one row of the table
+def measure(config, options):
+    with tempfile.TemporaryDirectory() as directory:
+        buildScenario.build(config, directory, netconvert=False)
+        backend = TimedFakeTraci()
+        runner.useBackend(backend)
+        backend.start(["sumo", "-c", os.path.join(directory, config.sumoConfigFile)])
+        start = time.perf_counter()
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                runner.run(config, options.subscribe, options.strategy, scenarioDir=directory)
+        finally:
+            backend.close()
+        seconds = time.perf_counter() - start
+
+    stepTimes = sorted(backend.stepTimes)
+    areas = len(runner.parking.areas)
+    return {
+        "districts": config.districts,
+        "areas": areas,
+        "slots": areas * config.slotsPerRow,
+        "steps": len(stepTimes),
+        "meanMs": "%.3f" % (1000 * sum(stepTimes) / len(stepTimes)),
+        "p50Ms": "%.3f" % (1000 * percentile(stepTimes, 0.5)),
+        "p99Ms": "%.3f" % (1000 * percentile(stepTimes, 0.99)),
+        "maxMs": "%.3f" % (1000 * stepTimes[-1]),
+        "seconds": "%.1f" % seconds,
+    }
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--districts", default="2,8,32,128",
+                         help="values of DISTRICTS, default: %default")
+    optParser.add_option("--double-rows", dest="doubleRows", type="int", default=4,
+                         help="rows of each district, default: %default")
+    optParser.add_option("--strategy", default="free", choices=runner.STRATEGY_NAMES,
+                         help="strategy used when the park of a vehicle is full, default: %default")
+    optParser.add_option("--subscribe", action="store_true",
+                         default=False, help="read the vehicles' stops and stop state through subscriptions")
+    optParser.add_option("--config", dest="config",
+                         help="JSON file with the settings that differ from data/constants.py")
+    optParser.add_option("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                         help="change a setting of every run, e.g. --set NUMBER_GOOD_VEHICLES=400 (can be repeated)")
+    options, args = optParser.parse_args()
+    return options
+
+
+if __name__ == "__main__":
+    options = get_options()
+    try:
+        baseConfig = Config.load(options.config, options.settings)
+    except (OSError, TypeError, ValueError) as e:
+        sys.exit("Invalid configuration: %s" % e)
+
+    rows = []
+    for districts in [int(value) for value in options.districts.split(",") if value.strip()]:
+        rows.append(measure(baseConfig.replace(districts=districts, doubleRows=options.doubleRows), options))
+        print("  ".join("%s=%s" % (column, rows[-1][column]) for column in COLUMNS), file=sys.stderr)
+
+    widths = [max(len(column), max(len(str(row[column])) for row in rows)) for column in COLUMNS]
+    print("  ".join(column.rjust(width) for column, width in zip(COLUMNS, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).rjust(width) for column, width in zip(COLUMNS, widths)))
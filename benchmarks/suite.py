@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    suite.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Benchmarks of the coordinator.
+
+micro: the park search strategies (reservation, free, occupancy and outOfTown,
+the old changeReservation, goToFreePark, changePark and goToNoSystemPark),
+checkWallet and systemCharge against synthetic lots: empty, busy (seeded
+random occupancy and reservations) and full.
+
+macro: run() from start to end on the stand-in simulator for every demand
+file in data, each in a new process so that its peak RSS is its own: steps
+per second, decisions (a running vehicle looked at in a step) per second and
+peak RSS.
+
+Every benchmark gives one record with the same columns, appended with
+runResults to a .jsonl or .csv file. --compare prints the change against
+the records of an older file.
+
+    python3 benchmarks/suite.py --output bench.jsonl
+    python3 benchmarks/suite.py --compare bench.jsonl
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import re
+import sys
+import glob
+import time
+import random
+import timeit
+import optparse
+import resource
+import platform
+import contextlib
+import multiprocessing
+import concurrent.futures
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import runner  # noqa
+import fakeTraci  # noqa
+import runResults  # noqa
+from allocation import AllocationEngine  # noqa
+from vehicleAttributes import AttributeCache  # noqa
+from data.config import Config  # noqa
+
+COLUMNS = ["suite", "name", "nsPerOp", "opsPerSecond", "steps", "stepsPerSecond", "decisions",
+           "decisionsPerSecond", "peakRssMb", "seconds"]
+LOTS = ("empty", "busy", "full")
+VEHICLES = 1000
+
+
+class SyntheticLot(object):
+    """Snapshot of vehicles that all have two stops left, with the occupancy of the lot given."""
+
+    def __init__(self, occupancy):
+        self.occupancy = occupancy
+        self.stops = [fakeTraci.StopData("ParkArea0", 100), fakeTraci.StopData("ParkArea1", 100)]
+
+    def getStops(self, idVehicle):
+        return self.stops
+
+    def getVehicleCount(self, parkArea):
+        return self.occupancy.get(parkArea, 0)
+
+    def replaceStop(self, idVehicle, stopPos, parkArea, duration):
+        pass
+
+
+# Function to build the parking index and the allocation engine of config with a lot in state lot
+def buildLot(config, lot, seed=42):
+    rng = random.Random(seed)
+    occupancy = {}
+    runner.snapshot = SyntheticLot(occupancy)
+    parking = runner.buildParkingIndex(config)
+    town = [parkArea for parkArea, group in zip(parking.areas, parking.group) if group in config.districtNames]
+    for parkArea in parking.areas:
+        if lot == "full" and parkArea in town:
+            occupancy[parkArea] = config.slotsPerRow
+            parking.addReservation(parkArea, config.slotsPerRow)
+        elif lot == "busy":
+            occupancy[parkArea] = rng.randint(0, config.slotsPerRow)
+            parking.addReservation(parkArea, rng.randint(0, config.slotsPerRow))
+            if rng.random() < 0.3:
+                parking.addFreePark(parkArea, config.initialConstantFreeParks)
+    parking.newStep(config.timeInitialConstantFreeParks + 1)
+    parking.refreshOccupancy()
+    return parking, AllocationEngine(parking, runner.snapshot, runner.buildStrategies(config)), town
+
+
+def buildAttributes(seed=42):
+    rng = random.Random(seed)
+    attributes = AttributeCache()
+    for vehicle in range(VEHICLES):
+        attributes.add(str(vehicle), {"reviewStars": str(rng.randint(0, 5)), "wallet": str(rng.randint(0, 5000)),
+                                      "delay": str(rng.choice((0, 0, 0, 10)))})
+    return attributes
+
+
+# Function to get the best time of one call of function over some rounds of at least 0.2 s. When function
+# changes what it reads, setup restores it before every call, which is then timed alone
+def timeCall(function, repeat, setup=None):
+    if setup is None:
+        timer = timeit.Timer(function)
+        number = timer.autorange()[0]
+    else:
+        timer = timeit.Timer(function, setup)
+        number = 1
+        repeat = repeat * 100
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {"nsPerOp": round(best * 1e9, 1), "opsPerSecond": round(1 / best)}
+
+
+def microBenchmarks(config, options):
+    rows = []
+    for lot in LOTS:
+        parking, allocation, town = buildLot(config, lot)
+        origins = [town[pos % len(town)] for pos in range(VEHICLES)]
+        for name in runner.STRATEGY_NAMES:
+            def allocateAll(name=name):
+                for parkArea in origins:
+                    allocation.allocate(name, "0", parkArea, 100, 0)
+            row = timeCall(allocateAll, options.repeat)
+            row["nsPerOp"] = round(row["nsPerOp"] / len(origins), 1)
+            row["opsPerSecond"] = row["opsPerSecond"] * len(origins)
+            rows.append(dict(row, suite="micro", name="allocate.%s/%s" % (name, lot)))
+
+    vehicles = [str(vehicle) for vehicle in range(VEHICLES)]
+
+    # systemCharge changes the reputation of the vehicles
+    def resetAttributes():
+        runner.attributes = buildAttributes()
+
+    def checkWallets():
+        for idVehicle in vehicles:
+            runner.checkWallet(config, 100, idVehicle)
+
+    def systemCharges():
+        for idVehicle in vehicles:
+            runner.systemCharge(idVehicle)
+
+    resetAttributes()
+    for name, function, setup in (("checkWallet", checkWallets, None),
+                                  ("systemCharge", systemCharges, resetAttributes)):
+        row = timeCall(function, options.repeat, setup)
+        rows.append({"suite": "micro", "name": name, "nsPerOp": round(row["nsPerOp"] / VEHICLES, 1),
+                     "opsPerSecond": row["opsPerSecond"] * VEHICLES})
+    return rows
+
+
+class CountingFakeTraci(fakeTraci.FakeTraci):
+    """Stand-in simulator counting the vehicles the coordinator looks at in each step."""
+
+    def __init__(self):
+        super(CountingFakeTraci, self).__init__()
+        self.decisions = 0
+        getIDList = self.vehicle.getIDList
+
+        def countedIDList():
+            idList = getIDList()
+            self.decisions += len(idList)
+            return idList
+        self.vehicle.getIDList = countedIDList
+
+
+# Function to run one demand file, it is called in a new process
+def macroBenchmark(config):
+    os.chdir(ROOT)
+    backend = CountingFakeTraci()
+    runner.useBackend(backend)
+    backend.start(["sumo", "-c", os.path.join("data", config.sumoConfigFile)])
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = runner.run(config)
+    finally:
+        backend.close()
+    seconds = time.perf_counter() - start
+    # Kilobytes on Linux, bytes on macOS
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+    return {
+        "suite": "macro",
+        "name": os.path.splitext(os.path.splitext(config.demandFile)[0])[0],
+        "steps": results["steps"],
+        "stepsPerSecond": round(results["steps"] / seconds, 1),
+        "decisions": backend.decisions,
+        "decisionsPerSecond": round(backend.decisions / seconds),
+        "peakRssMb": round(peakRss, 1),
+        "seconds": round(seconds, 3),
+    }
+
+
+def macroBenchmarks(baseConfig, options):
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    populations = []
+    for fileName in glob.glob(os.path.join(ROOT, "data", "%s_demand*.rou.xml" % baseConfig.prefix)):
+        match = re.search(r"_demand(\d+)\.rou\.xml$", fileName)
+        if match is not None:
+            populations.append(int(match.group(1)))
+    for population in sorted(populations):
+        if options.demands and population not in options.demands:
+            continue
+        config = baseConfig.replace(randomPopulation=population)
+        if not os.path.exists(os.path.join(ROOT, "data", config.sumoConfigFile)):
+            continue
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            rows.append(pool.submit(macroBenchmark, config).result())
+        print("%(name)s: %(stepsPerSecond)s steps/s, %(decisionsPerSecond)s decisions/s, %(peakRssMb)s MB" % rows[-1],
+              file=sys.stderr)
+    return rows
+
+
+def formatValue(value):
+    return "-" if value is None else str(value)
+
+
+def printTable(rows, baseline):
+    columns = COLUMNS + (["change"] if baseline else [])
+    table = []
+    for row in rows:
+        cells = [formatValue(row.get(column)) for column in COLUMNS]
+        if baseline:
+            old = baseline.get((row["suite"], row["name"]))
+            # Change of the main throughput: operations per second or steps per second
+            key = "opsPerSecond" if row["suite"] == "micro" else "stepsPerSecond"
+            change = "-"
+            if old is not None and old.get(key):
+                change = "%+.1f%%" % (100. * (row[key] - old[key]) / old[key])
+            cells.append(change)
+        table.append(cells)
+    widths = [max(len(column), max(len(cells[pos]) for cells in table)) for pos, column in enumerate(columns)]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for cells in table:
+        print("  ".join(cell.rjust(width) for cell, width in zip(cells, widths)))
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--suite", default="micro,macro",
+                         help="benchmarks to run: micro, macro or both, default: %default")
+    optParser.add_option("--demands", default="",
+                         help="values of RANDOM_POPULATION for the macro benchmarks, default: every demand file in data")
+    optParser.add_option("--repeat", type="int", default=5,
+                         help="rounds of each micro benchmark, the best one is kept, default: %default")
+    optParser.add_option("--output",
+                         help="append the records to this file, JSON lines or CSV if it ends with .csv")
+    optParser.add_option("--compare", metavar="FILE",
+                         help="show the change of the throughput against the last records of FILE")
+    optParser.add_option("--config", dest="config",
+                         help="JSON file with the settings that differ from data/constants.py")
+    optParser.add_option("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                         help="change a setting of every benchmark, e.g. --set SLOTS_PER_ROW=12 (can be repeated)")
+    options, args = optParser.parse_args()
+    options.suite = [suite.strip() for suite in options.suite.split(",")]
+    options.demands = [int(value) for value in options.demands.split(",") if value.strip()]
+    return options
+
+
+if __name__ == "__main__":
+    options = get_options()
+    try:
+        baseConfig = Config.load(options.config, options.settings)
+    except (OSError, TypeError, ValueError) as e:
+        sys.exit("Invalid configuration: %s" % e)
+
+    rows = []
+    if "micro" in options.suite:
+        rows += microBenchmarks(baseConfig, options)
+    if "macro" in options.suite:
+        rows += macroBenchmarks(baseConfig, options)
+
+    baseline = {}
+    if options.compare:
+        for record in runResults.loadRecords([options.compare]):
+            baseline[(record.get("suite"), record.get("name"))] = record
+    printTable(rows, baseline)
+
+    if options.output:
+        startTime = round(time.time(), 3)
+        for row in rows:
+            record = dict((column, row.get(column)) for column in COLUMNS)
+            record.update(configHash=baseConfig.configHash, startTime=startTime, python=platform.python_version(),
+                          machine=platform.machine())
+            runResults.appendRecord(options.output, record)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    checkpoint.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Checkpoints of a run: the state of the simulation and the one of the
+coordinator at the end of the same step.
+
+A checkpoint is two files named after the step: stepNNNNNNNN.state.xml,
+written by simulation.saveState of SUMO (or of fakeTraci), and
+stepNNNNNNNN.pkl with the coordinator (schedule, attributes, parking index,
+vehicles, events, counters). The pickle is written last and renamed into
+place, so a checkpoint is complete when its .pkl exists and latest() never
+returns one cut by a crash. Only the newest KEEP checkpoints are kept.
+
+A run is resumed by starting the simulation with sumoOptions(base), which
+loads the saved state with --load-state (loadState through TraCI would insert
+again the vehicles that already arrived), and giving load(base) to
+runner.run. The random number generators and full precision values are saved
+too, so the resumed run gives the same results of a run never stopped.
+"""
+
+from __future__ import absolute_import
+
+import os
+import re
+import glob
+import pickle
+import tempfile
+
+CHECKPOINT_VERSION = 1
+KEEP = 2
+# Options of the simulation for exact checkpoints
+SAVE_OPTIONS = ["--save-state.rng", "--save-state.precision", "17"]
+STEP_PATTERN = re.compile(r"step(\d+)\.pkl$")
+
+
+def baseName(directory, step):
+    return os.path.join(directory, "step%08i" % step)
+
+
+# Function to get the checkpoints of directory, from the oldest: list of (step, base name)
+def listCheckpoints(directory):
+    checkpoints = []
+    for fileName in glob.glob(os.path.join(directory, "step*.pkl")):
+        match = STEP_PATTERN.search(fileName)
+        if match is not None:
+            checkpoints.append((int(match.group(1)), fileName[:-len(".pkl")]))
+    return sorted(checkpoints)
+
+
+# Function to get the base name of the newest checkpoint of directory, None if there is none
+def latest(directory):
+    checkpoints = listCheckpoints(directory) if os.path.isdir(directory) else []
+    return checkpoints[-1][1] if checkpoints else None
+
+
+# Function to save a checkpoint: the simulation through backend, then state, a dict of the coordinator
+def save(directory, step, backend, state, keep=KEEP):
+    os.makedirs(directory, exist_ok=True)
+    base = baseName(directory, step)
+    # SUMO may run in another directory
+    backend.simulation.saveState(os.path.abspath(base + ".state.xml"))
+    state = dict(state, version=CHECKPOINT_VERSION, step=step)
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, base + ".pkl")
+
+    for oldStep, oldBase in listCheckpoints(directory)[:-keep]:
+        for fileName in (oldBase + ".pkl", oldBase + ".state.xml"):
+            if os.path.exists(fileName):
+                os.remove(fileName)
+    return base
+
+
+# Function to get the options of the simulation that saves checkpoints and, with base, starts from one
+def sumoOptions(base=None):
+    if base is None:
+        return list(SAVE_OPTIONS)
+    return SAVE_OPTIONS + ["--load-state", os.path.abspath(base + ".state.xml")]
+
+
+# Function to read the state of the coordinator in a checkpoint, the simulation is started with sumoOptions(base).
+# With configHash the checkpoint must have been taken with the same settings
+def load(base, configHash=None):
+    with open(base + ".pkl", "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError("%s.pkl is a checkpoint of version %s, not %s" % (
+            base, state.get("version"), CHECKPOINT_VERSION))
+    if configHash is not None and state["configHash"] != configHash:
+        raise ValueError("%s.pkl was taken with the settings %s, not %s" % (base, state["configHash"], configHash))
+    return state
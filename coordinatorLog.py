@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    coordinatorLog.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Logging of the parking coordinator.
+
+There is one logger for each category (allocation, billing, reputation and
+step) below the "park" logger, which is silent by default. Messages use
+%-style arguments, so a disabled message only costs a level check; values that
+need a TraCI call to be printed are wrapped in Lazy. When logging is enabled
+records are written by a background thread through a buffered file.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOGGER_NAME = "park"
+CATEGORIES = ("allocation", "billing", "reputation", "step")
+BUFFER_SIZE = 1 << 20
+
+allocationLog = logging.getLogger("%s.allocation" % LOGGER_NAME)
+billingLog = logging.getLogger("%s.billing" % LOGGER_NAME)
+reputationLog = logging.getLogger("%s.reputation" % LOGGER_NAME)
+stepLog = logging.getLogger("%s.step" % LOGGER_NAME)
+
+_rootLog = logging.getLogger(LOGGER_NAME)
+_rootLog.addHandler(logging.NullHandler())
+_rootLog.setLevel(logging.WARNING)
+_rootLog.propagate = False
+
+_listener = None
+
+
+# Value computed only if the message is really written
+class Lazy(object):
+    __slots__ = ("function", "args")
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def __str__(self):
+        return str(self.function(*self.args))
+
+
+# Handler writing through a large file buffer, the file is flushed only when it is closed
+class BufferedFileHandler(logging.Handler):
+
+    def __init__(self, fileName=None, bufferSize=BUFFER_SIZE):
+        logging.Handler.__init__(self)
+        if fileName is None:
+            self.stream = sys.stdout
+        else:
+            self.stream = open(fileName, "w", buffering=bufferSize)
+        self.fileName = fileName
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            self.stream.flush()
+            if self.fileName is not None:
+                self.stream.close()
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
+
+# Function to read levels like "DEBUG" (every category) or "allocation=DEBUG,step=INFO"
+def parseLevels(spec):
+    levels = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" in item:
+            category, level = item.split("=", 1)
+            category = category.strip()
+            if category not in CATEGORIES:
+                raise ValueError("Unknown log category '%s', use one of %s" % (category, ", ".join(CATEGORIES)))
+        else:
+            category, level = None, item
+        levelNumber = logging.getLevelName(level.strip().upper())
+        if not isinstance(levelNumber, int):
+            raise ValueError("Unknown log level '%s'" % level)
+        levels[category] = levelNumber
+    return levels
+
+
+# Function to enable the categories in levels (see parseLevels), records go to logFile or to stdout
+def configure(levels, logFile=None):
+    shutdown()
+    if not levels:
+        return
+    writer = BufferedFileHandler(logFile)
+    writer.setFormatter(logging.Formatter("%(relativeCreated)d %(name)s %(levelname)s %(message)s"))
+    records = queue.SimpleQueue()
+    _rootLog.handlers = [logging.handlers.QueueHandler(records)]
+    global _listener
+    _listener = logging.handlers.QueueListener(records, writer)
+    _listener.start()
+    for category, level in levels.items():
+        if category is None:
+            _rootLog.setLevel(level)
+        else:
+            logging.getLogger("%s.%s" % (LOGGER_NAME, category)).setLevel(level)
+
+
+# Function to write the remaining records and to make the loggers silent again
+def shutdown():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    _rootLog.handlers = [logging.NullHandler()]
+    _rootLog.setLevel(logging.WARNING)
+    for category in CATEGORIES:
+        logging.getLogger("%s.%s" % (LOGGER_NAME, category)).setLevel(logging.NOTSET)
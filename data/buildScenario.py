@@ -19,391 +19,590 @@
 """
 Create the XML input files for the generation of the SUMO network
 of the CityMobil parking lot.
+
+Every file is written by a function taking a Config, so a scenario can also be
+built from other scripts. The trips are produced one at a time by
+generateTrips and written through a ChunkedWriter: the memory used does not
+grow with the number of vehicles. The stops of the trips are drawn in blocks
+as numpy arrays from a Generator seeded with RANDOM_POPULATION.
+
+The network, the parking areas, the demand and the SUMO config are cached by
+a hash of the settings each one depends on: only the pieces not in the cache
+are written again, so netconvert only runs for a new network. sumolib is
+only needed to run netconvert: build(..., netconvert=False) works without SUMO.
+
+    python3 buildScenario.py --set NUMBER_GOOD_VEHICLES=100000 --set NUMBER_BAD_VEHICLES=20000
 """
 
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import division
 
-import math
+import collections
+import hashlib
+import json
 import random
+import shutil
 import subprocess
+import tempfile
+import optparse
 import os
 import sys
 
-from constants import PREFIX, DOUBLE_ROWS, ROW_DIST, SLOTS_PER_ROW, SLOT_WIDTH, PARKAREA_NAMES, RANDOM_POPULATION
-from constants import MIN_DURATION, MAX_DURATION, SLOT_DURATION, NUMBER_BAD_VEHICLES, NUMBER_GOOD_VEHICLES
-
-sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
-import sumolib  # noqa
-
-random.seed(RANDOM_POPULATION)
-# network building
-nodes = open("%s.nod.xml" % PREFIX, "w")
-sumolib.xml.writeHeader(nodes, root="nodes")
-edges = open("%s.edg.xml" % PREFIX, "w")
-sumolib.xml.writeHeader(edges, root="edges")
-
-# Road construction
-# This road leads to the "ParkArea" car park
-nodeID = "main0"
-print('<node id="in" x="-100" y="0"/>', file=nodes)
-print('<edge id="mainin" from="in" to="%s" numLanes="3"/>' % nodeID, file=edges)
-for row in range(DOUBLE_ROWS):
-    nextNodeID = "main%s" % row
-    x = row * ROW_DIST
-    print('<node id="%s" x="%s" y="0"/>' % (nextNodeID, x), file=nodes)
-    if row > 0:
-        print('<edge id="main%sto%s" from="%s" to="%s" numLanes="3"/>' %
-              (row - 1, row, nodeID, nextNodeID), file=edges)
-    nodeID = nextNodeID
-
-# This road leads to the "ParkAreaAlternative" car park
-for row in range(DOUBLE_ROWS):
-    nextNodeID = "mainAlternative%s" % row
-    x = row * ROW_DIST + 100
-    print('<node id="%s" x="%s" y="0"/>' % (nextNodeID, x), file=nodes)
-    if row > 0:
-        print('<edge id="mainAlternative%sto%s" from="%s" to="%s" numLanes="3"/>' %
-              (row - 1, row, nodeID, nextNodeID), file=edges)
-    nodeID = nextNodeID
-
-howManyRows = math.ceil((NUMBER_GOOD_VEHICLES + NUMBER_BAD_VEHICLES) / 20)
-offset = 21
-
-if howManyRows < 4:
-    howManyRows = 4
-else:
-    offset = offset - 14.5 * (howManyRows - 4)
-
-# This road leads to the "ParkOutOfTown" car park
-for row in range(howManyRows):
-    nextNodeID = "mainOutOfTown%s" % row
-    x = row * ROW_DIST + offset
-    print('<node id="%s" x="%s" y="-150"/>' % (nextNodeID, x), file=nodes)
-    if row > 0:
-        print('<edge id="mainOutOfTown%sto%s" from="%s" to="%s" numLanes="3"/>' %
-              (row, row - 1, nextNodeID, nodeID), file=edges)
-    nodeID = nextNodeID
-
-# Another roads that connect the various car parks
-print('<edge id="mainmid" from="main1" to="mainAlternative0" numLanes="3"/>', file=edges)
-print('<node id="out" x="225" y="0"/>', file=nodes)
-print('<edge id="mainout" from="mainAlternative%s" to="out" numLanes="3"/>' % (DOUBLE_ROWS - 1), file=edges)
-
-print('<node id="backin" x="-100" y="-150"/>', file=nodes)
-print('<node id="backout" x="225" y="-150"/>', file=nodes)
-
-print('<edge id="inOutOfTown" from="backout" to="mainOutOfTown%s" numLanes="3"/>' % (DOUBLE_ROWS * 2 - 1), file=edges)
-print('<edge id="outOutOfTown" from="mainOutOfTown0" to="backin" numLanes="3"/>', file=edges)
-
-print('<edge id="turnbackout" from="out" to="backout" numLanes="3"/>', file=edges)
-print('<edge id="turnbackin" from="backin" to="in" numLanes="3"/>', file=edges)
-
-# Roads in the parking area to change lane
-y = (SLOTS_PER_ROW + 3) * SLOT_WIDTH
-print('<node id="cyber" x="-100" y="%s"/>' % y, file=nodes)
-
-# ParkArea
-for row in range(DOUBLE_ROWS):
-    nodeID = "cyber%s" % row
-    x = row * ROW_DIST
-    print('<node id="%s" x="%s" y="%s"/>' % (nodeID, x, y), file=nodes)
-    if row > 0:
-        edgeID = "cyber%sto%s" % (row - 1, row)
-        print("""<edge id="%s" from="cyber%s" to="cyber%s" numLanes="2" spreadType="center">
-            <lane index="0"/>
-            <lane index="1"/>
-        </edge>""" % (edgeID, row - 1, row), file=edges)
-        print("""<edge id="-%s" from="cyber%s" to="cyber%s" numLanes="2" spreadType="center">
-            <lane index="0"/>
-            <lane index="1"/>
-        </edge>""" % (edgeID, row, row - 1), file=edges)
-
-y = (SLOTS_PER_ROW + 3) * SLOT_WIDTH
-print('<node id="cyberAlternative" x="-500" y="%s"/>' % y, file=nodes)
-
-# ParkAreaAlternative
-for row in range(DOUBLE_ROWS):
-    nodeID = "cyberAlternative%s" % row
-    x = row * ROW_DIST + 100
-    print('<node id="%s" x="%s" y="%s"/>' % (nodeID, x, y), file=nodes)
-    if row > 0:
-        edgeID = "cyberAlternative%sto%s" % (row - 1, row)
-        print("""<edge id="%s" from="cyberAlternative%s" to="cyberAlternative%s" numLanes="2" spreadType="center">
-            <lane index="0"/>
-            <lane index="1"/>
-        </edge>""" % (edgeID, row - 1, row), file=edges)
-        print("""<edge id="-%s" from="cyberAlternative%s" to="cyberAlternative%s" numLanes="2" spreadType="center">
-            <lane index="0"/>
-            <lane index="1"/>
-        </edge>""" % (edgeID, row, row - 1), file=edges)
-
-y = (SLOTS_PER_ROW + 3) * SLOT_WIDTH - 150
-print('<node id="cyberOutOfTown" x="-500" y="%s"/>' % y, file=nodes)
-
-# ParkAreaOutOfTown
-for row in range(howManyRows):
-    nodeID = "cyberOutOfTown%s" % row
-    x = row * ROW_DIST + offset
-    print('<node id="%s" x="%s" y="%s"/>' % (nodeID, x, y), file=nodes)
-    if row > 0:
-        edgeID = "cyberOutOfTown%sto%s" % (row - 1, row)
-        print("""<edge id="%s" from="cyberOutOfTown%s" to="cyberOutOfTown%s" numLanes="2" spreadType="center">
-            <lane index="0"/>
-            <lane index="1"/>
-        </edge>""" % (edgeID, row - 1, row), file=edges)
-        print("""<edge id="-%s" from="cyberOutOfTown%s" to="cyberOutOfTown%s" numLanes="2" spreadType="center">
-            <lane index="0"/>
-            <lane index="1"/>
-        </edge>""" % (edgeID, row, row - 1), file=edges)
-
-# Roads in the parking area
-for row in range(DOUBLE_ROWS):
-
-    # ParkArea
-    print("""<edge id="road%s" from="main%s" to="cyber%s" numLanes="3">
-        <lane index="0"/>
-        <lane index="1"/>
-        <lane index="2"/>
-    </edge>""" % (row, row, row), file=edges)
-    print("""<edge id="-road%s" from="cyber%s" to="main%s" numLanes="3">
-        <lane index="0"/>
-        <lane index="1"/>
-        <lane index="2"/>
-    </edge>""" % (row, row, row), file=edges)
-
-    # ParkAreaAlternative
-    print("""<edge id="roadAlternative%s" from="mainAlternative%s" to="cyberAlternative%s" numLanes="3">
-        <lane index="0"/>
-        <lane index="1"/>
-        <lane index="2"/>
-    </edge>""" % (row, row, row), file=edges)
-    print("""<edge id="-roadAlternative%s" from="cyberAlternative%s" to="mainAlternative%s" numLanes="3">
-        <lane index="0"/>
-        <lane index="1"/>
-        <lane index="2"/>
-    </edge>""" % (row, row, row), file=edges)
-
-# ParkAreaOutOfTown
-for row in range(howManyRows):
-    print("""<edge id="roadOutOfTown%s" from="mainOutOfTown%s" to="cyberOutOfTown%s" numLanes="3">
-        <lane index="0"/>
-        <lane index="1"/>
-        <lane index="2"/>
-    </edge>""" % (row, row, row), file=edges)
-    print("""<edge id="-roadOutOfTown%s" from="cyberOutOfTown%s" to="mainOutOfTown%s" numLanes="3">
-        <lane index="0"/>
-        <lane index="1"/>
-        <lane index="2"/>
-    </edge>""" % (row, row, row), file=edges)
+if 'SUMO_HOME' in os.environ:
+    sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from data.config import Config
+except ImportError:
+    from config import Config
+
+# Stops of a trip, every STOPS_IN_A_DAY stops one more is made in "ParkAreaOutOfTown"
+STOPS = 10
+STOPS_IN_A_DAY = 5
+# Seconds between two waves of departures
+DEPART_TIME = 5
+# Trips whose stops are drawn together
+SAMPLE_BLOCK = 4096
+# Characters kept by a ChunkedWriter before writing them to the file
+CHUNK_SIZE = 1 << 16
+# Version of the files written by this script, to be increased when they change so that the files in the
+# cache are not used anymore
+GENERATOR_VERSION = 1
+# Cache of the generated files, they are reused when the settings they depend on are the same
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                         "park-scenarios")
+# Settings each piece of the scenario depends on, derived values included
+NETWORK_SETTINGS = ("prefix", "parkAreaNames", "districts", "doubleRows", "rowDist", "slotsPerRow", "slotWidth",
+                    "outOfTownRows")
+PARKING_SETTINGS = ("prefix", "parkAreaNames", "districts", "doubleRows", "slotsPerRow", "outOfTownRows")
+DEMAND_SETTINGS = ("demandFile", "parkAreaNames", "districts", "doubleRows", "outOfTownRows", "slotsPerRow",
+                   "randomPopulation", "minDuration", "maxDuration", "slotDuration", "numberGoodVehicles",
+                   "numberBadVehicles")
+SUMO_CONFIG_SETTINGS = ("prefix", "demandFile", "sumoConfigFile")
+# Sides of a double row: the parking areas "ParkArea0" and "ParkArea-0" are on the same row
+SIDES = ("", "-")
+
+TRIP = """    <trip id="%s" type="%s" depart="%s" from="mainin" to="%s">
+        <param key="warning" value="0"/>
+        <param key="civil" value="0"/>
+        <param key="reviewStars" value="3"/>
+        <param key="wallet" value="100"/>
+        <param key="goodBehaviour" value="True"/>
+        <param key="delay" value="%i"/>
+%s    </trip>
+"""
+STOP = """        <stop parkingArea="%s" duration="%i"/>
+"""
 
-print("</nodes>", file=nodes)
-nodes.close()
-print("</edges>", file=edges)
-edges.close()
+# side, row, outOfTownRow: where the parking areas of the trip are
+TripPlan = collections.namedtuple("TripPlan", ["id", "type", "depart", "to", "delay", "side", "row", "outOfTownRow"])
+# stops: list of (parking area, duration)
+Trip = collections.namedtuple("Trip", ["id", "type", "depart", "to", "delay", "stops"])
 
-subprocess.call([sumolib.checkBinary('netconvert'),
-                 '-n', '%s.nod.xml' % PREFIX,
-                 '-e', '%s.edg.xml' % PREFIX,
-                 '-o', '%s.net.xml' % PREFIX])
 
-# Parking areas
-stops = open("%s.add.xml" % PREFIX, "w")
-sumolib.xml.writeHeader(stops, root="additional")
+class ChunkedWriter(object):
+    """Text file collecting the strings written to it and writing them in chunks of chunkSize characters."""
 
-# ParkArea construction
-for row in range(DOUBLE_ROWS):
-    print("""    <parkingArea id="ParkArea%s" lane="road%s_1" roadsideCapacity="%s" angle="270" length="8"> 
-    </parkingArea>
-    <parkingArea id="ParkArea-%s" lane="-road%s_1" roadsideCapacity="%s" angle="270" length="8"> 
-    </parkingArea>""" %
-          (row, row, SLOTS_PER_ROW, row, row, SLOTS_PER_ROW), file=stops)
+    def __init__(self, fileName, chunkSize=CHUNK_SIZE):
+        self.file = open(fileName, "w")
+        self.chunkSize = chunkSize
+        self.parts = []
+        self.size = 0
 
-# ParkAreaAlternative construction
-for row in range(DOUBLE_ROWS):
-    print("""    <parkingArea id="ParkAreaAlternative%s" lane="roadAlternative%s_1" roadsideCapacity="%s" angle="270" length="8"> 
-    </parkingArea>
-    <parkingArea id="ParkAreaAlternative-%s" lane="-roadAlternative%s_1" roadsideCapacity="%s" angle="270" length="8"> 
-    </parkingArea>""" %
-          (row, row, SLOTS_PER_ROW, row, row, SLOTS_PER_ROW), file=stops)
+    def __enter__(self):
+        return self
 
-# ParkAreaOutOfTown construction
-for row in range(howManyRows):
-    print("""    <parkingArea id="ParkAreaOutOfTown%s" lane="roadOutOfTown%s_1" roadsideCapacity="%s" angle="270" length="8"> 
-    </parkingArea>
-    <parkingArea id="ParkAreaOutOfTown-%s" lane="-roadOutOfTown%s_1" roadsideCapacity="%s" angle="270" length="8"> 
-    </parkingArea>""" %
-          (row, row, SLOTS_PER_ROW, row, row, SLOTS_PER_ROW), file=stops)
+    def __exit__(self, *args):
+        self.close()
 
-# Vehicle types
-#   1. carB is for vehicle with bad behaviour
-print(("""    <vType id="car" color="0.7,0.7,0.7"/> <vType id="carB" color="red"/>
-"""), file=stops)
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.chunkSize:
+            self.flush()
 
-print("</additional>", file=stops)
-stops.close()
+    def flush(self):
+        self.file.write("".join(self.parts))
+        self.parts = []
+        self.size = 0
 
-departTime = 5
+    def close(self):
+        self.flush()
+        self.file.close()
 
-# Routes for vehicles
-routes = open("%s_demand%02i.rou.xml" % (PREFIX, RANDOM_POPULATION), "w")
-print("<routes>", file=routes)
 
-#Number of stops
-stops = 10
+# Function to get the number of rows of "ParkAreaOutOfTown" and the x of the first one
+def outOfTownLayout(config):
+    howManyRows = config.outOfTownRows
+    offset = 21 - 14.5 * (howManyRows - 4)
+    return howManyRows, offset
 
-howManyStopsInADay = 5
 
-tempContVehicle = DOUBLE_ROWS
+# Function to get the distance between the first rows of two districts
+def districtDistance(config):
+    return max(100, (config.doubleRows + 1) * config.rowDist)
 
-if NUMBER_BAD_VEHICLES > NUMBER_GOOD_VEHICLES:
-    exit()
 
-contGoodVehicles = 0
-contBadVehicles = 0
+# Function to get what is added to "main", "cyber" and "road" in the names of the nodes and edges of a group
+# of parking areas: "" for "ParkArea", "Alternative" for "ParkAreaAlternative" and so on
+def districtSuffix(config, parkAreaName):
+    if parkAreaName.startswith(config.parkAreaNames[0]):
+        return parkAreaName[len(config.parkAreaNames[0]):]
+    return parkAreaName
 
-vehiclesProportion = int(NUMBER_GOOD_VEHICLES / NUMBER_BAD_VEHICLES)
-lastDepart = 0
-begin = 0
-last = vehiclesProportion
 
-while contBadVehicles < NUMBER_BAD_VEHICLES or contGoodVehicles < NUMBER_GOOD_VEHICLES:
+def printLaneRoad(edges, edgeID, fromNode, toNode):
+    print("""<edge id="%s" from="%s" to="%s" numLanes="2" spreadType="center">
+            <lane index="0"/>
+            <lane index="1"/>
+        </edge>""" % (edgeID, fromNode, toNode), file=edges)
 
-    for v in range(SLOTS_PER_ROW):
-        # Generation of vehicles with normal behaviour
-        if contGoodVehicles < NUMBER_GOOD_VEHICLES:
-            for idx in range(begin, last):
 
-                contGoodVehicles = contGoodVehicles + 1
-                if contGoodVehicles > NUMBER_GOOD_VEHICLES:
-                    break
-                print("""    <trip id="v%s.%s" type="car" depart="%s" from="mainin" to="road%s">
-                <param key="warning" value="0" /> 
-                <param key="civil" value="0" /> 
-                <param key="reviewStars" value="3" /> 
-                <param key="wallet" value="100" /> 
-                <param key="goodBehaviour" value="True" /> 
-                <param key="delay" value="0" /> """ % (idx, v, lastDepart * departTime, idx % 2), end='', file=routes)
-                for i in range(stops):
-                    permanenceTime = random.randrange(MIN_DURATION, MAX_DURATION / 8) * SLOT_DURATION
-                    randomPark = random.randrange(1, 100)
-                    if randomPark % 2 == 0:
-                        print("""
-                <stop parkingArea="%s%s" duration="%i"/>""" % (PARKAREA_NAMES[0], idx % 2, permanenceTime), end='', file=routes)
-                    else:
-                        print("""
-                <stop parkingArea="%s%s" duration="%i"/> """ % (PARKAREA_NAMES[1], idx % 2, permanenceTime), end='', file=routes)
-                    permanenceTime = random.randrange(MAX_DURATION / 3, MAX_DURATION - MAX_DURATION / 3) * SLOT_DURATION
-                    if (i + 1) % howManyStopsInADay == 0:
-                        print("""
-                <stop parkingArea="%s%s" duration="%i"/> """ % (PARKAREA_NAMES[2], idx % howManyRows, permanenceTime), end='', file=routes)
-                print("""
-            </trip>""", file=routes)
-
-                contGoodVehicles = contGoodVehicles + 1
-                if contGoodVehicles > NUMBER_GOOD_VEHICLES:
+def printParkRoad(edges, edgeID, fromNode, toNode):
+    print("""<edge id="%s" from="%s" to="%s" numLanes="3">
+        <lane index="0"/>
+        <lane index="1"/>
+        <lane index="2"/>
+    </edge>""" % (edgeID, fromNode, toNode), file=edges)
+
+
+# Function to write the XML declaration and the opening root element of a SUMO input file, with
+# sumolib when SUMO is used and by hand otherwise
+def writeHeader(outf, root, sumo=True):
+    if sumo:
+        import sumolib
+        sumolib.xml.writeHeader(outf, root=root)
+        return
+    outf.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    outf.write('<%s xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+               'xsi:noNamespaceSchemaLocation="http://sumo.dlr.de/xsd/%s_file.xsd">\n' % (root, root))
+
+
+# Function to write the nodes and the edges of the network
+# The main road crosses the districts of the town (ParkArea, ParkAreaAlternative, ...) one after the
+# other, then goes back through "ParkAreaOutOfTown". Every row of a district is a road from the main road
+# to a road parallel to it, with a parking area on each side
+def writeNetwork(config, directory=".", sumo=True):
+    howManyRows, offset = outOfTownLayout(config)
+    suffixes = [districtSuffix(config, parkAreaName) for parkAreaName in config.districtNames]
+    outOfTown = districtSuffix(config, config.parkAreaNames[2])
+    districtDist = districtDistance(config)
+    with ChunkedWriter(os.path.join(directory, "%s.nod.xml" % config.prefix)) as nodes, \
+            ChunkedWriter(os.path.join(directory, "%s.edg.xml" % config.prefix)) as edges:
+        writeHeader(nodes, "nodes", sumo)
+        writeHeader(edges, "edges", sumo)
+
+        # Road construction
+        # This road leads to the car parks of the town
+        print('<node id="in" x="-100" y="0"/>', file=nodes)
+        print('<edge id="mainin" from="in" to="main%s0" numLanes="3"/>' % suffixes[0], file=edges)
+        for district, suffix in enumerate(suffixes):
+            for row in range(config.doubleRows):
+                nodeID = "main%s%s" % (suffix, row)
+                x = district * districtDist + row * config.rowDist
+                print('<node id="%s" x="%s" y="0"/>' % (nodeID, x), file=nodes)
+                if row > 0:
+                    print('<edge id="main%s%sto%s" from="main%s%s" to="%s" numLanes="3"/>' %
+                          (suffix, row - 1, row, suffix, row - 1, nodeID), file=edges)
+
+        # This road leads to the "ParkOutOfTown" car park
+        for row in range(howManyRows):
+            nodeID = "main%s%s" % (outOfTown, row)
+            x = row * config.rowDist + offset
+            print('<node id="%s" x="%s" y="-150"/>' % (nodeID, x), file=nodes)
+            if row > 0:
+                print('<edge id="main%s%sto%s" from="%s" to="main%s%s" numLanes="3"/>' %
+                      (outOfTown, row, row - 1, nodeID, outOfTown, row - 1), file=edges)
+
+        # Another roads that connect the various car parks
+        for district in range(1, len(suffixes)):
+            print('<edge id="mainmid%s" from="main%s%s" to="main%s0" numLanes="3"/>' %
+                  ("" if district == 1 else district, suffixes[district - 1], config.doubleRows - 1,
+                   suffixes[district]), file=edges)
+        xOut = len(suffixes) * districtDist + 25
+        print('<node id="out" x="%s" y="0"/>' % xOut, file=nodes)
+        print('<edge id="mainout" from="main%s%s" to="out" numLanes="3"/>' % (suffixes[-1], config.doubleRows - 1),
+              file=edges)
+
+        print('<node id="backin" x="-100" y="-150"/>', file=nodes)
+        print('<node id="backout" x="%s" y="-150"/>' % xOut, file=nodes)
+
+        print('<edge id="inOutOfTown" from="backout" to="main%s%s" numLanes="3"/>' % (outOfTown, howManyRows - 1),
+              file=edges)
+        print('<edge id="outOutOfTown" from="main%s0" to="backin" numLanes="3"/>' % outOfTown, file=edges)
+
+        print('<edge id="turnbackout" from="out" to="backout" numLanes="3"/>', file=edges)
+        print('<edge id="turnbackin" from="backin" to="in" numLanes="3"/>', file=edges)
+
+        # Roads in the parking area to change lane
+        y = (config.slotsPerRow + 3) * config.slotWidth
+        districtRows = [(suffix, [district * districtDist + row * config.rowDist for row in range(config.doubleRows)],
+                         y) for district, suffix in enumerate(suffixes)]
+        districtRows.append((outOfTown, [row * config.rowDist + offset for row in range(howManyRows)], y - 150))
+        for suffix, xs, y in districtRows:
+            for row, x in enumerate(xs):
+                print('<node id="cyber%s%s" x="%s" y="%s"/>' % (suffix, row, x, y), file=nodes)
+                if row > 0:
+                    edgeID = "cyber%s%sto%s" % (suffix, row - 1, row)
+                    printLaneRoad(edges, edgeID, "cyber%s%s" % (suffix, row - 1), "cyber%s%s" % (suffix, row))
+                    printLaneRoad(edges, "-" + edgeID, "cyber%s%s" % (suffix, row), "cyber%s%s" % (suffix, row - 1))
+
+        # Roads in the parking area
+        for row in range(config.doubleRows):
+            for suffix in suffixes:
+                printParkRoad(edges, "road%s%s" % (suffix, row), "main%s%s" % (suffix, row),
+                              "cyber%s%s" % (suffix, row))
+                printParkRoad(edges, "-road%s%s" % (suffix, row), "cyber%s%s" % (suffix, row),
+                              "main%s%s" % (suffix, row))
+
+        # ParkAreaOutOfTown
+        for row in range(howManyRows):
+            printParkRoad(edges, "road%s%s" % (outOfTown, row), "main%s%s" % (outOfTown, row),
+                          "cyber%s%s" % (outOfTown, row))
+            printParkRoad(edges, "-road%s%s" % (outOfTown, row), "cyber%s%s" % (outOfTown, row),
+                          "main%s%s" % (outOfTown, row))
+
+        print("</nodes>", file=nodes)
+        print("</edges>", file=edges)
+
+
+def runNetconvert(config, directory="."):
+    import sumolib
+    subprocess.check_call([sumolib.checkBinary('netconvert'),
+                           '-n', '%s.nod.xml' % config.prefix,
+                           '-e', '%s.edg.xml' % config.prefix,
+                           '-o', '%s.net.xml' % config.prefix], cwd=directory)
+
+
+# Function to write the parking areas and the vehicle types
+def writeParkingAreas(config, directory=".", sumo=True):
+    howManyRows, offset = outOfTownLayout(config)
+    rows = [(parkAreaName, "road" + districtSuffix(config, parkAreaName), config.doubleRows)
+            for parkAreaName in config.districtNames]
+    rows.append((config.parkAreaNames[2], "road" + districtSuffix(config, config.parkAreaNames[2]), howManyRows))
+    with ChunkedWriter(os.path.join(directory, "%s.add.xml" % config.prefix)) as stops:
+        writeHeader(stops, "additional", sumo)
+        for parkAreaName, road, count in rows:
+            for row in range(count):
+                for side in SIDES:
+                    stops.write("""    <parkingArea id="%s%s%s" lane="%s%s%s_1" roadsideCapacity="%s" angle="270" length="8">
+    </parkingArea>
+""" % (parkAreaName, side, row, side, road, row, config.slotsPerRow))
+
+        # Vehicle types
+        #   1. carB is for vehicle with bad behaviour
+        stops.write("""    <vType id="car" color="0.7,0.7,0.7"/> <vType id="carB" color="red"/>\n""")
+        stops.write("</additional>\n")
+
+
+# Function to get how many numbers are drawn to choose the district of a stop, the district is the number
+# modulo the districts: with two districts the even numbers in [1, 100) give "ParkArea"
+def parkChoices(config):
+    return max(100, config.districts + 1)
+
+
+# Function to list the trips of the vehicles in the order they are written, without their stops
+# Vehicles leave in waves, each wave has twice the good vehicles of the previous one and a bad vehicle
+# for every vehiclesProportion good ones
+def planTrips(config):
+    if config.numberBadVehicles > config.numberGoodVehicles:
+        raise ValueError("NUMBER_BAD_VEHICLES can not be greater than NUMBER_GOOD_VEHICLES")
+    howManyRows, offset = outOfTownLayout(config)
+
+    contGoodVehicles = 0
+    contBadVehicles = 0
+
+    vehiclesProportion = config.numberGoodVehicles // max(config.numberBadVehicles, 1)
+    lastDepart = 0
+    begin = 0
+    last = vehiclesProportion
+
+    while contBadVehicles < config.numberBadVehicles or contGoodVehicles < config.numberGoodVehicles:
+        depart = lastDepart * DEPART_TIME
+
+        for v in range(config.slotsPerRow):
+            # Generation of vehicles with normal behaviour
+            if contGoodVehicles < config.numberGoodVehicles:
+                for idx in range(begin, last):
+                    for side in SIDES:
+                        contGoodVehicles = contGoodVehicles + 1
+                        if contGoodVehicles > config.numberGoodVehicles:
+                            break
+                        row = idx % config.doubleRows
+                        yield TripPlan("v%s%s.%s" % (side, idx, v), "car", depart, "%sroad%s" % (side, row), 0,
+                                       side, row, idx % howManyRows)
+                    if contGoodVehicles > config.numberGoodVehicles:
+                        break
+
+            # Generation of vehicles with bad behaviour, they stay one slot more than they said
+            if contBadVehicles < config.numberBadVehicles:
+                for side in SIDES:
+                    contBadVehicles = contBadVehicles + 1
+                    if contBadVehicles > config.numberBadVehicles:
+                        break
+                    row = contBadVehicles % config.doubleRows
+                    yield TripPlan("v%s%s.%s" % (side, last, v), "carB", depart, "%sroad%s" % (side, row),
+                                   config.slotDuration, side, row, contBadVehicles % howManyRows)
+                # The wave ends with its last bad vehicle
+                if contBadVehicles > config.numberBadVehicles:
                     break
-                print("""    <trip id="v-%s.%s" type="car" depart="%s" from="mainin" to="-road%s">  
-                <param key="warning" value="0" /> 
-                <param key="civil" value="0" /> 
-                <param key="reviewStars" value="3" /> 
-                <param key="wallet" value="100" />
-                <param key="goodBehaviour" value="True" /> 
-                <param key="delay" value="0" /> """ % (idx, v, lastDepart * departTime, idx % 2), end='', file=routes)
-                for i in range(stops):
-                    permanenceTime = random.randrange(MIN_DURATION, MAX_DURATION / 8) * SLOT_DURATION
-                    randomPark = random.randrange(1, 100)
-                    if randomPark % 2 == 0:
-                        print("""
-                <stop parkingArea="%s-%s" duration="%i"/>""" % (PARKAREA_NAMES[0],idx % 2, permanenceTime), end='', file=routes)
-                    else:
-                        print("""
-                <stop parkingArea="%s-%s" duration="%i"/> """ % (PARKAREA_NAMES[1],idx % 2, permanenceTime), end='', file=routes)
-                    permanenceTime = random.randrange(MAX_DURATION / 3, MAX_DURATION - MAX_DURATION / 3) * SLOT_DURATION
-                    if (i + 1) % howManyStopsInADay == 0:
-                        print("""
-                <stop parkingArea="%s-%s" duration="%i"/> """ % (PARKAREA_NAMES[2], idx % howManyRows, permanenceTime), end='', file=routes)
-                print("""
-            </trip>""", file=routes)
-
-        # Generation of vehicles with bad behaviour
-        if contBadVehicles < NUMBER_BAD_VEHICLES:
-            contBadVehicles = contBadVehicles + 1
-            if contBadVehicles > NUMBER_BAD_VEHICLES:
-                break
-            print("""    <trip id="v%s.%s" type="carB" depart="%s" from="mainin" to="road%s">
-            <param key="warning" value="0" /> 
-            <param key="civil" value="0" /> 
-            <param key="reviewStars" value="3" /> 
-            <param key="wallet" value="100" />
-            <param key="goodBehaviour" value="True" /> 
-            <param key="delay" value="%i" /> """ % (last, v, lastDepart * departTime, contBadVehicles % 2, SLOT_DURATION), end='', file=routes)
-            for i in range(stops):
-                permanenceTime = random.randrange(MIN_DURATION, MAX_DURATION / 8) * SLOT_DURATION + SLOT_DURATION
-                randomPark = random.randrange(1, 100)
-                if randomPark % 2 == 0:
-                    print("""
-            <stop parkingArea="%s%s" duration="%i"/>""" % (PARKAREA_NAMES[0], contBadVehicles % 2, permanenceTime), end='',
-                          file=routes)
-                else:
-                    print("""
-            <stop parkingArea="%s%s" duration="%i"/> """ % (PARKAREA_NAMES[1], contBadVehicles % 2, permanenceTime), end='',
-                          file=routes)
-                permanenceTime = random.randrange(MAX_DURATION / 3, MAX_DURATION - MAX_DURATION / 3) * SLOT_DURATION
-                if (i + 1) % howManyStopsInADay == 0:
-                    print("""
-            <stop parkingArea="%s%s" duration="%i"/> """ % (PARKAREA_NAMES[2], contBadVehicles % howManyRows, permanenceTime), end='',
-                          file=routes)
-            print("""
-        </trip>""", file=routes)
-
-            contBadVehicles = contBadVehicles + 1
-            if contBadVehicles > NUMBER_BAD_VEHICLES:
-                break
-            print("""    <trip id="v-%s.%s" type="carB" depart="%s" from="mainin" to="-road%s">
-            <param key="warning" value="0" /> 
-            <param key="civil" value="0" /> 
-            <param key="reviewStars" value="3" /> 
-            <param key="wallet" value="100" />
-            <param key="goodBehaviour" value="True" /> 
-            <param key="delay" value="%i" /> """ % (last, v, lastDepart * departTime, contBadVehicles % 2, SLOT_DURATION), end='', file=routes)
-            for i in range(stops):
-                permanenceTime = random.randrange(MIN_DURATION, MAX_DURATION / 8) * SLOT_DURATION + SLOT_DURATION
-                randomPark = random.randrange(1, 100)
-                if randomPark % 2 == 0:
-                    print("""
-            <stop parkingArea="%s-%s" duration="%i"/>""" % (PARKAREA_NAMES[0], contBadVehicles % 2, permanenceTime), end='',
-                          file=routes)
-                else:
-                    print("""
-            <stop parkingArea="%s-%s" duration="%i"/> """ % (PARKAREA_NAMES[1], contBadVehicles % 2, permanenceTime), end='',
-                          file=routes)
-                permanenceTime = random.randrange(MAX_DURATION / 3, MAX_DURATION - MAX_DURATION / 3) * SLOT_DURATION
-                if (i + 1) % howManyStopsInADay == 0:
-                    print("""
-            <stop parkingArea="%s-%s" duration="%i"/> """ % (PARKAREA_NAMES[2], contBadVehicles % howManyRows, permanenceTime), end='',
-                          file=routes)
-            print("""
-        </trip>""", file=routes)
-
-    lastDepart = lastDepart + 1
-    begin = last + 1
-    last = last + last + 1
-
-print("</routes>", file=routes)
-routes.close()
+
+        lastDepart = lastDepart + 1
+        begin = last + 1
+        last = last + last + 1
+
+
+# Function to draw the stops of some trips with random.Random, one value at a time
+# These are the draws of the demand files made before the numpy sampler
+def randomStops(config, rng, plans):
+    allStops = []
+    for plan in plans:
+        stops = []
+        for i in range(STOPS):
+            permanenceTime = rng.randrange(config.minDuration, config.maxDuration // 8) * config.slotDuration + plan.delay
+            randomPark = rng.randrange(1, parkChoices(config))
+            district = config.districtNames[randomPark % config.districts]
+            stops.append(("%s%s%s" % (district, plan.side, plan.row), permanenceTime))
+            permanenceTime = rng.randrange(config.maxDuration // 3,
+                                           config.maxDuration - config.maxDuration // 3) * config.slotDuration
+            if (i + 1) % STOPS_IN_A_DAY == 0:
+                stops.append(("%s%s%s" % (config.parkAreaNames[2], plan.side, plan.outOfTownRow), permanenceTime))
+        allStops.append(stops)
+    return allStops
+
+
+# Function to draw the stops of some trips with a numpy Generator, all the values of a kind at once
+# It returns the durations of the stops in town, the district of each one and the durations of the
+# stops in "ParkAreaOutOfTown", one row for each trip
+def numpyStops(config, rng, plans):
+    count = len(plans)
+    delays = np.fromiter((plan.delay for plan in plans), dtype=np.int64, count=count)
+    townDurations = (rng.integers(config.minDuration, config.maxDuration // 8, size=(count, STOPS))
+                     * config.slotDuration + delays[:, None])
+    # Same odds as randomStops
+    districts = rng.integers(1, parkChoices(config), size=(count, STOPS)) % config.districts
+    outOfTownDurations = (rng.integers(config.maxDuration // 3, config.maxDuration - config.maxDuration // 3,
+                                       size=(count, STOPS // STOPS_IN_A_DAY)) * config.slotDuration)
+    return townDurations, districts, outOfTownDurations
+
+
+# Function to turn the arrays of numpyStops into the stops of each trip
+def stopLists(config, plans, townDurations, districts, outOfTownDurations):
+    allStops = []
+    for plan, durations, choices, outOfTown in zip(plans, townDurations.tolist(), districts.tolist(),
+                                                  outOfTownDurations.tolist()):
+        town = ["%s%s%s" % (district, plan.side, plan.row) for district in config.districtNames]
+        outOfTownArea = "%s%s%s" % (config.parkAreaNames[2], plan.side, plan.outOfTownRow)
+        stops = []
+        for i in range(STOPS):
+            stops.append((town[choices[i]], durations[i]))
+            if (i + 1) % STOPS_IN_A_DAY == 0:
+                stops.append((outOfTownArea, outOfTown[i // STOPS_IN_A_DAY]))
+        allStops.append(stops)
+    return allStops
+
+
+# Function to format the trips of a block from the arrays of numpyStops
+# Each different (parking area, duration) in town is formatted once and picked for all the stops together
+def formatBlock(config, plans, townDurations, districts, outOfTownDurations):
+    pairs = {}  # (side, row) -> index
+    pairIndex = np.fromiter((pairs.setdefault((plan.side, plan.row), len(pairs)) for plan in plans),
+                            dtype=np.int64, count=len(plans))
+    townNames = [None] * (config.districts * len(pairs))
+    for (side, row), index in pairs.items():
+        for district, parkAreaName in enumerate(config.districtNames):
+            townNames[config.districts * index + district] = "%s%s%s" % (parkAreaName, side, row)
+    values, durationIndex = np.unique(townDurations, return_inverse=True)
+    table = np.array([[STOP % (name, duration) for duration in values.tolist()] for name in townNames], dtype=object)
+    townXml = table[pairIndex[:, None] * config.districts + districts, durationIndex.reshape(townDurations.shape)]
+
+    outOfTownXml = np.array([[STOP % ("%s%s%s" % (config.parkAreaNames[2], plan.side, plan.outOfTownRow), duration)
+                              for duration in durations]
+                             for plan, durations in zip(plans, outOfTownDurations.tolist())], dtype=object)
+    columns = []
+    for day in range(outOfTownXml.shape[1]):
+        columns.append(townXml[:, day * STOPS_IN_A_DAY:(day + 1) * STOPS_IN_A_DAY])
+        columns.append(outOfTownXml[:, day:day + 1])
+    columns.append(townXml[:, outOfTownXml.shape[1] * STOPS_IN_A_DAY:])
+    stopsXml = np.concatenate(columns, axis=1).tolist()
+    return [TRIP % (plan.id, plan.type, plan.depart, plan.to, plan.delay, "".join(stops))
+            for plan, stops in zip(plans, stopsXml)]
+
+
+SAMPLERS = ("numpy", "random")
+
+
+# Function to get the random generator of a sampler, seeded with RANDOM_POPULATION
+def makeRng(config, sampler):
+    if sampler not in SAMPLERS:
+        raise ValueError("Unknown sampler '%s', use one of %s" % (sampler, ", ".join(SAMPLERS)))
+    if sampler == "random":
+        return random.Random(config.randomPopulation)
+    if np is None:
+        raise ValueError("The numpy sampler needs numpy, use the random one")
+    return np.random.default_rng(config.randomPopulation)
+
+
+# Function to split the trips in blocks of SAMPLE_BLOCK, the stops of a block are drawn together
+# The blocks do not depend on anything else, so the trips only depend on the sampler and its seed
+def planBlocks(config):
+    plans = []
+    for plan in planTrips(config):
+        plans.append(plan)
+        if len(plans) == SAMPLE_BLOCK:
+            yield plans
+            plans = []
+    if plans:
+        yield plans
+
+
+# Function to generate the trips of the vehicles one by one, in the order they are written
+def generateTrips(config, sampler="numpy", rng=None):
+    if rng is None:
+        rng = makeRng(config, sampler)
+    for plans in planBlocks(config):
+        if sampler == "random":
+            allStops = randomStops(config, rng, plans)
+        else:
+            allStops = stopLists(config, plans, *numpyStops(config, rng, plans))
+        for plan, stops in zip(plans, allStops):
+            yield Trip(plan.id, plan.type, plan.depart, plan.to, plan.delay, stops)
+
+
+def formatTrip(trip):
+    return TRIP % (trip.id, trip.type, trip.depart, trip.to, trip.delay, "".join(STOP % stop for stop in trip.stops))
+
+
+# Function to write the routes of the vehicles, it returns the number of trips
+def writeDemand(config, directory=".", chunkSize=CHUNK_SIZE, sampler="numpy", rng=None):
+    if rng is None:
+        rng = makeRng(config, sampler)
+    count = 0
+    with ChunkedWriter(os.path.join(directory, config.demandFile), chunkSize) as routes:
+        routes.write("<routes>\n")
+        if sampler == "random":
+            for trip in generateTrips(config, sampler, rng):
+                routes.write(formatTrip(trip))
+                count += 1
+        else:
+            for plans in planBlocks(config):
+                trips = formatBlock(config, plans, *numpyStops(config, rng, plans))
+                routes.write("".join(trips))
+                count += len(trips)
+        routes.write("</routes>\n")
+    return count
 
 
 # Sumo config, the "traditional" bus does not work currently
-config = open("%s%02i.sumocfg" % (PREFIX, RANDOM_POPULATION), "w")
-print("""<configuration>
+def writeSumoConfig(config, directory="."):
+    with open(os.path.join(directory, config.sumoConfigFile), "w") as sumoConfig:
+        print("""<configuration>
 <input>
     <net-file value="%s.net.xml"/>
-    <route-files value="%s_demand%02i.rou.xml"/>
+    <route-files value="%s"/>
     <additional-files value="%s.add.xml"/>
     <no-step-log value="True"/>
     <time-to-teleport value="0"/>
 </input>
-</configuration>""" % (PREFIX, PREFIX, RANDOM_POPULATION, PREFIX), file=config)
-config.close()
+</configuration>""" % (config.prefix, config.demandFile, config.prefix), file=sumoConfig)
+
+
+# Function to identify the files of a piece of the scenario by the values they depend on
+def pieceKey(config, name, settings, extra):
+    values = dict((setting, getattr(config, setting)) for setting in settings)
+    values.update(extra, piece=name, version=GENERATOR_VERSION)
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# Function to put the files of a piece in the cache, all of them or none
+def storePiece(directory, entry, files):
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(entry))
+    try:
+        for fileName in files:
+            shutil.copyfile(os.path.join(directory, fileName), os.path.join(staging, fileName))
+        os.rename(staging, entry)
+    except OSError:
+        # Another process stored the same piece first
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+# Function to copy the files of a piece from the cache, or to write them with write() and cache them
+# It returns True if the files were written
+def buildPiece(config, directory, cacheDir, name, settings, files, write, **extra):
+    if cacheDir is None:
+        write()
+        return True
+    entry = os.path.join(cacheDir, "%s-%s" % (name, pieceKey(config, name, settings, extra)))
+    if all(os.path.exists(os.path.join(entry, fileName)) for fileName in files):
+        for fileName in files:
+            shutil.copyfile(os.path.join(entry, fileName), os.path.join(directory, fileName))
+        return False
+    write()
+    storePiece(directory, entry, files)
+    return True
+
+
+# Function to write all the files of the scenario, the pieces found in cacheDir (if any) are copied from
+# there. It returns the names of the pieces that were written
+def build(config, directory=".", netconvert=True, chunkSize=CHUNK_SIZE, sampler="numpy", cacheDir=None):
+    def network():
+        writeNetwork(config, directory, netconvert)
+        if netconvert:
+            runNetconvert(config, directory)
+
+    networkFiles = ["%s.nod.xml" % config.prefix, "%s.edg.xml" % config.prefix]
+    if netconvert:
+        networkFiles.append("%s.net.xml" % config.prefix)
+    pieces = [
+        ("network", NETWORK_SETTINGS, networkFiles, network, {"netconvert": netconvert}),
+        ("parkingAreas", PARKING_SETTINGS, ["%s.add.xml" % config.prefix],
+         lambda: writeParkingAreas(config, directory, netconvert), {}),
+        ("demand", DEMAND_SETTINGS, [config.demandFile],
+         lambda: writeDemand(config, directory, chunkSize, sampler), {"sampler": sampler}),
+        ("sumoConfig", SUMO_CONFIG_SETTINGS, [config.sumoConfigFile], lambda: writeSumoConfig(config, directory), {}),
+    ]
+    written = []
+    for name, settings, files, write, extra in pieces:
+        if buildPiece(config, directory, cacheDir, name, settings, files, write, **extra):
+            written.append(name)
+    return written
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--config", dest="config",
+                         help="JSON file with the settings that differ from constants.py")
+    optParser.add_option("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                         help="change a setting, e.g. --set RANDOM_POPULATION=50 (can be repeated)")
+    optParser.add_option("-d", "--directory", default=".",
+                         help="write the files in this directory, default: %default")
+    optParser.add_option("--chunk-size", dest="chunkSize", type="int", default=CHUNK_SIZE,
+                         help="characters of the routes file written at once, default: %default")
+    optParser.add_option("--sampler", default="numpy", choices=SAMPLERS,
+                         help="how the stops are drawn: numpy (fast) or random (the draws of the demand files "
+                              "made before the numpy sampler), default: %default")
+    optParser.add_option("--cache-dir", dest="cacheDir", default=CACHE_DIR,
+                         help="reuse the files generated with the same settings from this directory, default: %default")
+    optParser.add_option("--no-cache", dest="cacheDir", action="store_const", const=None,
+                         help="always write all the files")
+    options, args = optParser.parse_args()
+    return options
+
+
+if __name__ == "__main__":
+    options = get_options()
+    try:
+        config = Config.load(options.config, options.settings)
+        written = build(config, options.directory, chunkSize=options.chunkSize, sampler=options.sampler,
+                        cacheDir=options.cacheDir)
+    except (OSError, TypeError, ValueError, subprocess.CalledProcessError) as e:
+        sys.exit("Invalid configuration: %s" % e)
+    if options.cacheDir is not None:
+        print("Written: %s" % (", ".join(written) or "none, all the files are from the cache"))
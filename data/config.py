@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2008-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    config.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Settings of a scenario and of its coordinator.
+
+Config is immutable: the defaults are the values of constants.py, a JSON file
+and NAME=VALUE overrides (field names like "randomPopulation" or constant
+names like "RANDOM_POPULATION") give a new Config. Derived values are computed
+once when the object is built, configHash identifies the settings.
+"""
+
+from __future__ import absolute_import
+
+import dataclasses
+import hashlib
+import json
+import math
+from typing import Tuple
+
+try:
+    from data import constants
+except ImportError:
+    import constants
+
+
+@dataclasses.dataclass(frozen=True)
+class Config(object):
+    prefix: str = constants.PREFIX
+    parkAreaNames: Tuple[str, ...] = tuple(constants.PARKAREA_NAMES)
+    randomPopulation: int = constants.RANDOM_POPULATION
+    standardAuctionPrice: float = constants.STANDARD_AUCTION_PRICE
+    minDuration: int = constants.MIN_DURATION
+    maxDuration: int = constants.MAX_DURATION
+    slotDuration: int = constants.SLOT_DURATION
+    constantFreeParks: int = constants.CONSTANT_FREE_PARKS
+    initialConstantFreeParks: int = constants.INITIAL_CONSTANT_FREE_PARKS
+    initialFreeParks: int = constants.INITIAL_FREE_PARKS
+    timeInitialConstantFreeParks: int = constants.TIME_INITIAL_CONSTANT_FREE_PARKS
+    numberGoodVehicles: int = constants.NUMBER_GOOD_VEHICLES
+    numberBadVehicles: int = constants.NUMBER_BAD_VEHICLES
+    refreshFreeParks: int = constants.REFRESH_FREE_PARKS
+    districts: int = constants.DISTRICTS
+    doubleRows: int = constants.DOUBLE_ROWS
+    rowDist: float = constants.ROW_DIST
+    slotsPerRow: int = constants.SLOTS_PER_ROW
+    slotWidth: float = constants.SLOT_WIDTH
+
+    # Derived values
+    districtNames: Tuple[str, ...] = dataclasses.field(init=False, compare=False)  # Groups of parking areas in town
+    outOfTownRows: int = dataclasses.field(init=False, compare=False)  # Rows of "ParkAreaOutOfTown", at least 4
+    refreshFreeParksPeriod: float = dataclasses.field(init=False, compare=False)  # Time steps between refreshes
+    demandFile: str = dataclasses.field(init=False, compare=False)
+    sumoConfigFile: str = dataclasses.field(init=False, compare=False)
+    configHash: str = dataclasses.field(init=False, compare=False)
+
+    def __post_init__(self):
+        for field in fields():
+            value = getattr(self, field.name)
+            if field.type is Tuple[str, ...]:
+                object.__setattr__(self, field.name, tuple(value))
+            elif not isinstance(value, field.type) and not (field.type is float and isinstance(value, int)):
+                raise TypeError("%s must be %s, not %r" % (field.name, field.type.__name__, value))
+        if self.districts < 1 or self.doubleRows < 1:
+            raise ValueError("districts and doubleRows must be at least 1")
+        derived = {
+            "districtNames": (tuple(self.parkAreaNames[:2]) + tuple(
+                "%sDistrict%s" % (self.parkAreaNames[0], districtLetters(district))
+                for district in range(2, self.districts)))[:self.districts],
+            "outOfTownRows": max(4, math.ceil((self.numberGoodVehicles + self.numberBadVehicles) / 20)),
+            "refreshFreeParksPeriod": self.maxDuration * self.slotDuration / self.refreshFreeParks,
+            "demandFile": "%s_demand%02i.rou.xml" % (self.prefix, self.randomPopulation),
+            "sumoConfigFile": "%s%02i.sumocfg" % (self.prefix, self.randomPopulation),
+            "configHash": hashlib.sha1(json.dumps(self.asDict(), sort_keys=True).encode()).hexdigest()[:12],
+        }
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
+
+    def asDict(self):
+        return dict((field.name, getattr(self, field.name)) for field in fields())
+
+    # Function to get a copy with some values changed, names and values are checked like in a file
+    def replace(self, **values):
+        return dataclasses.replace(self, **dict(parseValue(name, value) for name, value in values.items()))
+
+    @classmethod
+    def load(cls, fileName=None, overrides=()):
+        values = {}
+        if fileName:
+            with open(fileName) as f:
+                values.update(json.load(f))
+        for override in overrides:
+            if "=" not in override:
+                raise ValueError("Override '%s' must be NAME=VALUE" % override)
+            name, value = override.split("=", 1)
+            values[name.strip()] = value.strip()
+        return cls().replace(**values)
+
+
+# Fields that can be set, derived values excluded
+def fields():
+    return [field for field in dataclasses.fields(Config) if field.init]
+
+
+# Function to name the districts after the first two like columns of a spreadsheet: 2 -> C, 26 -> AA
+def districtLetters(district):
+    letters = ""
+    district += 1
+    while district:
+        district, letter = divmod(district - 1, 26)
+        letters = chr(ord("A") + letter) + letters
+    return letters
+
+
+def constantName(name):
+    return "".join("_" + char if char.isupper() else char.upper() for char in name).replace(
+        "PARK_AREA_NAMES", "PARKAREA_NAMES")
+
+
+# Function to get the field and the typed value of a setting, values given as strings are converted
+def parseValue(name, value):
+    known = dict((field.name, field) for field in fields())
+    known.update((constantName(field.name), field) for field in fields())
+    field = known.get(name)
+    if field is None:
+        raise ValueError("Unknown setting '%s'" % name)
+    if isinstance(value, str) and field.type is not str:
+        if field.type is Tuple[str, ...]:
+            value = tuple(item.strip() for item in value.split(","))
+        else:
+            try:
+                value = field.type(value)
+            except ValueError:
+                raise ValueError("%s must be %s, not '%s'" % (field.name, field.type.__name__, value))
+    return field.name, value
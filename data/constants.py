@@ -36,7 +36,8 @@ NUMBER_GOOD_VEHICLES = 40
 NUMBER_BAD_VEHICLES = 40
 REFRESH_FREE_PARKS = 3
 
-DOUBLE_ROWS = 2
+DISTRICTS = 2 # Groups of parking areas in town: ParkArea, ParkAreaAlternative, ParkAreaDistrictC, ...
+DOUBLE_ROWS = 2 # Rows of each district
 ROW_DIST = 29
 STOP_POS = ROW_DIST - 9
 SLOTS_PER_ROW = 10
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    eventQueue.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Timed actions of the coordinator (end of a reservation, refresh of the free
+parks) kept in a min-heap keyed by simulation time.
+
+Each step pops only the events that are due, so its cost depends on the number
+of events and not on the number of vehicles. Events are never removed: the
+code handling an event checks that it is still valid. Events with the same
+time are popped in the order they were pushed.
+"""
+
+from __future__ import absolute_import
+
+import heapq
+
+
+class EventQueue(object):
+
+    def __init__(self):
+        self.heap = []
+        self.counter = 0  # Keeps the push order among events with the same time
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, time, kind, payload=None):
+        heapq.heappush(self.heap, (time, self.counter, kind, payload))
+        self.counter += 1
+
+    def nextTime(self):
+        if not self.heap:
+            return None
+        return self.heap[0][0]
+
+    # Function to remove and return (time, kind, payload) of every event due at time or before
+    def popDue(self, time):
+        due = []
+        while self.heap and self.heap[0][0] <= time:
+            eventTime, counter, kind, payload = heapq.heappop(self.heap)
+            due.append((eventTime, kind, payload))
+        return due
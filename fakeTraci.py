@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    fakeTraci.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Deterministic in-process stand-in for the subset of TraCI used by runner.py.
+
+It replays the trips and the <stop parkingArea=... duration=...> schedules of a
+route file together with the parking area capacities of the additional file,
+so the coordinator can be profiled without a SUMO installation.
+Vehicles do not move on the network: a trip between two stops simply takes a
+fixed number of time steps.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import types
+import pickle
+import xml.etree.ElementTree as ET
+
+# Vehicle states
+DRIVING = 0
+WAITING = 1
+PARKED = 2
+ENDING = 3
+
+INVALID_DOUBLE_VALUE = -2 ** 30
+
+# Values of traci.constants understood by the subscriptions
+constants = types.SimpleNamespace(
+    INVALID_DOUBLE_VALUE=INVALID_DOUBLE_VALUE,
+    VAR_NEXT_STOPS2=0x74,
+    VAR_STOPSTATE=0xb5,
+    VAR_PARAMETER=0x7e,
+    VAR_STOP_STARTING_VEHICLES_NUMBER=0x68,
+)
+
+
+class TraCIException(Exception):
+    pass
+
+
+# Same fields of traci's StopData used by runner.py
+class StopData(object):
+    __slots__ = ("stoppingPlaceID", "duration", "stopFlags")
+
+    def __init__(self, stoppingPlaceID, duration, stopFlags=65):
+        self.stoppingPlaceID = stoppingPlaceID
+        self.duration = duration
+        self.stopFlags = stopFlags
+
+    def __repr__(self):
+        return "StopData(stoppingPlaceID=%s, duration=%s, stopFlags=%s)" % (
+            self.stoppingPlaceID, self.duration, self.stopFlags)
+
+
+class _Vehicle(object):
+    __slots__ = ("id", "depart", "stops", "params", "state", "timer", "remaining")
+
+    def __init__(self, idVehicle, depart, stops, params):
+        self.id = idVehicle
+        self.depart = depart
+        self.stops = stops  # list of [parkingArea, duration]
+        self.params = params
+        self.state = DRIVING
+        self.timer = 0
+        self.remaining = 0
+
+
+class _VehicleDomain(object):
+
+    def __init__(self, sim):
+        self._sim = sim
+
+    def _get(self, vehID):
+        vehicle = self._sim.running.get(vehID)
+        if vehicle is None:
+            raise TraCIException("Vehicle '%s' is not known." % vehID)
+        return vehicle
+
+    def getIDList(self):
+        return tuple(self._sim.running)
+
+    def getIDCount(self):
+        return len(self._sim.running)
+
+    def getStops(self, vehID, limit=0):
+        stops = self._get(vehID).stops
+        if limit > 0:
+            stops = stops[:limit]
+        return tuple(StopData(parkArea, duration) for parkArea, duration in stops)
+
+    def getStopState(self, vehID):
+        # 1 * stopped + 2 * parking
+        return 3 if self._get(vehID).state in (PARKED, ENDING) else 0
+
+    def isStoppedParking(self, vehID):
+        return self._get(vehID).state in (PARKED, ENDING)
+
+    def getParameter(self, vehID, key):
+        return self._get(vehID).params.get(key, "")
+
+    def setParameter(self, vehID, key, value):
+        self._get(vehID).params[key] = str(value)
+
+    def replaceStop(self, vehID, nextStopIndex, edgeID, pos=1., laneIndex=0, duration=INVALID_DOUBLE_VALUE,
+                    flags=0, startPos=INVALID_DOUBLE_VALUE, until=INVALID_DOUBLE_VALUE, teleport=0):
+        vehicle = self._get(vehID)
+        if nextStopIndex >= len(vehicle.stops):
+            raise TraCIException("Vehicle '%s' has no stop at index %s." % (vehID, nextStopIndex))
+        if edgeID not in self._sim.capacity:
+            raise TraCIException("Parking area '%s' is not known." % edgeID)
+        if nextStopIndex == 0 and vehicle.state in (PARKED, ENDING):
+            raise TraCIException("Vehicle '%s' cannot replace its current stop." % vehID)
+        if duration == INVALID_DOUBLE_VALUE:
+            duration = vehicle.stops[nextStopIndex][1]
+        oldParkArea = vehicle.stops[nextStopIndex][0]
+        vehicle.stops[nextStopIndex] = [edgeID, duration]
+
+        # A vehicle queuing in front of a full park drives towards the new one
+        if nextStopIndex == 0 and vehicle.state == WAITING:
+            self._sim.queues[oldParkArea].remove(vehicle)
+            vehicle.state = DRIVING
+            vehicle.timer = self._sim.travelTime(oldParkArea, edgeID)
+
+    def subscribe(self, objectID, varIDs=None, begin=INVALID_DOUBLE_VALUE, end=INVALID_DOUBLE_VALUE,
+                  parameters=None):
+        self._get(objectID)
+        readers = []
+        for varID in varIDs or ():
+            if varID == constants.VAR_NEXT_STOPS2:
+                limit = parameters[varID][1] if parameters and varID in parameters else 0
+                readers.append((varID, lambda vehID, limit=limit: self.getStops(vehID, limit)))
+            elif varID == constants.VAR_STOPSTATE:
+                readers.append((varID, self.getStopState))
+            elif varID == constants.VAR_PARAMETER:
+                key = parameters[varID][1]
+                readers.append((varID, lambda vehID, key=key: self.getParameter(vehID, key)))
+            else:
+                raise TraCIException("Variable 0x%x is not supported by the stand-in simulator." % varID)
+        if readers:
+            self._sim.subscriptions[objectID] = readers
+            self._sim.subscriptionResults[objectID] = self._read(objectID)
+        else:
+            self.unsubscribe(objectID)
+
+    def unsubscribe(self, objectID):
+        self._sim.subscriptions.pop(objectID, None)
+        self._sim.subscriptionResults.pop(objectID, None)
+
+    def _read(self, objectID):
+        return dict((varID, reader(objectID)) for varID, reader in self._sim.subscriptions[objectID])
+
+    # Values are read at the end of every step, like SUMO does
+    def _updateSubscriptions(self):
+        for objectID in list(self._sim.subscriptions):
+            if objectID in self._sim.running:
+                self._sim.subscriptionResults[objectID] = self._read(objectID)
+            else:
+                self.unsubscribe(objectID)
+
+    def getSubscriptionResults(self, objectID):
+        return self._sim.subscriptionResults.get(objectID, {})
+
+    def getAllSubscriptionResults(self):
+        return dict(self._sim.subscriptionResults)
+
+
+class _ParkingAreaDomain(object):
+
+    def __init__(self, sim):
+        self._sim = sim
+
+    def getIDList(self):
+        return tuple(self._sim.capacity)
+
+    def getIDCount(self):
+        return len(self._sim.capacity)
+
+    def getVehicleCount(self, stopID):
+        if stopID not in self._sim.occupancy:
+            raise TraCIException("Parking area '%s' is not known." % stopID)
+        return self._sim.occupancy[stopID]
+
+    def getVehicleIDs(self, stopID):
+        return tuple(vehicle.id for vehicle in self._sim.running.values()
+                     if vehicle.state in (PARKED, ENDING) and vehicle.stops[0][0] == stopID)
+
+    def subscribe(self, objectID, varIDs=None, begin=INVALID_DOUBLE_VALUE, end=INVALID_DOUBLE_VALUE,
+                  parameters=None):
+        self.getVehicleCount(objectID)
+        for varID in varIDs or ():
+            if varID != constants.VAR_STOP_STARTING_VEHICLES_NUMBER:
+                raise TraCIException("Variable 0x%x is not supported by the stand-in simulator." % varID)
+        if varIDs:
+            self._sim.areaSubscriptions[objectID] = tuple(varIDs)
+            self._sim.areaSubscriptionResults[objectID] = self._read(objectID)
+        else:
+            self.unsubscribe(objectID)
+
+    def unsubscribe(self, objectID):
+        self._sim.areaSubscriptions.pop(objectID, None)
+        self._sim.areaSubscriptionResults.pop(objectID, None)
+
+    def _read(self, objectID):
+        return dict((varID, self._sim.occupancy[objectID]) for varID in self._sim.areaSubscriptions[objectID])
+
+    def _updateSubscriptions(self):
+        for objectID in self._sim.areaSubscriptions:
+            self._sim.areaSubscriptionResults[objectID] = self._read(objectID)
+
+    def getSubscriptionResults(self, objectID):
+        return self._sim.areaSubscriptionResults.get(objectID, {})
+
+    def getAllSubscriptionResults(self):
+        return dict(self._sim.areaSubscriptionResults)
+
+
+class _SimulationDomain(object):
+
+    def __init__(self, sim):
+        self._sim = sim
+
+    def getTime(self):
+        return float(self._sim.time)
+
+    def getMinExpectedNumber(self):
+        return len(self._sim.running) + len(self._sim.pending) - self._sim.nextPending
+
+    def getParkingEndingVehiclesIDList(self):
+        return tuple(self._sim.endingVehicles)
+
+    def getParkingEndingVehiclesNumber(self):
+        return len(self._sim.endingVehicles)
+
+    def getArrivedIDList(self):
+        return tuple(self._sim.arrivedVehicles)
+
+    def getDepartedIDList(self):
+        return tuple(self._sim.departedVehicles)
+
+    def saveState(self, fileName):
+        self._sim.saveState(fileName)
+
+    def loadState(self, fileName):
+        self._sim.loadState(fileName)
+
+
+# Values of the simulation saved by saveState, subscriptions excluded
+STATE = ("time", "capacity", "occupancy", "queues", "pending", "nextPending", "running", "endingVehicles",
+         "arrivedVehicles", "departedVehicles")
+
+
+# Stand-in for the traci module: runner.py only needs the attributes below
+class FakeTraci(object):
+
+    def __init__(self, departTravelTime=18, longTravelTime=60, shortTravelTime=6):
+        self.departTravelTime = departTravelTime
+        self.longTravelTime = longTravelTime
+        self.shortTravelTime = shortTravelTime
+        self.vehicle = _VehicleDomain(self)
+        self.parkingarea = _ParkingAreaDomain(self)
+        self.simulation = _SimulationDomain(self)
+        self.constants = constants
+        self.TraCIException = TraCIException
+        self._reset()
+
+    def _reset(self):
+        self.time = 0
+        self.capacity = {}
+        self.occupancy = {}
+        self.queues = {}
+        self.pending = []
+        self.nextPending = 0
+        self.running = {}
+        self.endingVehicles = []
+        self.arrivedVehicles = []
+        self.departedVehicles = []
+        self.subscriptions = {}
+        self.subscriptionResults = {}
+        self.areaSubscriptions = {}
+        self.areaSubscriptionResults = {}
+
+    def getVersion(self):
+        return (21, "FakeTraci")
+
+    # Accepts the same command line as traci.start, only the input files are read
+    def start(self, cmd, port=None, numRetries=None, label="default", verbose=False, **kwargs):
+        self._reset()
+        routeFiles = []
+        additionalFiles = []
+        stateFile = None
+        for pos, option in enumerate(cmd):
+            if option in ("-c", "--configuration-file"):
+                routes, additionals = self._readConfig(cmd[pos + 1])
+                routeFiles += routes
+                additionalFiles += additionals
+            elif option in ("-r", "--route-files"):
+                routeFiles += cmd[pos + 1].split(",")
+            elif option in ("-a", "--additional-files"):
+                additionalFiles += cmd[pos + 1].split(",")
+            elif option == "--load-state":
+                stateFile = cmd[pos + 1]
+
+        for additionalFile in additionalFiles:
+            self.loadAdditional(additionalFile)
+        for routeFile in routeFiles:
+            self.loadRoutes(routeFile)
+        if stateFile is not None:
+            self.loadState(stateFile)
+        return self.getVersion()
+
+    def close(self, wait=True):
+        self._reset()
+
+    def _readConfig(self, configFile):
+        baseDir = os.path.dirname(configFile)
+        root = ET.parse(configFile).getroot()
+
+        def files(tag):
+            return [os.path.join(baseDir, name) for element in root.iter(tag)
+                    for name in element.attrib.get("value", "").split(",") if name]
+
+        return files("route-files"), files("additional-files")
+
+    def loadAdditional(self, additionalFile):
+        for parkingArea in ET.parse(additionalFile).getroot().iter("parkingArea"):
+            parkID = parkingArea.attrib["id"]
+            capacity = int(parkingArea.attrib.get("roadsideCapacity", 0)) + len(parkingArea.findall("space"))
+            self.capacity[parkID] = capacity
+            self.occupancy[parkID] = 0
+            self.queues[parkID] = []
+
+    def loadRoutes(self, routeFile):
+        for event, trip in ET.iterparse(routeFile):
+            if trip.tag not in ("trip", "vehicle"):
+                continue
+            params = {}
+            stops = []
+            for child in trip:
+                if child.tag == "param":
+                    params[child.attrib["key"]] = child.attrib["value"]
+                elif child.tag == "stop" and "parkingArea" in child.attrib:
+                    stops.append([child.attrib["parkingArea"], float(child.attrib.get("duration", 0))])
+            self.pending.append(_Vehicle(trip.attrib["id"], float(trip.attrib.get("depart", 0)), stops, params))
+            trip.clear()
+        self.pending.sort(key=lambda vehicle: vehicle.depart)
+
+    # Function to write the state of the simulation (a pickle, not the XML of SUMO)
+    def saveState(self, fileName):
+        with open(fileName, "wb") as f:
+            pickle.dump(dict((name, getattr(self, name)) for name in STATE), f, pickle.HIGHEST_PROTOCOL)
+
+    # Like SUMO, the vehicles are replaced and lose their subscriptions, the parking areas keep them
+    def loadState(self, fileName):
+        with open(fileName, "rb") as f:
+            state = pickle.load(f)
+        for name in STATE:
+            setattr(self, name, state[name])
+        self.subscriptions = {}
+        self.subscriptionResults = {}
+        self.parkingarea._updateSubscriptions()
+
+    def travelTime(self, fromParkArea, toParkArea):
+        if fromParkArea == toParkArea:
+            return self.shortTravelTime
+        return self.longTravelTime
+
+    def _park(self, vehicle, parkArea):
+        self.occupancy[parkArea] += 1
+        vehicle.state = PARKED
+        vehicle.remaining = vehicle.stops[0][1]
+
+    def _reachStop(self, vehicle):
+        if not vehicle.stops:
+            del self.running[vehicle.id]
+            self.arrivedVehicles.append(vehicle.id)
+            return
+        parkArea = vehicle.stops[0][0]
+        if self.occupancy[parkArea] < self.capacity[parkArea] and not self.queues[parkArea]:
+            self._park(vehicle, parkArea)
+        else:
+            vehicle.state = WAITING
+            self.queues[parkArea].append(vehicle)
+
+    def simulationStep(self, step=0.):
+        targetTime = max(step, self.time + 1)
+        while self.time < targetTime:
+            self._step()
+
+    def _step(self):
+        now = self.time
+        self.endingVehicles = []
+        self.arrivedVehicles = []
+        self.departedVehicles = []
+        freedParks = []
+
+        for vehicle in list(self.running.values()):
+            if vehicle.state == ENDING:
+                parkArea = vehicle.stops.pop(0)[0]
+                self.occupancy[parkArea] -= 1
+                freedParks.append(parkArea)
+                vehicle.state = DRIVING
+                nextParkArea = vehicle.stops[0][0] if vehicle.stops else None
+                vehicle.timer = self.travelTime(parkArea, nextParkArea)
+            elif vehicle.state == PARKED:
+                vehicle.remaining -= 1
+                if vehicle.remaining <= 0:
+                    vehicle.state = ENDING
+                    self.endingVehicles.append(vehicle.id)
+            elif vehicle.state == DRIVING:
+                vehicle.timer -= 1
+                if vehicle.timer <= 0:
+                    self._reachStop(vehicle)
+
+        # Queuing vehicles take the slots released in this step
+        for parkArea in freedParks:
+            queue = self.queues[parkArea]
+            while queue and self.occupancy[parkArea] < self.capacity[parkArea]:
+                self._park(queue.pop(0), parkArea)
+
+        while self.nextPending < len(self.pending) and self.pending[self.nextPending].depart <= now:
+            vehicle = self.pending[self.nextPending]
+            self.pending[self.nextPending] = None
+            self.nextPending += 1
+            vehicle.timer = self.departTravelTime
+            self.running[vehicle.id] = vehicle
+            self.departedVehicles.append(vehicle.id)
+
+        self.time = now + 1
+        self.vehicle._updateSubscriptions()
+        self.parkingarea._updateSubscriptions()
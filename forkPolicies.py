@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    forkPolicies.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Compares policies of the coordinator starting all of them from the same
+warmed-up simulation.
+
+The scenario runs once until --warmup steps and saves a checkpoint (see
+checkpoint.py). Every policy then starts from that checkpoint in its own
+process of a pool, with its own SUMO instance (or the stand-in simulator with
+--fake), and runs until the end (or for --tail steps). A policy is a list of
+NAME=VALUE: the options strategy, reservationStrategy, batch and auction of
+runner.py or the free parks and auction price settings of Config.
+
+    python3 forkPolicies.py --fake --warmup 2000 --policy strategy=free --policy strategy=occupancy \\
+        --policy CONSTANT_FREE_PARKS=2 --policy auction=second
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import time
+import shutil
+import optparse
+import tempfile
+import contextlib
+import concurrent.futures
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+COLUMNS = ["policy", "changedRoute", "noPark", "unsatisfiedReservations", "noFoundReservation", "endParkGood",
+           "endParkBad", "totalEndPark", "finishTime", "steps", "seconds"]
+# Options of run() a policy can set, with the function converting their value
+RUN_OPTIONS = {
+    "strategy": str,
+    "reservationStrategy": str,
+    "batch": lambda value: value.lower() in ("1", "true", "yes"),
+    "auction": lambda value: None if value.lower() in ("", "none") else value,
+}
+# Settings of Config a policy can change: the other ones describe the scenario
+POLICY_SETTINGS = ("standardAuctionPrice", "constantFreeParks", "initialConstantFreeParks", "initialFreeParks",
+                   "timeInitialConstantFreeParks", "refreshFreeParks")
+DEFAULT_POLICY = {"strategy": "free", "reservationStrategy": "reservation", "batch": False, "auction": None}
+
+
+# Function to start the simulation of a worker, with the options of checkpoint.sumoOptions
+def startBackend(settings, sumoOptions):
+    import runner
+    import fakeTraci
+
+    sumoConfig = os.path.join("data", settings["config"].sumoConfigFile)
+    if settings["fake"]:
+        runner.useBackend(fakeTraci.FakeTraci())
+        runner.traci.start(["sumo", "-c", sumoConfig] + sumoOptions)
+    else:
+        import traci
+        runner.useBackend(traci)
+        traci.start([runner.checkBinary("sumo"), "-c", sumoConfig] + sumoOptions, label=settings["label"])
+    return runner
+
+
+# Function to run the scenario until the checkpoint all the policies start from, it is called in a worker process
+def warmUp(settings):
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import checkpoint
+
+    runner = startBackend(settings, checkpoint.sumoOptions())
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            runner.run(settings["config"], settings["subscribe"], checkpointDir=settings["checkpointDir"],
+                       checkpointEvery=settings["warmup"], stopStep=settings["warmup"])
+    finally:
+        runner.traci.close()
+    return checkpoint.latest(settings["checkpointDir"])
+
+
+# Function to run one policy from the checkpoint, it is called in a worker process
+def runPolicy(settings):
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import checkpoint
+
+    base = settings["checkpoint"]
+    resumeState = checkpoint.load(base)
+    runner = startBackend(settings, checkpoint.sumoOptions(base))
+    options = settings["options"]
+    stopStep = None if settings["tail"] is None else settings["warmup"] + settings["tail"]
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = runner.run(settings["config"], settings["subscribe"], options["strategy"],
+                                 options["reservationStrategy"], options["batch"], options["auction"],
+                                 resumeState=resumeState, stopStep=stopStep)
+    finally:
+        runner.traci.close()
+    results["seconds"] = round(time.perf_counter() - start, 3)
+    results["policy"] = settings["name"]
+    if settings["results"] is not None:
+        import runResults
+        runResults.appendRecord(settings["results"], runResults.makeRecord(
+            settings["config"], results, backend="fake" if settings["fake"] else "traci",
+            subscribe=settings["subscribe"], warmup=settings["warmup"], **options))
+    return results
+
+
+# Function to read a policy "NAME=VALUE,NAME=VALUE": the options of run() and the changed settings
+def parsePolicy(text, baseConfig):
+    options = dict(DEFAULT_POLICY)
+    settings = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        if "=" not in item:
+            raise ValueError("Policy setting '%s' must be NAME=VALUE" % item)
+        name, value = [part.strip() for part in item.split("=", 1)]
+        if name in RUN_OPTIONS:
+            options[name] = RUN_OPTIONS[name](value)
+        else:
+            settings[name] = value
+    config = baseConfig.replace(**settings)
+    changed = [field for field, value in config.asDict().items() if value != getattr(baseConfig, field)]
+    scenario = [field for field in changed if field not in POLICY_SETTINGS]
+    if scenario:
+        raise ValueError("Policy '%s' changes the scenario (%s), only %s can change" % (
+            text, ", ".join(scenario), ", ".join(POLICY_SETTINGS)))
+    return config, options
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--policy", dest="policies", action="append", default=[], metavar="NAME=VALUE,...",
+                         help="a policy to compare, e.g. strategy=occupancy or CONSTANT_FREE_PARKS=2,batch=1 "
+                              "(can be repeated)")
+    optParser.add_option("--warmup", type="int", default=2000,
+                         help="steps run once before the policies start, default: %default")
+    optParser.add_option("--tail", type="int",
+                         help="steps run by each policy after the warm-up, default: until the end")
+    optParser.add_option("-j", "--jobs", type="int", default=os.cpu_count(),
+                         help="number of policies run at the same time, default: %default")
+    optParser.add_option("--fake", action="store_true",
+                         default=False, help="run the in-process stand-in simulator instead of sumo")
+    optParser.add_option("--subscribe", action="store_true",
+                         default=False, help="read the vehicles' stops and stop state through TraCI subscriptions")
+    optParser.add_option("--checkpoint-dir", dest="checkpointDir",
+                         help="keep the warm-up checkpoint in this directory (default: a temporary one)")
+    optParser.add_option("--results",
+                         help="append the record of every policy to this file, JSON lines or CSV if it ends with .csv")
+    optParser.add_option("--config", dest="config",
+                         help="JSON file with the settings that differ from data/constants.py")
+    optParser.add_option("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                         help="change a setting of the scenario, e.g. --set RANDOM_POPULATION=50 (can be repeated)")
+    options, args = optParser.parse_args()
+    return optParser, options
+
+
+def printTable(rows):
+    widths = [max(len(column), max(len(str(row[column])) for row in rows)) for column in COLUMNS]
+    print("  ".join(column.rjust(width) for column, width in zip(COLUMNS, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).rjust(width) for column, width in zip(COLUMNS, widths)))
+
+
+if __name__ == "__main__":
+    optParser, options = get_options()
+    sys.path.insert(0, ROOT)
+    from data.config import Config
+    try:
+        baseConfig = Config.load(options.config, options.settings)
+        policies = [(text,) + parsePolicy(text, baseConfig) for text in options.policies or ["strategy=free"]]
+    except (OSError, TypeError, ValueError) as e:
+        sys.exit("Invalid configuration: %s" % e)
+    for fileName in (baseConfig.sumoConfigFile, baseConfig.demandFile):
+        if not os.path.exists(os.path.join(ROOT, "data", fileName)):
+            optParser.error("missing data/%s" % fileName)
+    if not options.fake:
+        import runner
+        if runner.traci is None:
+            sys.exit("Please set environment variable 'SUMO_HOME'")
+
+    checkpointDir = options.checkpointDir or tempfile.mkdtemp(prefix="warmup")
+    checkpointDir = os.path.abspath(checkpointDir)
+    common = {"fake": options.fake, "subscribe": options.subscribe, "warmup": options.warmup, "tail": options.tail,
+              "results": options.results and os.path.abspath(options.results)}
+    try:
+        start = time.perf_counter()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, min(options.jobs, len(policies)))) as pool:
+            base = pool.submit(warmUp, dict(common, config=baseConfig, checkpointDir=checkpointDir,
+                                            label="warmup")).result()
+            if base is None:
+                sys.exit("The simulation ended before step %s" % options.warmup)
+            warmupSeconds = time.perf_counter() - start
+            rows = list(pool.map(runPolicy, [
+                dict(common, name=name, config=config, options=runOptions, checkpoint=base, label="policy%s" % pos)
+                for pos, (name, config, runOptions) in enumerate(policies)]))
+    finally:
+        if options.checkpointDir is None:
+            shutil.rmtree(checkpointDir, ignore_errors=True)
+    printTable(rows)
+    print("Warm-up of %s steps in %.1f s, %s policies in %.1f s" % (
+        options.warmup, warmupSeconds, len(rows), time.perf_counter() - start - warmupSeconds))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    libsumoBackend.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Runs SUMO in the same process through libsumo, with the interface of the
+traci module used by the coordinator, so there is no socket round-trip per
+call.
+
+libsumo is a C++ binding and differs from traci on a few calls:
+- setParameter takes only strings, traci converts the value;
+- arguments must be Python ints, floats and strings: NumPy scalars (batch
+  allocation) are refused by replaceStop;
+- vehicle subscriptions cannot ask the stops (VAR_NEXT_STOPS2), the variable
+  is left out and SubscribedVehicleSnapshot reads the stops with getStops,
+  which is cheap in process;
+- there is no GUI and only one simulation per process.
+"""
+
+from __future__ import absolute_import
+
+INVALID_DOUBLE_VALUE = -1073741824.0
+
+
+# Function to get the backend driving libsumo, None when libsumo cannot be imported
+def load():
+    try:
+        import libsumo
+    except ImportError:
+        return None
+    return LibsumoBackend(libsumo)
+
+
+class LibsumoBackend(object):
+
+    def __init__(self, libsumo):
+        self.libsumo = libsumo
+        self.vehicle = VehicleDomain(libsumo.vehicle, libsumo.constants)
+
+    # Anything else (start, simulationStep, simulation, parkingarea, constants, ...) is the one of libsumo
+    def __getattr__(self, name):
+        return getattr(self.libsumo, name)
+
+    # libsumo ignores the label of traci.start
+    def start(self, cmd, label="default", **kwargs):
+        return self.libsumo.start(cmd)
+
+
+class VehicleDomain(object):
+
+    def __init__(self, domain, constants):
+        self.domain = domain
+        self.unsupported = (constants.VAR_NEXT_STOPS2,)  # Variables libsumo cannot subscribe
+
+    def __getattr__(self, name):
+        return getattr(self.domain, name)
+
+    def setParameter(self, objectID, key, value):
+        self.domain.setParameter(objectID, key, str(value))
+
+    def replaceStop(self, vehID, nextStopIndex, edgeID, pos=1., laneIndex=0, duration=INVALID_DOUBLE_VALUE,
+                    flags=0, startPos=INVALID_DOUBLE_VALUE, until=INVALID_DOUBLE_VALUE, teleport=0):
+        self.domain.replaceStop(str(vehID), int(nextStopIndex), str(edgeID), float(pos), int(laneIndex),
+                                float(duration), int(flags), float(startPos), float(until), int(teleport))
+
+    def subscribe(self, objectID, varIDs=None, begin=INVALID_DOUBLE_VALUE, end=INVALID_DOUBLE_VALUE,
+                  parameters=None):
+        if varIDs is None:
+            return self.domain.subscribe(objectID)
+        varIDs = [varID for varID in varIDs if varID not in self.unsupported]
+        parameters = dict((varID, value) for varID, value in (parameters or {}).items() if varID in varIDs)
+        if parameters:
+            return self.domain.subscribe(objectID, varIDs, begin, end, parameters)
+        return self.domain.subscribe(objectID, varIDs, begin, end)
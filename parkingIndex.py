@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    parkingIndex.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+State of the parking areas used to find a new park for a vehicle.
+
+For every area the index keeps its reservations, its free parks threshold,
+its occupancy and its capacity. The areas are split in groups (ParkArea,
+ParkAreaAlternative, ParkAreaOutOfTown), each one in preference order, and for
+every feasibility predicate a FeasibleTree per group answers "first area of
+the group satisfying the predicate" in O(log n). Trees are updated only for
+the areas whose values changed.
+"""
+
+from __future__ import absolute_import
+
+from array import array
+
+
+# Predicates on (reservations, free parks threshold, occupancy, capacity)
+# They work on ints and on NumPy arrays of the same values (see batchAllocation.py)
+def hasFreeReservation(reservations, freeParks, occupancy, capacity):
+    return reservations < capacity - freeParks
+
+
+def hasFreePark(reservations, freeParks, occupancy, capacity):
+    return (freeParks != 0) & (reservations + freeParks < capacity) & (occupancy < capacity)
+
+
+def hasFreeSlotAboveThreshold(reservations, freeParks, occupancy, capacity):
+    return (freeParks > 0) & (occupancy < capacity - freeParks)
+
+
+def hasFreeSlot(reservations, freeParks, occupancy, capacity):
+    return (occupancy < capacity) & (reservations < capacity)
+
+
+PREDICATES = {
+    "reservation": hasFreeReservation,  # changeReservation
+    "free": hasFreePark,  # goToFreePark
+    "occupancy": hasFreeSlotAboveThreshold,  # changePark
+    "outOfTown": hasFreeSlot,  # goToNoSystemPark
+}
+
+
+# How many parks of an area are kept free
+class FreeParksRule(object):
+
+    def __init__(self, initialFreeParks, initialConstantFreeParks, timeInitialConstantFreeParks,
+                 constantFreeParks, noFreeParksGroups=()):
+        self.initialFreeParks = initialFreeParks
+        self.initialConstantFreeParks = initialConstantFreeParks
+        self.timeInitialConstantFreeParks = timeInitialConstantFreeParks
+        self.constantFreeParks = constantFreeParks
+        self.noFreeParksGroups = noFreeParksGroups
+
+    # The threshold of every area can change when the phase changes
+    def phase(self, simulationTime):
+        return simulationTime < self.timeInitialConstantFreeParks
+
+    def threshold(self, groupName, freeParks, simulationTime):
+        if groupName in self.noFreeParksGroups:
+            return 0
+        contFreeParks = self.initialFreeParks
+        if freeParks is not None:
+            contFreeParks = freeParks
+        if simulationTime < self.timeInitialConstantFreeParks:
+            contFreeParks = self.initialConstantFreeParks
+        if self.constantFreeParks != -1:
+            contFreeParks = self.constantFreeParks
+        return contFreeParks
+
+
+# Segment tree over booleans that finds the first True position
+class FeasibleTree(object):
+
+    def __init__(self, size):
+        self.size = 1
+        while self.size < size:
+            self.size *= 2
+        self.counts = array("i", [0] * (2 * self.size))
+
+    def set(self, pos, value):
+        node = pos + self.size
+        value = 1 if value else 0
+        if self.counts[node] == value:
+            return
+        self.counts[node] = value
+        node //= 2
+        while node:
+            self.counts[node] = self.counts[2 * node] + self.counts[2 * node + 1]
+            node //= 2
+
+    def get(self, pos):
+        return self.counts[pos + self.size] == 1
+
+    def first(self):
+        if not self.counts[1]:
+            return -1
+        node = 1
+        while node < self.size:
+            node *= 2
+            if not self.counts[node]:
+                node += 1
+        return node - self.size
+
+
+class ParkingIndex(object):
+
+    # groups: list of (group name, areas in preference order)
+    # thresholdRule: FreeParksRule
+    # readOccupancy: function (area) -> number of vehicles parked in the area
+    def __init__(self, groups, capacity, thresholdRule, readOccupancy, predicates=PREDICATES):
+        self.groupNames = [name for name, areas in groups]
+        self.areas = []
+        self.group = []  # area -> group name
+        self.groupPos = []  # area -> position in its group
+        self.position = {}  # name -> area
+        for name, areas in groups:
+            for pos, parkArea in enumerate(areas):
+                self.position[parkArea] = len(self.areas)
+                self.areas.append(parkArea)
+                self.group.append(name)
+                self.groupPos.append(pos)
+        self.groupAreas = dict((name, list(areas)) for name, areas in groups)
+        count = len(self.areas)
+        self.capacity = array("i", [capacity] * count)
+        self.threshold = array("i", [0] * count)
+        self.occupancy = array("i", [0] * count)
+        self.occupancyStale = True
+        self.thresholdRule = thresholdRule
+        self.readOccupancy = readOccupancy
+        self.time = 0
+        self.reservations = {}  # keeps track of the number of reservations for each park
+        self.freeParks = {}  # Number of free park that parkarea must have
+        self.predicates = dict(predicates)
+        self.trees = dict(((predicate, name), FeasibleTree(len(areas)))
+                          for predicate in self.predicates for name, areas in groups)
+        for area in range(count):
+            self._updateThreshold(area)
+
+    def __contains__(self, parkArea):
+        return parkArea in self.position
+
+    # readOccupancy reads the simulation: a pickled index gets it again with attach()
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["readOccupancy"] = None
+        return state
+
+    def attach(self, readOccupancy):
+        self.readOccupancy = readOccupancy
+        self.occupancyStale = True
+
+    def _update(self, area):
+        values = (self.reservations.get(self.areas[area], 0), self.threshold[area], self.occupancy[area],
+                  self.capacity[area])
+        for predicate, test in self.predicates.items():
+            self.trees[(predicate, self.group[area])].set(self.groupPos[area], test(*values))
+
+    def _updateThreshold(self, area):
+        self.threshold[area] = self.thresholdRule.threshold(self.group[area], self.freeParks.get(self.areas[area]),
+                                                            self.time)
+        self._update(area)
+
+    # Function to change how many parks are kept free, e.g. for an experiment started from a checkpoint
+    def setThresholdRule(self, thresholdRule):
+        self.thresholdRule = thresholdRule
+        for area in range(len(self.areas)):
+            self._updateThreshold(area)
+
+    # Function called at the beginning of every step: occupancies are read again on the first query
+    def newStep(self, simulationTime):
+        oldTime = self.time
+        self.time = simulationTime
+        self.occupancyStale = True
+        if self.thresholdRule.phase(oldTime) != self.thresholdRule.phase(simulationTime):
+            for area in range(len(self.areas)):
+                self._updateThreshold(area)
+
+    def refreshOccupancy(self):
+        self.occupancyStale = False
+        for area, parkArea in enumerate(self.areas):
+            occupancy = int(self.readOccupancy(parkArea))
+            if occupancy != self.occupancy[area]:
+                self.occupancy[area] = occupancy
+                self._update(area)
+
+    def getOccupancy(self, parkArea):
+        if self.occupancyStale:
+            self.refreshOccupancy()
+        return self.occupancy[self.position[parkArea]]
+
+    def getRemaining(self, parkArea):
+        return self.capacity[self.position[parkArea]] - self.getOccupancy(parkArea)
+
+    def getThreshold(self, parkArea):
+        return self.threshold[self.position[parkArea]]
+
+    def getReservations(self, parkArea):
+        return self.reservations.get(parkArea, 0)
+
+    def addReservation(self, parkArea, delta=1):
+        self.reservations[parkArea] = self.reservations.get(parkArea, 0) + delta
+        if parkArea in self.position:
+            self._update(self.position[parkArea])
+        return self.reservations[parkArea]
+
+    # Function to ask one more free park to a park where someone did not respect the reservation
+    def addFreePark(self, parkArea, maxFreeParks):
+        if parkArea not in self.freeParks:
+            self.freeParks[parkArea] = 1
+        elif self.freeParks[parkArea] < maxFreeParks:
+            self.freeParks[parkArea] = self.freeParks[parkArea] + 1
+        else:
+            return
+        if parkArea in self.position:
+            self._updateThreshold(self.position[parkArea])
+
+    def clearFreeParks(self):
+        changed = [self.position[parkArea] for parkArea in self.freeParks if parkArea in self.position]
+        self.freeParks.clear()
+        for area in changed:
+            self._updateThreshold(area)
+
+    # Function to find the first area satisfying predicate, looking at groups in the given order
+    def first(self, predicate, groupNames):
+        if self.occupancyStale:
+            self.refreshOccupancy()
+        for name in groupNames:
+            pos = self.trees[(predicate, name)].first()
+            if pos >= 0:
+                return self.groupAreas[name][pos]
+        return None
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    runResults.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Structured results of the runs of the coordinator.
+
+Every run gives one record: the settings of its Config with their hash, the
+options of the run, the KPIs and the timing. appendRecord adds it to a JSON
+lines file (.jsonl) or to a CSV file (.csv) with a single write while the
+file is locked, so the runs of parallel processes can share a file and a
+record is never half written. loadTable reads any number of these files in
+one pass into columns, ready for pandas.DataFrame.
+"""
+
+from __future__ import absolute_import
+
+import os
+import io
+import csv
+import json
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Columns kept as text by the CSV loader, the other ones are JSON values
+TEXT_COLUMNS = ("configHash", "prefix", "backend", "strategy", "reservationStrategy", "auction")
+# Columns written first in a new CSV file, the other keys of the record follow in alphabetical order
+FIRST_COLUMNS = ("configHash", "startTime", "backend", "strategy", "reservationStrategy", "batch", "auction",
+                 "subscribe")
+
+
+# Function to put together the settings, the options and the results of a run
+def makeRecord(config, results, **runOptions):
+    record = config.asDict()
+    record.update(runOptions)
+    record.update(results)
+    return record
+
+
+def formatCell(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def parseCell(column, cell):
+    if cell == "":
+        return None
+    if column in TEXT_COLUMNS:
+        return cell
+    return json.loads(cell)
+
+
+def csvColumns(record):
+    first = [column for column in FIRST_COLUMNS if column in record]
+    return first + sorted(column for column in record if column not in first)
+
+
+def csvText(rows):
+    text = io.StringIO()
+    csv.writer(text, lineterminator="\n").writerows(rows)
+    return text.getvalue()
+
+
+# Function to append a record to a .jsonl or .csv file
+def appendRecord(fileName, record):
+    fd = os.open(fileName, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        if not fileName.endswith(".csv"):
+            data = json.dumps(record) + "\n"
+        elif os.fstat(fd).st_size == 0:
+            columns = csvColumns(record)
+            data = csvText([columns, [formatCell(record.get(column)) for column in columns]])
+        else:
+            with open(fileName, newline="") as f:
+                columns = next(csv.reader(f))
+            unknown = sorted(set(record) - set(columns))
+            if unknown:
+                raise ValueError("%s does not have the columns %s" % (fileName, ", ".join(unknown)))
+            data = csvText([[formatCell(record.get(column)) for column in columns]])
+        data = data.encode()
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
+
+
+# Function to read the records of some .jsonl or .csv files one by one
+def loadRecords(fileNames):
+    for fileName in fileNames:
+        with open(fileName, newline="") as f:
+            if fileName.endswith(".csv"):
+                for row in csv.DictReader(f):
+                    yield dict((column, parseCell(column, cell)) for column, cell in row.items())
+            else:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+# Function to read the records of some files into a table: column -> list of values, None where a record
+# does not have the column. pandas.DataFrame(loadTable(fileNames)) gives one row for each run
+def loadTable(fileNames):
+    table = {}
+    rows = 0
+    for record in loadRecords(fileNames):
+        for column, value in record.items():
+            if column not in table:
+                table[column] = [None] * rows
+            table[column].append(value)
+        rows += 1
+        for values in table.values():
+            if len(values) < rows:
+                values.append(None)
+    return table
@@ -17,472 +17,328 @@
 
 from __future__ import absolute_import
 from __future__ import print_function
-from data.constants import DOUBLE_ROWS, SLOTS_PER_ROW, STANDARD_AUCTION_PRICE, PARKAREA_NAMES, RANDOM_POPULATION, CONSTANT_FREE_PARKS, INITIAL_CONSTANT_FREE_PARKS
-from data.constants import STARTING_STOP, MAX_DURATION, SLOT_DURATION, TIME_INITIAL_CONSTANT_FREE_PARKS, REFRESH_FREE_PARKS, INITIAL_FREE_PARKS, NUMBER_GOOD_VEHICLES, NUMBER_BAD_VEHICLES
 import os
 import sys
-import math
+import json
+import time
 import optparse
-# import xml.etree.ElementTree as ET
-from lxml import etree
+from array import array
 
 if 'SUMO_HOME' in os.environ:
     tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
     sys.path.append(tools)
-else:
-    sys.exit("Please set environment variable 'SUMO_HOME'")
 
-from sumolib import checkBinary
-import traci
+# The stand-in simulator (--fake) does not need a SUMO installation
+try:
+    from sumolib import checkBinary
+    import traci
+except ImportError:
+    checkBinary = None
+    traci = None
+
+from data.config import Config
+import fakeTraci
+from vehicleState import VehicleTable
+from tripSchedule import TripSchedule
+from vehicleSnapshot import VehicleSnapshot, SubscribedVehicleSnapshot
+from vehicleAttributes import AttributeCache
+import coordinatorLog
+from coordinatorLog import Lazy, allocationLog, billingLog, reputationLog, stepLog
+from parkingIndex import ParkingIndex, FreeParksRule
+from eventQueue import EventQueue
+from allocation import AllocationEngine, Strategy, sameGroupFirst, inOrder
+import runResults
+from stepProfiler import PhaseProfiler, NullProfiler
+import checkpoint
+
+STRATEGY_NAMES = ("free", "occupancy", "outOfTown", "reservation")
+# Counters of run() saved in a checkpoint
+COUNTERS = ("problem", "contNoPark", "contSamePark", "contEndPark", "contBadBehaviourVehicles", "newWallet",
+            "simulationTime", "unsatisfiedReservationsCont", "noFoundReservationCont", "contTemp")
+
+
+# Ways to find a new park: a parkingIndex predicate and the groups of areas where it is looked for
+def buildStrategies(config):
+    town = config.districtNames
+    return {
+        "reservation": Strategy("reservation", sameGroupFirst, town),  # fewer reservations than the threshold
+        "free": Strategy("free", sameGroupFirst, town),  # free parks kept for vehicles without a park
+        "occupancy": Strategy("occupancy", sameGroupFirst, town),  # fewer vehicles than the threshold
+        "outOfTown": Strategy("outOfTown", inOrder, config.parkAreaNames[2:], checkStops=False),
+    }
+
+# Vehicle values read by the coordinator during the current step, it is set by run()
+snapshot = None
+# Reputation and wallet of the vehicles, it is loaded by run()
+attributes = None
+# Reservations, free parks and occupancy of the parking areas, it is built by run()
+parking = None
+# Strategies used to find a new park, it is built by run()
+allocation = None
+# Recorder of the state of the parking areas in every step, built by run() when asked
+timeSeries = None
+
+# Function to choose who runs the simulation: the traci module, libsumoBackend.LibsumoBackend or fakeTraci.FakeTraci
+def useBackend(backend):
+    global traci
+    traci = backend
 
 # Function to check if the vehicle's user has enough money to pay
-def checkWallet(duration, idVehicle):
+def checkWallet(config, duration, idVehicle):
     extraCost = 0
-    reviewStars = int(traci.vehicle.getParameter(idVehicle, "reviewStars"))
-    cost = int(duration / SLOT_DURATION * STANDARD_AUCTION_PRICE)
+    vehicle = attributes.get(idVehicle)
+    reviewStars = vehicle.reviewStars
+    cost = int(duration / config.slotDuration * config.standardAuctionPrice)
 
     if reviewStars < 3:
         extraCost = int(cost * 25 / 100)
 
-    currentCredit = int(traci.vehicle.getParameter(idVehicle, "wallet"))
-    print("Credit:", str(currentCredit))
+    currentCredit = vehicle.wallet
+    billingLog.debug("Credit: %s", currentCredit)
     newWallet = currentCredit - int(cost + extraCost)
 
     if newWallet < 0:
-        print("Insufficient credit!")
+        billingLog.info("Insufficient credit!")
         return 0
 
     return newWallet
 
+# Function to compute the sealed bid of the vehicle's user, it is a price for each slot duration of park
+def auctionBid(config, duration, idVehicle):
+    vehicle = attributes.get(idVehicle)
+    # Users with a better reputation value the park more
+    value = config.standardAuctionPrice * (1 + vehicle.reviewStars / 5)
+    slots = duration / config.slotDuration
+    if slots <= 0:
+        return value
+
+    # Nobody bids more than he can pay, with the extra cost of a bad reputation
+    extraCost = 1
+    if vehicle.reviewStars < 3:
+        extraCost = 1.25
+    return min(value, vehicle.wallet / (slots * extraCost))
+
+# Function to compute what the user pays for a park won at price
+def auctionCharge(config, duration, idVehicle, price):
+    extraCost = 0
+    cost = int(duration / config.slotDuration * price)
+
+    if attributes.get(idVehicle).reviewStars < 3:
+        extraCost = int(cost * 25 / 100)
+
+    return int(cost + extraCost)
+
 # Function to change the vehicle's reputation
 def systemCharge(idVehicle):
-    reviewStars = int(traci.vehicle.getParameter(idVehicle, "reviewStars"))
-    delay = int(traci.vehicle.getParameter(idVehicle, "delay"))
+    vehicle = attributes.get(idVehicle)
+    reviewStars = vehicle.reviewStars
 
-    if delay > 0:
-        traci.vehicle.setParameter(idVehicle, "goodBehaviour", False)
+    if vehicle.delay > 0:
+        vehicle.set("goodBehaviour", False)
         if reviewStars == 0:
             return
-        warning = int(traci.vehicle.getParameter(idVehicle, "warning"))
-        warning = warning + 1
+        warning = vehicle.warning + 1
         if warning == 5:
             reviewStars = reviewStars - 1
-            traci.vehicle.setParameter(idVehicle, "reviewStars", reviewStars)
-            traci.vehicle.setParameter(idVehicle, "warning", 0)
+            vehicle.set("reviewStars", reviewStars)
+            vehicle.set("warning", 0)
         else:
-            traci.vehicle.setParameter(idVehicle, "warning", warning)
-            traci.vehicle.setParameter(idVehicle, "civil", 0)
+            vehicle.set("warning", warning)
+            vehicle.set("civil", 0)
     else:
-        traci.vehicle.setParameter(idVehicle, "goodBehaviour", True)
+        vehicle.set("goodBehaviour", True)
         if reviewStars == 5:
             return
-        civil = int(traci.vehicle.getParameter(idVehicle, "civil"))
-        civil = civil + 1
+        civil = vehicle.civil + 1
         if civil == 5:
             reviewStars = reviewStars + 1
-            traci.vehicle.setParameter(idVehicle, "reviewStars", reviewStars)
-            traci.vehicle.setParameter(idVehicle, "civil", 0)
-        else:
-            traci.vehicle.setParameter(idVehicle, "civil", civil)
-
-# Function to tell the vehicle's that his next destination is "OutOfTown"
-def goToNoSystemPark(idVehicle, duration, stopPos, numberCarsAboutToPark):
-    # Opposite Direction (left)
-    for row in range((math.ceil((NUMBER_GOOD_VEHICLES + NUMBER_BAD_VEHICLES) / 20) - 1), -1, -1):
-        contPark1 = 0
-        park1 = str("%s%s" % (PARKAREA_NAMES[2], row))
-        if park1 in numberCarsAboutToPark:
-            contPark1 = numberCarsAboutToPark[park1]
-
-        # print("contPark1:", contPark1)
-        if traci.parkingarea.getVehicleCount(park1) < SLOTS_PER_ROW and contPark1 < SLOTS_PER_ROW:
-            print("Changing park...")
-            traci.vehicle.replaceStop(idVehicle, stopPos, park1, flags=65, duration=duration,
-                                      startPos=0.0)
-            return str(park1)
-
-        contPark2 = 0
-        park2 = str("%s-%s" % (PARKAREA_NAMES[2], row))
-        if park2 in numberCarsAboutToPark:
-            contPark2 = numberCarsAboutToPark[park2]
-
-        # print("contPark2:", contPark2)
-        if traci.parkingarea.getVehicleCount(park2) < SLOTS_PER_ROW and contPark2 < SLOTS_PER_ROW:
-            print("Changing park...")
-            traci.vehicle.replaceStop(idVehicle, stopPos, park2, flags=65, duration=duration,
-                                      startPos=0.0)
-            return str(park2)
-
-    return "End"
-
-# Function that try to get a new reservation for the vehicle
-def changeReservation(idVehicle, parkArea, duration, stopPos, reservations, freeParks):
-    contStops = len(list(traci.vehicle.getStops(idVehicle, 0)))
-    print("Stops:", traci.vehicle.getStops(idVehicle, 0))
-    simulationTime = traci.simulation.getTime()
-    # In case the vehicle does not have stops
-    if contStops < 1:
-        return "End"
-
-    # Right Direction
-    if PARKAREA_NAMES[0] in parkArea:
-        parkAreaSuffix = PARKAREA_NAMES[0]
-        parkAreaSuffix2 = PARKAREA_NAMES[1]
-    if PARKAREA_NAMES[1] in parkArea:
-        parkAreaSuffix = PARKAREA_NAMES[1]
-        parkAreaSuffix2 = PARKAREA_NAMES[0]
-
-    for row in range(DOUBLE_ROWS):
-        contPark1 = 0
-        park1 = str("%s%s" % (parkAreaSuffix, row))
-        if park1 in reservations:
-            contPark1 = reservations[park1]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park1 in freeParks:
-            contFreeParks = freeParks[park1]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-        # contPark1 = int(traci.simulation.getParameter(("%s%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark1:", contPark1)
-        if contPark1 < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park1, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-
-            return str(park1)
-
-        contPark2 = 0
-        park2 = str("%s-%s" % (parkAreaSuffix, row))
-        if park2 in reservations:
-            contPark2 = reservations[park2]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park2 in freeParks:
-            contFreeParks = freeParks[park2]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-
-        # contPark2 = int(traci.simulation.getParameter(("%s-%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark2:", contPark2)
-        if contPark2 < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park2, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park2)
-
-    parkAreaSuffix = parkAreaSuffix2
-
-    for row in range(DOUBLE_ROWS):
-        contPark1 = 0
-        park1 = str("%s%s" % (parkAreaSuffix, row))
-        if park1 in reservations:
-            contPark1 = reservations[park1]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park1 in freeParks:
-            contFreeParks = freeParks[park1]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-        # contPark1 = int(traci.simulation.getParameter(("%s%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark1:", contPark1)
-        if contPark1 < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park1, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park1)
-
-        contPark2 = 0
-        park2 = str("%s-%s" % (parkAreaSuffix, row))
-        if park2 in reservations:
-            contPark2 = reservations[park2]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park2 in freeParks:
-            contFreeParks = freeParks[park2]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-        # contPark2 = int(traci.simulation.getParameter(("%s-%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark2:", contPark2)
-        if contPark2 < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park2, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park2)
-
-    return "End"
-
-    #parkingareaIdList = list(traci.parkingarea.getIDList())
-
-def goToFreePark(idVehicle, parkArea, duration, stopPos, reservations, freeParks):
-    contStops = len(list(traci.vehicle.getStops(idVehicle, 0)))
-    print("Stops:", traci.vehicle.getStops(idVehicle, 0))
-    simulationTime = traci.simulation.getTime()
-    # In case the vehicle does not have stops
-    if contStops < 1:
-        return "End"
-
-    # Right Direction
-    if PARKAREA_NAMES[0] in parkArea:
-        parkAreaSuffix = PARKAREA_NAMES[0]
-        parkAreaSuffix2 = PARKAREA_NAMES[1]
-    if PARKAREA_NAMES[1] in parkArea:
-        parkAreaSuffix = PARKAREA_NAMES[1]
-        parkAreaSuffix2 = PARKAREA_NAMES[0]
-
-    for row in range(DOUBLE_ROWS):
-        contPark1 = 0
-        park1 = str("%s%s" % (parkAreaSuffix, row))
-        if park1 in reservations:
-            contPark1 = reservations[park1]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park1 in freeParks:
-            contFreeParks = freeParks[park1]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-        # contPark1 = int(traci.simulation.getParameter(("%s%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark1:", contPark1)
-        if contFreeParks and (contPark1 + contFreeParks < SLOTS_PER_ROW) and  int(traci.parkingarea.getVehicleCount(park1)) < (SLOTS_PER_ROW):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park1, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-
-            return str(park1)
-
-        contPark2 = 0
-        park2 = str("%s-%s" % (parkAreaSuffix, row))
-        if park2 in reservations:
-            contPark2 = reservations[park2]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park2 in freeParks:
-            contFreeParks = freeParks[park2]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-
-        # contPark2 = int(traci.simulation.getParameter(("%s-%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark2:", contPark2)
-        if contFreeParks and (contPark2 + contFreeParks < SLOTS_PER_ROW)  and  int(traci.parkingarea.getVehicleCount(park2)) < (SLOTS_PER_ROW):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park2, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park2)
-
-    parkAreaSuffix = parkAreaSuffix2
-
-    for row in range(DOUBLE_ROWS):
-        contPark1 = 0
-        park1 = str("%s%s" % (parkAreaSuffix, row))
-        if park1 in reservations:
-            contPark1 = reservations[park1]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park1 in freeParks:
-            contFreeParks = freeParks[park1]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-        # contPark1 = int(traci.simulation.getParameter(("%s%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark1:", contPark1)
-        if contFreeParks and (contPark1 + contFreeParks < SLOTS_PER_ROW) and  int(traci.parkingarea.getVehicleCount(park1)) < (SLOTS_PER_ROW):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park1, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park1)
-
-        contPark2 = 0
-        park2 = str("%s-%s" % (parkAreaSuffix, row))
-        if park2 in reservations:
-            contPark2 = reservations[park2]
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park2 in freeParks:
-            contFreeParks = freeParks[park2]
-
-        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-            print("simulationTime:", simulationTime)
-            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-
-        # contPark2 = int(traci.simulation.getParameter(("%s-%s" % (parkAreaSuffix, row)), "parkingArea.occupancy"))
-        print("contPark2:", contPark2)
-        if contFreeParks and (contPark2 + contFreeParks < SLOTS_PER_ROW)  and  int(traci.parkingarea.getVehicleCount(park2)) < (SLOTS_PER_ROW):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park2, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park2)
-
-    return "End"
-
-    #parkingareaIdList = list(traci.parkingarea.getIDList())
-
-def changePark(idVehicle, parkArea, duration, stopPos, reservations, freeParks):
-    contStops = len(list(traci.vehicle.getStops(idVehicle, 0)))
-    print("Stops:", traci.vehicle.getStops(idVehicle, 0))
-    simulationTime = traci.simulation.getTime()
-    # In case the vehicle does not have stops
-    if contStops < 1:
-        return "End"
-
-    # Right Direction
-    if PARKAREA_NAMES[0] in parkArea:
-        parkAreaSuffix = PARKAREA_NAMES[0]
-        parkAreaSuffix2 = PARKAREA_NAMES[1]
-    if PARKAREA_NAMES[1] in parkArea:
-        parkAreaSuffix = PARKAREA_NAMES[1]
-        parkAreaSuffix2 = PARKAREA_NAMES[0]
-
-    for row in range(DOUBLE_ROWS):
-        park1 = str("%s%s" % (parkAreaSuffix, row))
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park1 in freeParks:
-            contFreeParks = freeParks[park1]
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-        else:
-            if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-                print("simulationTime:", simulationTime)
-                contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if contFreeParks > 0 and int(traci.parkingarea.getVehicleCount(park1)) < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park1, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-
-            return str(park1)
-
-        park2 = str("%s-%s" % (parkAreaSuffix, row))
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park2 in freeParks:
-            contFreeParks = freeParks[park2]
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-        else:
-            if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-                print("simulationTime:", simulationTime)
-                contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if contFreeParks > 0 and int(traci.parkingarea.getVehicleCount(park2)) < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park2, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park2)
-
-    parkAreaSuffix = parkAreaSuffix2
-
-    for row in range(DOUBLE_ROWS):
-
-        park1 = str("%s%s" % (parkAreaSuffix, row))
-
-        contFreeParks = INITIAL_FREE_PARKS
-        if park1 in freeParks:
-            contFreeParks = freeParks[park1]
-
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
+            vehicle.set("reviewStars", reviewStars)
+            vehicle.set("civil", 0)
         else:
-            if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-                print("simulationTime:", simulationTime)
-                contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-        if contFreeParks > 0 and int(traci.parkingarea.getVehicleCount(park1)) < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park1, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park1)
-
-        park2 = str("%s-%s" % (parkAreaSuffix, row))
+            vehicle.set("civil", civil)
 
-        contFreeParks = INITIAL_FREE_PARKS
-        if park2 in freeParks:
-            contFreeParks = freeParks[park2]
+# Function to build the index of the parking areas, each group lists its areas in search order
+def buildParkingIndex(config):
+    groups = []
+    for parkAreaSuffix in config.districtNames:
+        parkAreas = []
+        for row in range(config.doubleRows):
+            parkAreas += ["%s%s" % (parkAreaSuffix, row), "%s-%s" % (parkAreaSuffix, row)]
+        groups.append((parkAreaSuffix, parkAreas))
 
-        if CONSTANT_FREE_PARKS != -1:
-            contFreeParks = CONSTANT_FREE_PARKS
-        else:
-            if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-                print("simulationTime:", simulationTime)
-                contFreeParks = INITIAL_CONSTANT_FREE_PARKS
+    # Opposite Direction (left)
+    parkAreas = []
+    for row in range(config.outOfTownRows - 1, -1, -1):
+        parkAreas += ["%s%s" % (config.parkAreaNames[2], row), "%s-%s" % (config.parkAreaNames[2], row)]
+    groups.append((config.parkAreaNames[2], parkAreas))
 
-        if contFreeParks > 0 and int(traci.parkingarea.getVehicleCount(park2)) < (SLOTS_PER_ROW - contFreeParks):
-            traci.vehicle.replaceStop(idVehicle, stopPos, park2, flags=65,
-                                      duration=duration,
-                                      startPos=0.0)
-            return str(park2)
+    return ParkingIndex(groups, config.slotsPerRow, buildFreeParksRule(config), snapshot.getVehicleCount)
 
-    return "End"
+# Function to build the rule of the free parks of each area
+def buildFreeParksRule(config):
+    # There are no free parks in "ParkAreaOutOfTown"
+    return FreeParksRule(config.initialFreeParks, config.initialConstantFreeParks,
+                         config.timeInitialConstantFreeParks, config.constantFreeParks,
+                         noFreeParksGroups=(config.parkAreaNames[2],))
 
 def get_options():
     optParser = optparse.OptionParser()
     optParser.add_option("--nogui", action="store_true",
                          default=False, help="run the commandLine version of sumo")
+    optParser.add_option("--fake", action="store_true",
+                         default=False, help="run the in-process stand-in simulator instead of sumo")
+    optParser.add_option("--libsumo", action="store_true",
+                         default=False, help="run sumo in this process through libsumo, without GUI (traci is used "
+                                             "when libsumo cannot be imported)")
+    optParser.add_option("--subscribe", action="store_true",
+                         default=False, help="read the vehicles' stops and stop state through TraCI subscriptions")
+    optParser.add_option("--strategy", dest="strategy", default="free", choices=STRATEGY_NAMES,
+                         help="strategy used when the park of a vehicle is full (%s), default: %%default"
+                              % ", ".join(STRATEGY_NAMES))
+    optParser.add_option("--reservation-strategy", dest="reservationStrategy", default="reservation",
+                         choices=STRATEGY_NAMES,
+                         help="strategy used when a park has no more reservations, default: %default")
+    optParser.add_option("--batch", action="store_true",
+                         default=False, help="choose the new parks of all the vehicles of a step together (needs numpy)")
+    optParser.add_option("--auction", dest="auction", choices=["uniform", "second"],
+                         help="sell the reservations with a sealed-bid auction, the winners of a park pay "
+                              "the lowest accepted bid (uniform) or the highest rejected one (second), needs numpy")
+    optParser.add_option("--log", dest="log", default="",
+                         help="log levels, for every category (DEBUG) or for some of them "
+                              "(allocation=DEBUG,billing=INFO,reputation=DEBUG,step=INFO)")
+    optParser.add_option("--log-file", dest="logFile",
+                         help="write the log to this file instead of stdout")
+    optParser.add_option("--results", default="results.jsonl",
+                         help="append the record of the run to this file, JSON lines or CSV if it ends with .csv, "
+                              "default: %default")
+    optParser.add_option("--text-output", dest="textOutput",
+                         help="also append the results as sentences to this file, e.g. output.txt")
+    optParser.add_option("--timeseries", dest="timeSeries", metavar="DIR",
+                         help="save occupancy, reservations, free parks and waiting vehicles of every parking area "
+                              "in this directory, see timeSeries.py")
+    optParser.add_option("--timeseries-every", dest="timeSeriesEvery", type="int", metavar="STEPS",
+                         help="with --timeseries, save one step every STEPS steps, default: 1")
+    optParser.add_option("--profile", action="store_true", default=False,
+                         help="time the phases of every step and print a summary at the end")
+    optParser.add_option("--profile-stacks", dest="profileStacks", metavar="FILE",
+                         help="write the time of the phases to FILE as collapsed stacks for a flame graph "
+                              "(implies --profile)")
+    optParser.add_option("--count-traci", dest="countTraci", action="store_true", default=False,
+                         help="count the TraCI calls of every command and caller and print them at the end")
+    optParser.add_option("--count-traci-file", dest="countTraciFile", metavar="FILE",
+                         help="write the TraCI calls with their latency histograms to this JSON file "
+                              "(implies --count-traci)")
+    optParser.add_option("--checkpoint-dir", dest="checkpointDir", metavar="DIR",
+                         help="save the state of the simulation and of the coordinator in DIR, see checkpoint.py")
+    optParser.add_option("--checkpoint-every", dest="checkpointEvery", type="int", default=1000, metavar="STEPS",
+                         help="with --checkpoint-dir, save a checkpoint every STEPS steps, default: %default")
+    optParser.add_option("--resume", action="store_true", default=False,
+                         help="start from the newest checkpoint of --checkpoint-dir")
+    optParser.add_option("--config", dest="config",
+                         help="JSON file with the settings that differ from data/constants.py")
+    optParser.add_option("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                         help="change a setting, e.g. --set RANDOM_POPULATION=50 (can be repeated)")
     options, args = optParser.parse_args()
     return options
 
 
-def run():
-    xmlDocument = etree.parse(("data/park_demand%02i.rou.xml") % RANDOM_POPULATION)
-    root = xmlDocument.getroot()
-    maxTrips = len(root.xpath("trip")) # Maximum number of vehicles
+# Function to get the wall time and the time of the steps of a run in milliseconds
+def stepTiming(stepTimes, wallSeconds):
+    ordered = sorted(stepTimes)
+    timing = {"wallSeconds": round(wallSeconds, 3), "steps": len(ordered)}
+    for name, value in (("stepMeanMs", sum(ordered) / max(len(ordered), 1)),
+                        ("stepP50Ms", ordered[int(0.5 * (len(ordered) - 1))] if ordered else 0),
+                        ("stepP99Ms", ordered[int(0.99 * (len(ordered) - 1))] if ordered else 0),
+                        ("stepMaxMs", ordered[-1] if ordered else 0)):
+        timing[name] = round(1000 * value, 4)
+    return timing
+
+
+# Function to write the results of a run as sentences, like they were before the structured records
+def writeText(fileName, config, results):
+    with open(fileName, "a") as f:
+        print("Which population:", config.randomPopulation, file=f)
+        if config.constantFreeParks == -1:
+            print("Free park: ", config.initialFreeParks, " - ", config.initialConstantFreeParks, file=f)
+            print("Refresh for each", config.refreshFreeParksPeriod, "time step", file=f)
+        else:
+            print("Free park:", config.constantFreeParks, file=f)
+        print("How many times a vehicle change its route? ", str(results["changedRoute"]), file=f)
+        print("How many times a vehicle does not park? (when there are no more car park)", str(results["noPark"]),
+              file=f)
+        print("How many times a vehicle change its route? (when there are no more reservations)",
+              str(results["unsatisfiedReservations"]), file=f)
+        print("How many times a vehicle could not book a reservation?",
+              str(results["noFoundReservation"]), file=f)
+        print("End park(good behaviour):", results["endParkGood"], file=f)
+        print("End park(bad behaviour):", results["endParkBad"], file=f)
+        print("Total end park:", results["totalEndPark"], file=f)
+        print("Finish time step:", results["finishTime"], file=f)
+        print("Reservation:", results["reservations"], file=f)
+        print("------------------------------------------------------------------------", file=f)
+
+
+# Function to run the coordinator until the end of the simulation, it returns the KPIs, the final
+# reservations and the timing of the run. The trips of the vehicles are read from the demand file in scenarioDir.
+# With checkpointDir a checkpoint is saved every checkpointEvery steps (the simulation is started with
+# checkpoint.sumoOptions()), resumeState is the state returned by checkpoint.load. With stopStep the run
+# ends after that step
+def run(config, subscribe=False, strategy="free", reservationStrategy="reservation", batchMode=False, auctionRule=None,
+        scenarioDir="data", timeSeriesDir=None, timeSeriesEvery=None, profiler=None, checkpointDir=None,
+        checkpointEvery=1000, resumeState=None, stopStep=None):
+    global snapshot, attributes, parking, allocation, timeSeries
+    if subscribe:
+        snapshot = SubscribedVehicleSnapshot(traci)
+    else:
+        snapshot = VehicleSnapshot(traci)
+
+    routeFile = os.path.join(scenarioDir, config.demandFile)
+    if resumeState is None:
+        # Stops and durations of every vehicle, reroutes are saved here
+        schedule = TripSchedule.load(routeFile)
+        attributes = AttributeCache.load(routeFile)
+        parking = buildParkingIndex(config)
+    else:
+        schedule = resumeState["schedule"]
+        attributes = resumeState["attributes"]
+        parking = resumeState["parking"]
+        parking.attach(snapshot.getVehicleCount)
+        # An experiment started from the checkpoint can change the free parks settings
+        if resumeState["configHash"] != config.configHash:
+            parking.setThresholdRule(buildFreeParksRule(config))
+        snapshot.subscribe(traci.vehicle.getIDList())
+    allocation = AllocationEngine(parking, snapshot, buildStrategies(config))
+    batch = None
+    if batchMode:
+        from batchAllocation import BatchAllocator
+        batch = BatchAllocator(allocation)
+    auction = None
+    if auctionRule is not None:
+        from auction import SealedBidAuction
+        auction = SealedBidAuction(parking, config.standardAuctionPrice, auctionRule)
+    timeSeries = None
+    if resumeState is not None and resumeState["timeSeries"] is not None:
+        timeSeries = resumeState["timeSeries"]
+        timeSeries.resume()
+    elif timeSeriesDir is not None or timeSeriesEvery is not None:
+        from timeSeries import TimeSeriesRecorder
+        timeSeries = TimeSeriesRecorder(parking.areas, timeSeriesDir, timeSeriesEvery or 1)
+    # Phases of the step are timed with a stepProfiler.PhaseProfiler, helpers included
+    if profiler is None:
+        profiler = NullProfiler()
+    allocation.allocate = profiler.wrap("search", allocation.allocate)
+    timedCheckWallet = profiler.wrap("billing", checkWallet)
+    timedAuctionBid = profiler.wrap("billing", auctionBid)
+    timedAuctionCharge = profiler.wrap("billing", auctionCharge)
+    timedSystemCharge = profiler.wrap("reputation", systemCharge)
+    reservations = parking.reservations # keeps track of the number of reservations for each park
+    freeParks = parking.freeParks # Number of free park that parkarea must have
+    maxTrips = len(schedule) # Maximum number of vehicles
 
-    stopPosVehicle = {} # Keeps track of which stop you reached
     problem = False # Check if the number the reservations is equal to the number of vehicles in the scenario
 
-    # Load all ID vehicle in a list
-    vehicleIdListXML = []
-    for posTrip in range(maxTrips):
-        vehicleIdListXML.append(root[posTrip].attrib.get("id"))
-
-    print("Number of vehicle:", str(maxTrips))
-    print("List of vehicles in XML file:", vehicleIdListXML)
+    stepLog.debug("Number of vehicle: %s", maxTrips)
+    stepLog.debug("List of vehicles in XML file: %s", schedule.ids)
 
     contNoPark = 0 # Number of times the vehicles don't park
     contSamePark = 0 # Number of times a vehicles that his current stop is equal to his next stop
@@ -494,54 +350,70 @@ def run():
     noFoundReservationCont = 0
 
     contTemp = 0
-    vehiclesDoNotPark = []
 
-    reservationVehicles = []  # Vehicles that have a reservation
-    paidVehicle = []  # Vehicles that paid the park
-    waitingVehicles = []  # Vehicles that don't park
-    vehiclesChangeRoute = []  # All vehicles that changed at least one time the route
+    vehicles = VehicleTable(schedule.ids)  # Stops reached, last park, park duration and flags of each vehicle
 
-    freeParks = {} # Number of free park that parkarea must have
     badBehaviour = {} # Number of times someone had a bad behaviour for each park
-    reservations = {} # keeps track of the number of reservations for each park
-    vehicleLastPark = {} # Keeps track of the last park of vehicles
-    vehicleParkDuration = {}  # Keeps track of the last park of vehicles
+    events = EventQueue() # Reservation ends and free parks refreshes, by simulation time
+    dueParkEnds = {} # Vehicles whose reservation ends in this step -> end time
+    refreshFreeParksPeriod = config.refreshFreeParksPeriod
+    events.push(refreshFreeParksPeriod, "refreshFreeParks")
     leavingAreaParkVehicle = {}
-
+    steps = 0  # Steps done, the ones before the checkpoint included
+
+    if resumeState is not None:
+        vehicles = resumeState["vehicles"]
+        badBehaviour = resumeState["badBehaviour"]
+        events = resumeState["events"]
+        steps = resumeState["step"]
+        (problem, contNoPark, contSamePark, contEndPark, contBadBehaviourVehicles, newWallet, simulationTime,
+         unsatisfiedReservationsCont, noFoundReservationCont, contTemp) = [
+            resumeState["counters"][name] for name in COUNTERS]
+
+    startTime = time.time()
+    runStart = time.perf_counter()
+    stepStart = None
+    stepTimes = array("d")  # Seconds of each step, simulation included
     while traci.simulation.getMinExpectedNumber() > 0:
+        now = time.perf_counter()
+        if stepStart is not None:
+            stepTimes.append(now - stepStart)
+        stepStart = now
+        profiler.mark("simulationStep")
         traci.simulationStep()
+        snapshot.update()
 
         # 1 loading vehicles
         runningVehicleIdList = list(traci.vehicle.getIDList())
-        print("------------------------ Still active vehicle:", str(len(runningVehicleIdList)),
-              "------------------------")
+        stepLog.debug("Still active vehicle: %s", len(runningVehicleIdList))
 
-        # 2 Reset free parks after 8 hours (800 time steps)
         simulationTime = traci.simulation.getTime()
-        print("Time:", simulationTime)
-        if simulationTime % (MAX_DURATION * SLOT_DURATION / REFRESH_FREE_PARKS) == 0:
-            badBehaviour.clear()
-            freeParks.clear()
+        stepLog.debug("Time: %s", simulationTime)
+        parking.newStep(simulationTime)
 
         # 3 Remove all ending park vehicles' reservations
+        profiler.mark("endingVehicles")
         leavingAreaParkVehicle.clear()
         endStopVehicles = list(traci.simulation.getParkingEndingVehiclesIDList())
-        print("List of vehicles that are leaving their park:", endStopVehicles)
+        stepLog.debug("List of vehicles that are leaving their park: %s", endStopVehicles)
         for endStopVehicle in endStopVehicles:
+            endStopState = vehicles.get(endStopVehicle)
 
-            if endStopVehicle in reservationVehicles:
-                reservations.update(
-                    {vehicleLastPark[endStopVehicle]: reservations[vehicleLastPark[endStopVehicle]] - 1})
+            if endStopState.reserved:
                 contEndPark = contEndPark + 1
-                if reservations[vehicleLastPark[endStopVehicle]] < 0:
+                if parking.addReservation(endStopState.lastPark, -1) < 0:
                     exit()
-                reservationVehicles.remove(endStopVehicle)
+                vehicles.release(endStopState)
+
+            posVehicle = endStopState.index
+            stopPosOffset = endStopState.stopPos
+            parkArea = schedule.parkArea(posVehicle, stopPosOffset)
+            endStopState.lastPark = parkArea
+            oldParkArea = schedule.parkArea(posVehicle, stopPosOffset - 1)
 
-            posVehicle = vehicleIdListXML.index(endStopVehicle)
-            stopPosOffset = stopPosVehicle[endStopVehicle]
-            parkArea = root[posVehicle][STARTING_STOP + stopPosOffset].attrib.get("parkingArea")
-            vehicleLastPark.update({endStopVehicle: parkArea})
-            oldParkArea = root[posVehicle][STARTING_STOP + stopPosOffset - 1].attrib.get("parkingArea")
+            # The vehicle is leaving its last park, SUMO gets its final reputation and wallet
+            if len(snapshot.getStops(endStopVehicle)) <= 1:
+                attributes.flush(traci, endStopVehicle)
 
             # 4 Counting number of vehicles that are leaving a park
             if oldParkArea not in leavingAreaParkVehicle:
@@ -549,111 +421,111 @@ def run():
             else:
                 leavingAreaParkVehicle.update({oldParkArea: leavingAreaParkVehicle[oldParkArea] + 1})
 
+        # Timed actions that are due
+        profiler.mark("refresh")
+        dueParkEnds.clear()
+        for eventTime, kind, payload in events.popDue(simulationTime):
+            # 2 Reset free parks after 8 hours (800 time steps)
+            if kind == "refreshFreeParks":
+                badBehaviour.clear()
+                parking.clearFreeParks()
+                events.push(eventTime + refreshFreeParksPeriod, "refreshFreeParks")
+
+            # The reservation of a bad behaviour vehicle ends, it is checked when the loop reaches the vehicle
+            elif kind == "parkEnd":
+                vehicle = payload
+                if vehicle.parkEnd == eventTime and vehicle.reserved:
+                    dueParkEnds[vehicle.id] = eventTime
+
         # Iterate only vehicle that are running in this scenario
+        profiler.mark("decisions")
         for idVehicle in runningVehicleIdList:
 
             problem = False
 
-            print("Number of reservations for each park reservation:", reservations)
-            print("List of vehicles with reservation:", reservationVehicles)
-            print("Number of vehicles with reservation:", len(reservationVehicles))
-
-            posVehicle = vehicleIdListXML.index(idVehicle) # Vehicle's position in XML file
-
-            if idVehicle not in stopPosVehicle:
-                stopPosVehicle.update({idVehicle: 0})
+            allocationLog.debug("Number of reservations for each park reservation: %s", reservations)
+            allocationLog.debug("Number of vehicles with reservation: %s", vehicles.reservedCount)
 
-            stopPosOffset = int(stopPosVehicle[idVehicle])
+            vehicle = vehicles.get(idVehicle)
+            posVehicle = vehicle.index # Vehicle's position in XML file
+            stopPosOffset = vehicle.stopPos
 
-            print("Vehicle position in XML:", str(posVehicle))
+            stepLog.debug("Vehicle position in XML: %s", posVehicle)
 
-            parkArea = root[posVehicle][STARTING_STOP + stopPosOffset].attrib.get("parkingArea")
+            parkArea = schedule.parkArea(posVehicle, stopPosOffset)
 
-            if idVehicle not in vehicleLastPark:
-                vehicleLastPark.update({idVehicle: parkArea})
+            if vehicle.lastPark is None:
+                vehicle.lastPark = parkArea
 
-            print("Id vehicle:", str(idVehicle))
-            print("Current Parkingarea:", str(vehicleLastPark[idVehicle]))
-            print("Next Parkingarea:", str(parkArea))
-            print("StopPosOffeset:", str(stopPosOffset))
+            stepLog.debug("Id vehicle: %s", idVehicle)
+            stepLog.debug("Current Parkingarea: %s", vehicle.lastPark)
+            stepLog.debug("Next Parkingarea: %s", parkArea)
+            stepLog.debug("StopPosOffeset: %s", stopPosOffset)
 
-            contStops = len(list(traci.vehicle.getStops(idVehicle, 0)))
-            print("Number of stops:", contStops)
+            contStops = len(list(snapshot.getStops(idVehicle)))
+            stepLog.debug("Number of stops: %s", contStops)
 
-            isStoppedParking = traci.vehicle.isStoppedParking(idVehicle)
-            print("Is the vehicle stopped?:", str(isStoppedParking))
+            isStoppedParking = snapshot.isStoppedParking(idVehicle)
+            stepLog.debug("Is the vehicle stopped?: %s", isStoppedParking)
 
-            duration = int(root[posVehicle][STARTING_STOP + stopPosOffset].attrib.get("duration"))
-            print("Park's duration:", str(duration))
+            duration = schedule.duration(posVehicle, stopPosOffset)
+            stepLog.debug("Park's duration: %s", duration)
 
-            print("FreeParks:", freeParks)
+            allocationLog.debug("FreeParks: %s", freeParks)
 
             # Vehicle is not stopped
             if (not isStoppedParking and contStops > 0):
 
                 # After parking
-                if idVehicle in paidVehicle:
-                    paidVehicle.remove(idVehicle)
+                vehicle.paid = False
 
-                if idVehicle not in reservationVehicles:
-                    if PARKAREA_NAMES[2] not in parkArea:
+                if not vehicle.reserved:
+                    if config.parkAreaNames[2] not in parkArea:
                         # Check if the vehicle has the requirements to park in "Town (ParkArea and ParkAreaAlternative)"
                         # In case the vehicle does not have the requirements, it must go to "ParkAreaOutOfTown"
-                        reviewStars = int(traci.vehicle.getParameter(idVehicle, "reviewStars"))
-                        print("Review Stars:", reviewStars)
-                        goodBehaviour = traci.vehicle.getParameter(idVehicle, "goodBehaviour")
-                        print("goodBehaviour:", goodBehaviour)
-                        if reviewStars < 3 and goodBehaviour == "False":
+                        vehicleAttributes = attributes.get(idVehicle)
+                        reviewStars = vehicleAttributes.reviewStars
+                        reputationLog.debug("Review Stars: %s", reviewStars)
+                        goodBehaviour = vehicleAttributes.goodBehaviour
+                        reputationLog.debug("goodBehaviour: %s", goodBehaviour)
+                        if reviewStars < 3 and not goodBehaviour:
                             #contBadBehaviourVehicles = contBadBehaviourVehicles + 1
-                            #newParkArea = changeRoute(idVehicle, parkArea, duration, 0, reservations, freeParks)
-                            newParkArea = goToNoSystemPark(idVehicle, duration, 0, reservations)
+                            #newParkArea = changeRoute(idVehicle, parkArea, duration, 0)
+                            newParkArea = allocation.allocate("outOfTown", idVehicle, parkArea, duration, 0)
                             if newParkArea == "End":
-                                print("------------------------")
                                 continue
-                            print("Stops:", traci.vehicle.getStops(idVehicle, 0))
-                            print("New Park Area:", newParkArea)
-                            traci.vehicle.setParameter(idVehicle, "goodBehaviour", True)
-                            root[posVehicle][STARTING_STOP + stopPosOffset].set("parkingArea", newParkArea)
-                            vehicleLastPark.update({idVehicle: newParkArea})
+                            allocationLog.debug("Stops: %s", Lazy(snapshot.getStops, idVehicle))
+                            allocationLog.debug("New Park Area: %s", newParkArea)
+                            vehicleAttributes.set("goodBehaviour", True)
+                            schedule.setParkArea(posVehicle, stopPosOffset, newParkArea)
+                            vehicle.lastPark = newParkArea
                             parkArea = newParkArea
 
                         # Check if the user has enough money to pay to the system
                         # If the money are insufficient, the vehicles must go to "ParkAreaOutOfTown"
-                        if PARKAREA_NAMES[2] not in parkArea:
-                            newWallet = checkWallet(duration, idVehicle)
+                        if config.parkAreaNames[2] not in parkArea:
+                            # The reservation is sold at the end of the step
+                            if auction is not None:
+                                auction.bid(vehicle, parkArea, timedAuctionBid(config, duration, idVehicle))
+                                continue
+                            newWallet = timedCheckWallet(config, duration, idVehicle)
                             if not newWallet:
-                                newParkArea = goToNoSystemPark(idVehicle, duration, 0, reservations)
-                                print("Stops:", traci.vehicle.getStops(idVehicle, 0))
-                                print("New Park Area:", newParkArea)
+                                newParkArea = allocation.allocate("outOfTown", idVehicle, parkArea, duration, 0)
+                                allocationLog.debug("Stops: %s", Lazy(snapshot.getStops, idVehicle))
+                                allocationLog.debug("New Park Area: %s", newParkArea)
                                 if newParkArea == "End":
-                                    print("------------------------")
                                     continue
-                                root[posVehicle][STARTING_STOP + stopPosOffset].set("parkingArea", newParkArea)
-                                vehicleLastPark.update({idVehicle: newParkArea})
+                                schedule.setParkArea(posVehicle, stopPosOffset, newParkArea)
+                                vehicle.lastPark = newParkArea
                                 parkArea = newParkArea
 
                 # Set if is dynamic o static free park system
                 # There are no free parks in "ParkAreaOutOfTown"
-                contFreeParks = INITIAL_FREE_PARKS
-                if PARKAREA_NAMES[2] not in parkArea:
-                    if parkArea in freeParks:
-                        contFreeParks = freeParks[parkArea]
-
-                    if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-                        contFreeParks = INITIAL_CONSTANT_FREE_PARKS
+                contFreeParks = parking.getThreshold(parkArea)
 
-                    if CONSTANT_FREE_PARKS != -1:
-                        contFreeParks = CONSTANT_FREE_PARKS
-
-                else:
-                    contFreeParks = 0
-
-                if idVehicle not in reservationVehicles:
-                    reservationVehicles.append(idVehicle)
-                    if parkArea not in reservations:
-                        reservations.update({parkArea: 1})
-                    else:
-                        reservations.update({parkArea: reservations[parkArea] + 1})
+                if not vehicle.reserved:
+                    vehicles.reserve(vehicle)
+                    parking.addReservation(parkArea)
 
                 # Optional
                 if (sum(reservations.values()) != len(runningVehicleIdList)):
@@ -663,114 +535,111 @@ def run():
                 if parkArea in leavingAreaParkVehicle:
                     contEndingPark = leavingAreaParkVehicle[parkArea]
 
-                print("contFreeParks:", contFreeParks)
-                print("Soglia:", (SLOTS_PER_ROW - contFreeParks))
+                allocationLog.debug("contFreeParks: %s", contFreeParks)
+                allocationLog.debug("Soglia: %s", (config.slotsPerRow - contFreeParks))
 
                 # These are not applied to "ParkAreaOutOfTown"
                 # Check if its parking area is full
-                if (reservations[parkArea] > (SLOTS_PER_ROW - contFreeParks)):
+                if (reservations[parkArea] > (config.slotsPerRow - contFreeParks)):
 
                     if contEndingPark > 0:
                         leavingAreaParkVehicle.update({parkArea: leavingAreaParkVehicle[parkArea] - 1})
                         continue
 
-                    if (PARKAREA_NAMES[2] not in parkArea):
+                    if (config.parkAreaNames[2] not in parkArea):
                         unsatisfiedReservationsCont = unsatisfiedReservationsCont + 1
 
-                        print("Number of reservations in that ParkArea:", str(reservations[parkArea]))
-                        print("Waiting...")
+                        allocationLog.debug("Number of reservations in that ParkArea: %s", reservations[parkArea])
+                        allocationLog.debug("Waiting...")
+                        if timeSeries is not None:
+                            timeSeries.addWaiting(parkArea)
                         # avoid loop if you are looking for a new park with available reservations
-                        # newParkArea = goToNoSystemPark(idVehicle, duration, 0, reservations)
-                        #newParkArea = str("%s%s" % (PARKAREA_NAMES[2], DOUBLE_ROWS * 2 - 1))
+                        # newParkArea = allocation.allocate("outOfTown", idVehicle, parkArea, duration, 0)
+                        #newParkArea = str("%s%s" % (config.parkAreaNames[2], config.doubleRows * 2 - 1))
                         #newParkArea = changeRoute(idVehicle, newParkArea, duration, 0, reservations, freeParks)
-                        newParkArea = changeReservation(idVehicle, parkArea, duration, 0, reservations, freeParks)
+
+                    # The new park is chosen together with the other vehicles of this step
+                    if batch is not None:
+                        batch.request(vehicle, idVehicle, reservationStrategy, parkArea, duration, 0,
+                                      attributes.get(idVehicle).reviewStars)
+                        continue
+
+                    if (config.parkAreaNames[2] not in parkArea):
+                        newParkArea = allocation.allocate(reservationStrategy, idVehicle, parkArea, duration, 0)
                         if newParkArea == "End":
                             noFoundReservationCont = noFoundReservationCont + 1
-                            newParkArea = goToNoSystemPark(idVehicle, duration, 0, reservations)
+                            newParkArea = allocation.allocate("outOfTown", idVehicle, parkArea, duration, 0)
                     else:
-                        newParkArea = goToNoSystemPark(idVehicle, duration, 0, reservations)
+                        newParkArea = allocation.allocate("outOfTown", idVehicle, parkArea, duration, 0)
 
-                    print("Stops:", traci.vehicle.getStops(idVehicle, 0))
-                    print("New Park Area:", newParkArea)
+                    allocationLog.debug("Stops: %s", Lazy(snapshot.getStops, idVehicle))
+                    allocationLog.debug("New Park Area: %s", newParkArea)
 
                     if newParkArea == "End":
-                        print("------------------------")
                         continue
-                    root[posVehicle][STARTING_STOP + stopPosOffset].set("parkingArea", newParkArea)
-                    vehicleLastPark.update({idVehicle: newParkArea})
+                    schedule.setParkArea(posVehicle, stopPosOffset, newParkArea)
+                    vehicle.lastPark = newParkArea
 
-                    reservations.update({parkArea: reservations[parkArea] - 1})
-                    if newParkArea not in reservations:
-                        reservations.update({newParkArea: 1})
-                    else:
-                        reservations.update({newParkArea: reservations[newParkArea] + 1})
+                    parking.addReservation(parkArea, -1)
+                    parking.addReservation(newParkArea)
 
-                    print("------------------------")
                     parkArea = newParkArea
 
-                    contFreeParks = INITIAL_FREE_PARKS
-                    if PARKAREA_NAMES[2] not in parkArea:
-                        if parkArea in freeParks:
-                            contFreeParks = freeParks[parkArea]
-
-                        if simulationTime < TIME_INITIAL_CONSTANT_FREE_PARKS:
-                            contFreeParks = INITIAL_CONSTANT_FREE_PARKS
-
-                        if CONSTANT_FREE_PARKS != -1:
-                            contFreeParks = CONSTANT_FREE_PARKS
-
-                    else:
-                        contFreeParks = 0
+                    contFreeParks = parking.getThreshold(parkArea)
 
                 contEndingPark = 0
                 if parkArea in leavingAreaParkVehicle:
                     contEndingPark = leavingAreaParkVehicle[parkArea]
 
-                if (reservations[parkArea] <= (SLOTS_PER_ROW - contFreeParks)) and traci.parkingarea.getVehicleCount(parkArea) == (SLOTS_PER_ROW):
+                if (reservations[parkArea] <= (config.slotsPerRow - contFreeParks)) and parking.getOccupancy(parkArea) == (config.slotsPerRow):
 
                     if contEndingPark > 0:
                         leavingAreaParkVehicle.update({parkArea: leavingAreaParkVehicle[parkArea] - 1})
                         continue
 
-                    if (PARKAREA_NAMES[2] not in parkArea):
+                    if (config.parkAreaNames[2] not in parkArea):
                         # It doesn't keep track of number of times of a vehicles does not park/vehicles change its route if that parkarea is "ParkAreaOutOfTown"
-                        if idVehicle not in waitingVehicles:
+                        if not vehicle.waiting:
                             contNoPark = contNoPark + 1
-                            waitingVehicles.append(idVehicle)
+                            vehicle.waiting = True
 
-                        if idVehicle not in vehiclesChangeRoute:
-                            vehiclesChangeRoute.append(idVehicle)
+                        vehicles.markChangedRoute(vehicle)
 
-                        print("Number of vehicles in that ParkArea:",
-                              str(traci.parkingarea.getVehicleCount(parkArea)))
-                        print("Waiting...")
+                        allocationLog.debug("Number of vehicles in that ParkArea: %s",
+                                            Lazy(parking.getOccupancy, parkArea))
+                        allocationLog.debug("Waiting...")
+                        if timeSeries is not None:
+                            timeSeries.addWaiting(parkArea)
+
+                    # The new park is chosen together with the other vehicles of this step
+                    if batch is not None:
+                        batch.request(vehicle, idVehicle, strategy, parkArea, duration, 0,
+                                      attributes.get(idVehicle).reviewStars)
+                        continue
 
-                        newParkArea = goToFreePark(idVehicle, parkArea, duration, 0, reservations, freeParks)
+                    if (config.parkAreaNames[2] not in parkArea):
+                        newParkArea = allocation.allocate(strategy, idVehicle, parkArea, duration, 0)
                         if newParkArea == "End":
                             noFoundReservationCont = noFoundReservationCont + 1
-                            newParkArea = goToNoSystemPark(idVehicle, duration, 0, reservations)
+                            newParkArea = allocation.allocate("outOfTown", idVehicle, parkArea, duration, 0)
                     else:
-                        newParkArea = goToNoSystemPark(idVehicle, duration, 0, reservations)
+                        newParkArea = allocation.allocate("outOfTown", idVehicle, parkArea, duration, 0)
 
                     # avoid loop if you are looking for a new park with available reservations
-                    # newParkArea = str("%s%s" % (PARKAREA_NAMES[2], DOUBLE_ROWS * 2 - 1))
+                    # newParkArea = str("%s%s" % (config.parkAreaNames[2], config.doubleRows * 2 - 1))
                     # newParkArea = changeRoute(idVehicle, newParkArea, duration, 0, reservations, freeParks)
 
-                    #newParkArea = changePark(idVehicle, parkArea, duration, 0, reservations, freeParks)
+                    # --strategy occupancy looks for a park with fewer vehicles than the threshold (changePark)
 
-                    print("Stops:", traci.vehicle.getStops(idVehicle, 0))
-                    print("New Park Area:", newParkArea)
+                    allocationLog.debug("Stops: %s", Lazy(snapshot.getStops, idVehicle))
+                    allocationLog.debug("New Park Area: %s", newParkArea)
                     if newParkArea == "End":
-                        print("------------------------")
                         continue
-                    root[posVehicle][STARTING_STOP + stopPosOffset].set("parkingArea", newParkArea)
-                    vehicleLastPark.update({idVehicle: newParkArea})
+                    schedule.setParkArea(posVehicle, stopPosOffset, newParkArea)
+                    vehicle.lastPark = newParkArea
 
-                    reservations.update({parkArea: reservations[parkArea] - 1})
-                    if newParkArea not in reservations:
-                        reservations.update({newParkArea: 1})
-                    else:
-                        reservations.update({newParkArea: reservations[newParkArea] + 1})
+                    parking.addReservation(parkArea, -1)
+                    parking.addReservation(newParkArea)
 
 
             # Update the last list of vehicles that are ending their park
@@ -778,79 +647,126 @@ def run():
 
             # If the vechicle is stopped
             if (isStoppedParking):
-                stops = list(traci.vehicle.getStops(idVehicle, 0))
-                delay = int(traci.vehicle.getParameter(idVehicle, "delay"))
-
-                #In case if the park is "ParkAreaOutOfTown", we don't need to track the ending time of reservation
-                if PARKAREA_NAMES[2] not in vehicleLastPark[idVehicle]:
-                    currentStop = stops[0]
-                    # Check only bad behaviour car
-                    if delay > 0:
-                        simulationTime = int(traci.simulation.getTime())
-                        print("Simulation time:", simulationTime)
-                        # If the current duration is negative that means someone is blocking the park
-                        if currentStop.duration > 0:
-                            if idVehicle in vehicleParkDuration:
-                                if simulationTime == int(vehicleParkDuration[idVehicle]):
-                                    if idVehicle in reservationVehicles:
-                                        reservationVehicles.remove(idVehicle)
-                                        reservations.update({vehicleLastPark[idVehicle]: reservations[vehicleLastPark[idVehicle]] - 1})
-                                        contBadBehaviourVehicles = contBadBehaviourVehicles + 1
-
-                                        if vehicleLastPark[idVehicle] not in freeParks:
-                                            freeParks.update({vehicleLastPark[idVehicle]: 1})
-                                        elif freeParks[vehicleLastPark[idVehicle]] < INITIAL_CONSTANT_FREE_PARKS:
-                                                freeParks.update({vehicleLastPark[idVehicle]: freeParks[vehicleLastPark[
-                                                    idVehicle]] + 1})
-
-                                        vehicleLastPark.update({idVehicle: parkArea})
-                                        vehicleParkDuration.pop(idVehicle)
-
-                if idVehicle in waitingVehicles:
-                    waitingVehicles.remove(idVehicle)
-
-                if idVehicle not in paidVehicle:
-                    paidVehicle.append(idVehicle)
+                stops = list(snapshot.getStops(idVehicle))
+                delay = attributes.get(idVehicle).delay
+
+                # A bad behaviour vehicle is still parked when its reservation ends
+                # In case if the park is "ParkAreaOutOfTown", we don't need to track the ending time of reservation
+                if idVehicle in dueParkEnds and config.parkAreaNames[2] not in vehicle.lastPark:
+                    # If the current duration is negative that means someone is blocking the park
+                    if stops[0].duration > 0 and vehicle.reserved:
+                        vehicles.release(vehicle)
+                        parking.addReservation(vehicle.lastPark, -1)
+                        contBadBehaviourVehicles = contBadBehaviourVehicles + 1
+
+                        parking.addFreePark(vehicle.lastPark, config.initialConstantFreeParks)
+
+                        vehicle.lastPark = parkArea
+                        vehicle.parkEnd = None
+
+                vehicle.waiting = False
+
+                if not vehicle.paid:
+                    vehicle.paid = True
                     contStops = len(stops)
-                    print("Stops:", traci.vehicle.getStops(idVehicle, 0))
+                    allocationLog.debug("Stops: %s", Lazy(snapshot.getStops, idVehicle))
 
                     # Vehicle doesn't pay if it doesn't park in "Town (ParkArea and ParkAreaAlternative)"
-                    if PARKAREA_NAMES[2] not in parkArea:
+                    if config.parkAreaNames[2] not in parkArea:
 
                         leavingTime = simulationTime + (duration - delay)
-                        print("When it must end the park at:", leavingTime)
-                        vehicleParkDuration.update({idVehicle: leavingTime})
-                        print("List of vehicles' ending time park:", vehicleParkDuration)
+                        billingLog.debug("When it must end the park at: %s", leavingTime)
+                        vehicle.parkEnd = leavingTime
+                        # Check only bad behaviour car
+                        if delay > 0 and leavingTime > simulationTime:
+                            events.push(leavingTime, "parkEnd", vehicle)
 
-                        traci.vehicle.setParameter(idVehicle, "wallet", newWallet)
-                        systemCharge(idVehicle)
+                        # With the auction the user paid when he won the reservation
+                        if auction is None:
+                            attributes.get(idVehicle).set("wallet", newWallet)
+                        timedSystemCharge(idVehicle)
 
                     if contStops > 1:
                         # Update which stop the vehicle is at
-                        stopPosVehicle.update({idVehicle: stopPosVehicle[idVehicle] + 1})
-                        print("Where:", stopPosVehicle[idVehicle])
+                        vehicle.stopPos = vehicle.stopPos + 1
+                        stepLog.debug("Where: %s", vehicle.stopPos)
 
-                print("------------------------")
                 continue
 
-            print("------------------------")
-
-        print("------------------------ Still active vehicle:", str(len(runningVehicleIdList)),
-              "------------------------")
-
-        print("Reservation Total:", sum(reservations.values()))
+        # Reservations asked in this step are sold all together
+        profiler.mark("auction")
+        if auction is not None:
+            for vehicle, parkArea, won, price in auction.clear():
+                duration = schedule.duration(vehicle.index, vehicle.stopPos)
+                if won:
+                    charge = timedAuctionCharge(config, duration, vehicle.id, price)
+                    billingLog.debug("Vehicle %s wins %s at %s, it pays %s", vehicle.id, parkArea, price, charge)
+                    vehicleAttributes = attributes.get(vehicle.id)
+                    vehicleAttributes.set("wallet", vehicleAttributes.wallet - charge)
+                    vehicles.reserve(vehicle)
+                    parking.addReservation(parkArea)
+                    continue
+
+                billingLog.debug("Vehicle %s loses the auction for %s", vehicle.id, parkArea)
+                newParkArea = allocation.allocate("outOfTown", vehicle.id, parkArea, duration, 0)
+                allocationLog.debug("Vehicle %s, new Park Area: %s", vehicle.id, newParkArea)
+                if newParkArea == "End":
+                    continue
+                schedule.setParkArea(vehicle.index, vehicle.stopPos, newParkArea)
+                vehicle.lastPark = newParkArea
+                vehicles.reserve(vehicle)
+                parking.addReservation(newParkArea)
+
+        # Vehicles that need a new park in this step get it all at once
+        profiler.mark("batch")
+        if batch is not None:
+            for vehicle, parkArea, newParkArea, notFound in batch.solve():
+                if notFound:
+                    noFoundReservationCont = noFoundReservationCont + 1
+                allocationLog.debug("Vehicle %s, new Park Area: %s", vehicle.id, newParkArea)
+                if newParkArea == "End":
+                    continue
+                schedule.setParkArea(vehicle.index, vehicle.stopPos, newParkArea)
+                vehicle.lastPark = newParkArea
+
+                parking.addReservation(parkArea, -1)
+                parking.addReservation(newParkArea)
+
+        profiler.mark("bookkeeping")
+        stepLog.info("Time: %s, still active vehicle: %s, reservation total: %s", simulationTime,
+                     len(runningVehicleIdList), Lazy(sum, reservations.values()))
+        if timeSeries is not None:
+            timeSeries.sample(simulationTime, parking)
+
+        steps = steps + 1
+        if checkpointDir is not None and steps % checkpointEvery == 0:
+            profiler.mark("checkpoint")
+            counters = dict(zip(COUNTERS, (
+                problem, contNoPark, contSamePark, contEndPark, contBadBehaviourVehicles, newWallet, simulationTime,
+                unsatisfiedReservationsCont, noFoundReservationCont, contTemp)))
+            checkpoint.save(checkpointDir, steps, traci, {
+                "configHash": config.configHash, "schedule": schedule, "attributes": attributes, "parking": parking,
+                "vehicles": vehicles, "badBehaviour": badBehaviour, "events": events, "timeSeries": timeSeries,
+                "counters": counters})
+            stepLog.info("Checkpoint at time %s", simulationTime)
+        if stopStep is not None and steps >= stopStep:
+            break
+
+    profiler.mark(None)
+    if timeSeries is not None:
+        timeSeries.close()
 
     if problem == True:
         print("Reservation:", reservations)
         print("PROBLEM!")
 
-    print("Which population:", RANDOM_POPULATION)
-    if CONSTANT_FREE_PARKS == -1:
-        print("Free park: ", INITIAL_FREE_PARKS, " - ", INITIAL_CONSTANT_FREE_PARKS)
-        print("Refresh for each", (MAX_DURATION * SLOT_DURATION / REFRESH_FREE_PARKS), "time step")
+    print("Which population:", config.randomPopulation)
+    if config.constantFreeParks == -1:
+        print("Free park: ", config.initialFreeParks, " - ", config.initialConstantFreeParks)
+        print("Refresh for each", config.refreshFreeParksPeriod, "time step")
     else:
-        print("Free park:", CONSTANT_FREE_PARKS)
-    print("How many times a vehicle change its route?", str(len(vehiclesChangeRoute)))
+        print("Free park:", config.constantFreeParks)
+    print("How many times a vehicle change its route?", str(vehicles.changedRouteCount))
     print("How many times a vehicle does not park? (when there are no more car park)", str(contNoPark))
     print("How many times a vehicle change its route? (when there are no more reservations)", str(unsatisfiedReservationsCont))
     print("How many times a vehicle could not book a reservation?",
@@ -865,42 +781,113 @@ def run():
 
     print("contTemp:", contTemp)
 
-    print("Vehicles that not park during sleep time:", len(vehiclesDoNotPark))
-
-    with open("output.txt", "a") as f:
-
-        print("Which population:", RANDOM_POPULATION, file=f)
-        if CONSTANT_FREE_PARKS == -1:
-            print("Free park: ", INITIAL_FREE_PARKS, " - ", INITIAL_CONSTANT_FREE_PARKS, file=f)
-            print("Refresh for each", (MAX_DURATION * SLOT_DURATION / REFRESH_FREE_PARKS), "time step", file=f)
-        else:
-            print("Free park:", CONSTANT_FREE_PARKS, file=f)
-        print("How many times a vehicle change its route? ", str(len(vehiclesChangeRoute)), file=f)
-        print("How many times a vehicle does not park? (when there are no more car park)", str(contNoPark), file=f)
-        print("How many times a vehicle change its route? (when there are no more reservations)",
-              str(unsatisfiedReservationsCont), file=f)
-        print("How many times a vehicle could not book a reservation?",
-              str(noFoundReservationCont), file=f)
-        print("End park(good behaviour):", contEndPark, file=f)
-        # print("Reservation:", reservations, file=f)
-        # print("contSamePark:", contSamePark, file=f)
-        print("End park(bad behaviour):", contBadBehaviourVehicles, file=f)
-        print("Total end park:", contEndPark + contBadBehaviourVehicles, file=f)
-        print("Finish time step:", simulationTime, file=f)
-        print("Reservation:", reservations, file=f)
-        print("------------------------------------------------------------------------", file=f)
+    print("Vehicles that not park during sleep time:", vehicles.doNotParkCount)
+
+    if stepStart is not None:
+        stepTimes.append(time.perf_counter() - stepStart)
+    results = {
+        "configHash": config.configHash,
+        "startTime": round(startTime, 3),
+        "population": config.randomPopulation,
+        "constantFreeParks": config.constantFreeParks,
+        "initialFreeParks": config.initialFreeParks,
+        "initialConstantFreeParks": config.initialConstantFreeParks,
+        "refreshFreeParks": config.refreshFreeParks,
+        "changedRoute": vehicles.changedRouteCount,
+        "noPark": contNoPark,
+        "unsatisfiedReservations": unsatisfiedReservationsCont,
+        "noFoundReservation": noFoundReservationCont,
+        "endParkGood": contEndPark,
+        "endParkBad": contBadBehaviourVehicles,
+        "totalEndPark": contEndPark + contBadBehaviourVehicles,
+        "finishTime": simulationTime,
+        "reservations": dict(reservations),
+    }
+    results.update(stepTiming(stepTimes, time.perf_counter() - runStart))
 
     sys.stdout.flush()
+    return results
 
 
 # Start sumo and TraCI with the same port
 if __name__ == "__main__":
     options = get_options()
-
-    if options.nogui:
+    try:
+        levels = coordinatorLog.parseLevels(options.log)
+    except ValueError as e:
+        sys.exit("Invalid --log: %s" % e)
+    coordinatorLog.configure(levels, options.logFile)
+    try:
+        config = Config.load(options.config, options.settings)
+    except (OSError, TypeError, ValueError) as e:
+        sys.exit("Invalid configuration: %s" % e)
+
+    backendName = "traci"
+    if options.fake:
+        useBackend(fakeTraci.FakeTraci())
+        backendName = "fake"
+        sumoBinary = "sumo"
+    elif traci is None:
+        sys.exit("Please set environment variable 'SUMO_HOME'")
+    elif options.libsumo:
+        import libsumoBackend
+        backend = libsumoBackend.load()
+        if backend is None:
+            print("libsumo cannot be imported, using traci")
+        else:
+            useBackend(backend)
+            backendName = "libsumo"
+        # libsumo has no GUI
+        sumoBinary = checkBinary('sumo' if backend is not None or options.nogui else 'sumo-gui')
+    elif options.nogui:
         sumoBinary = checkBinary('sumo')
     else:
         sumoBinary = checkBinary('sumo-gui')
     print(sumoBinary)
-    traci.start([sumoBinary, "-c", ("data/park%02i.sumocfg") % RANDOM_POPULATION])
-    run()
\ No newline at end of file
+    accounting = None
+    if options.countTraci or options.countTraciFile:
+        import traciAccounting
+        accounting = traciAccounting.AccountedTraci(traci)
+        useBackend(accounting)
+    sumoOptions = []
+    resumeState = None
+    if options.resume:
+        if options.checkpointDir is None:
+            sys.exit("--resume needs --checkpoint-dir")
+        base = checkpoint.latest(options.checkpointDir)
+        if base is None:
+            print("No checkpoint in %s, starting from the beginning" % options.checkpointDir)
+            sumoOptions = checkpoint.sumoOptions()
+        else:
+            try:
+                resumeState = checkpoint.load(base, config.configHash)
+            except ValueError as e:
+                sys.exit(str(e))
+            print("Resuming from %s" % base)
+            sumoOptions = checkpoint.sumoOptions(base)
+    elif options.checkpointDir is not None:
+        sumoOptions = checkpoint.sumoOptions()
+    traci.start([sumoBinary, "-c", os.path.join("data", config.sumoConfigFile)] + sumoOptions)
+    profiler = None
+    if options.profile or options.profileStacks:
+        profiler = PhaseProfiler()
+    results = run(config, options.subscribe, options.strategy, options.reservationStrategy, options.batch,
+                  options.auction, timeSeriesDir=options.timeSeries,
+                  timeSeriesEvery=options.timeSeriesEvery if options.timeSeries else None, profiler=profiler,
+                  checkpointDir=options.checkpointDir, checkpointEvery=options.checkpointEvery, resumeState=resumeState)
+    runResults.appendRecord(options.results, runResults.makeRecord(
+        config, results, backend=backendName, subscribe=options.subscribe,
+        strategy=options.strategy, reservationStrategy=options.reservationStrategy, batch=options.batch,
+        auction=options.auction))
+    if options.textOutput is not None:
+        writeText(options.textOutput, config, results)
+    if profiler is not None:
+        print(profiler.summary())
+        if options.profileStacks:
+            profiler.writeCollapsed(options.profileStacks)
+    if accounting is not None:
+        print(accounting.summary())
+        if options.countTraciFile:
+            with open(options.countTraciFile, "w") as f:
+                json.dump(accounting.asDict(), f, indent=1)
+    coordinatorLog.shutdown()
\ No newline at end of file
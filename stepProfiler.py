@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    stepProfiler.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Time spent by the coordinator in each phase of a simulation step.
+
+The step loop calls mark() when a phase ends and the next one starts, the
+helpers called inside a phase (search of a new park, billing, reputation) are
+wrapped to be timed as nested phases. Every call of a phase keeps its time,
+so the summary has calls, total, p50 and p99 of each one. writeCollapsed
+gives the self time of each stack of phases in the collapsed format read by
+flamegraph.pl and speedscope. NullProfiler does nothing and is used when the
+run is not profiled.
+"""
+
+from __future__ import absolute_import
+
+import time
+from array import array
+
+
+class PhaseProfiler(object):
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stack = []  # (path, start) of the phases not ended yet, the innermost last
+        self.samples = {}  # path of phase names -> seconds of every call
+        self.order = {}  # path -> when the phase was first entered, the summary follows the step
+
+    def enter(self, name):
+        path = self.stack[-1][0] + (name,) if self.stack else (name,)
+        if path not in self.order:
+            self.order[path] = len(self.order)
+        self.stack.append((path, self.clock()))
+
+    def leave(self):
+        path, start = self.stack.pop()
+        elapsed = self.clock() - start
+        samples = self.samples.get(path)
+        if samples is None:
+            samples = self.samples[path] = array("d")
+        samples.append(elapsed)
+
+    # Function to end the current phase of the step and start the next one, None only ends it
+    def mark(self, name):
+        while self.stack:
+            self.leave()
+        if name is not None:
+            self.enter(name)
+
+    # Function to time every call of function as a phase inside the current one
+    def wrap(self, name, function):
+        def timed(*args, **kwargs):
+            self.enter(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.leave()
+        return timed
+
+    # Function to get calls, total and percentiles of each phase: path -> dict
+    def phases(self):
+        phases = {}
+        for path, samples in self.samples.items():
+            ordered = sorted(samples)
+            phases[path] = {
+                "calls": len(ordered),
+                "seconds": sum(ordered),
+                "p50Us": 1e6 * ordered[int(round(0.5 * (len(ordered) - 1)))],
+                "p99Us": 1e6 * ordered[int(round(0.99 * (len(ordered) - 1)))],
+            }
+        return phases
+
+    def summary(self):
+        phases = self.phases()
+        total = sum(phase["seconds"] for path, phase in phases.items() if len(path) == 1) or 1.
+        lines = ["%-32s %10s %10s %7s %10s %10s" % ("phase", "calls", "seconds", "share", "p50 us", "p99 us")]
+        for path in sorted(phases, key=lambda path: [self.order[path[:depth]] for depth in range(1, len(path) + 1)]):
+            phase = phases[path]
+            lines.append("%-32s %10i %10.3f %6.1f%% %10.1f %10.1f" % (
+                "  " * (len(path) - 1) + path[-1], phase["calls"], phase["seconds"],
+                100 * phase["seconds"] / total, phase["p50Us"], phase["p99Us"]))
+        return "\n".join(lines)
+
+    # Function to write one line "step;phase;nested phase microseconds" for each stack, the time of the
+    # nested phases is not counted in the one of the phase that called them
+    def writeCollapsed(self, fileName):
+        selfTime = dict((path, sum(samples)) for path, samples in self.samples.items())
+        for path, samples in self.samples.items():
+            if len(path) > 1 and path[:-1] in selfTime:
+                selfTime[path[:-1]] -= sum(samples)
+        with open(fileName, "w") as f:
+            for path in sorted(selfTime):
+                f.write("step;%s %i\n" % (";".join(path), max(0, round(1e6 * selfTime[path]))))
+
+
+class NullProfiler(object):
+
+    def mark(self, name):
+        pass
+
+    def wrap(self, name, function):
+        return function
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    sweep.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Runs runner.py over a grid of demand levels and free parks settings.
+
+Every combination runs in its own process of a pool, with its own SUMO
+instance (or the stand-in simulator with --fake), and the KPIs of all the
+runs are collected into one table.
+
+    python3 sweep.py --fake --populations 1,5,10,50,100 --constant-free-parks -1,0,2 --output sweep.csv
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import sys
+import csv
+import time
+import itertools
+import optparse
+import contextlib
+import concurrent.futures
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+COLUMNS = ["configHash", "population", "constantFreeParks", "initialFreeParks", "refreshFreeParks",
+           "changedRoute", "noPark", "unsatisfiedReservations", "noFoundReservation", "endParkGood", "endParkBad", "totalEndPark",
+           "finishTime", "seconds"]
+
+
+# Function to run one combination of the grid, it is called in a worker process
+def runScenario(settings):
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import runner
+    import fakeTraci
+
+    config = settings["config"]
+    scenarioDir = "data"
+    if settings["scenarios"] is not None:
+        from data import buildScenario
+        scenarioDir = os.path.join(settings["scenarios"], config.configHash)
+        os.makedirs(scenarioDir, exist_ok=True)
+        buildScenario.build(config, scenarioDir, netconvert=not settings["fake"], cacheDir=settings["cacheDir"])
+    sumoConfig = os.path.join(scenarioDir, config.sumoConfigFile)
+
+    if settings["fake"]:
+        runner.useBackend(fakeTraci.FakeTraci())
+        runner.traci.start(["sumo", "-c", sumoConfig])
+    else:
+        import traci
+        runner.useBackend(traci)
+        traci.start([runner.checkBinary("sumo"), "-c", sumoConfig], label=settings["label"])
+
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = runner.run(config, settings["subscribe"], scenarioDir=scenarioDir)
+    finally:
+        runner.traci.close()
+    results["seconds"] = round(time.perf_counter() - start, 3)
+    if settings["results"] is not None:
+        import runResults
+        runResults.appendRecord(settings["results"], runResults.makeRecord(
+            config, results, backend="fake" if settings["fake"] else "traci", subscribe=settings["subscribe"],
+            strategy="free", reservationStrategy="reservation", batch=False, auction=None))
+    return results
+
+
+def parseList(value, convert=int):
+    return [convert(item) for item in value.split(",") if item.strip()]
+
+
+def get_options():
+    optParser = optparse.OptionParser()
+    optParser.add_option("--populations", default="1,5,10,50,100",
+                         help="values of RANDOM_POPULATION, default: %default")
+    optParser.add_option("--constant-free-parks", dest="constantFreeParks", default="-1",
+                         help="values of CONSTANT_FREE_PARKS, default: %default")
+    optParser.add_option("--initial-free-parks", dest="initialFreeParks", default="3",
+                         help="values of INITIAL_FREE_PARKS, default: %default")
+    optParser.add_option("--refresh-free-parks", dest="refreshFreeParks", default="3",
+                         help="values of REFRESH_FREE_PARKS, default: %default")
+    optParser.add_option("-j", "--jobs", type="int", default=os.cpu_count(),
+                         help="number of runs at the same time, default: %default")
+    optParser.add_option("--fake", action="store_true",
+                         default=False, help="run the in-process stand-in simulator instead of sumo")
+    optParser.add_option("--subscribe", action="store_true",
+                         default=False, help="read the vehicles' stops and stop state through TraCI subscriptions")
+    optParser.add_option("--output", help="write the table to this CSV file")
+    optParser.add_option("--results",
+                         help="append the record of every run to this file, JSON lines or CSV if it ends with .csv")
+    optParser.add_option("--scenarios",
+                         help="build the scenario of every run in a subdirectory of this directory instead of "
+                              "using the files in data")
+    optParser.add_option("--cache-dir", dest="cacheDir",
+                         help="with --scenarios, reuse the files generated with the same settings from this directory "
+                              "(default: the one of buildScenario.py)")
+    optParser.add_option("--no-cache", dest="noCache", action="store_true", default=False,
+                         help="with --scenarios, always write all the files")
+    optParser.add_option("--config", dest="config",
+                         help="JSON file with the settings that differ from data/constants.py")
+    optParser.add_option("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                         help="change a setting of every run, e.g. --set SLOTS_PER_ROW=12 (can be repeated)")
+    options, args = optParser.parse_args()
+    return optParser, options
+
+
+# Function to list every combination of the grid
+def buildGrid(options, baseConfig):
+    grid = []
+    for population, constantFreeParks, initialFreeParks, refreshFreeParks in itertools.product(
+            parseList(options.populations), parseList(options.constantFreeParks),
+            parseList(options.initialFreeParks), parseList(options.refreshFreeParks)):
+        grid.append({
+            "config": baseConfig.replace(randomPopulation=population, constantFreeParks=constantFreeParks,
+                                         initialFreeParks=initialFreeParks, refreshFreeParks=refreshFreeParks),
+            "fake": options.fake,
+            "subscribe": options.subscribe,
+            "scenarios": options.scenarios,
+            "results": options.results and os.path.abspath(options.results),
+            "cacheDir": options.cacheDir,
+            "label": "sweep%s" % len(grid),
+        })
+    return grid
+
+
+def printTable(rows):
+    widths = [max(len(column), max(len(str(row[column])) for row in rows)) for column in COLUMNS]
+    print("  ".join(column.rjust(width) for column, width in zip(COLUMNS, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).rjust(width) for column, width in zip(COLUMNS, widths)))
+
+
+if __name__ == "__main__":
+    optParser, options = get_options()
+    sys.path.insert(0, ROOT)
+    from data.config import Config
+    if options.scenarios is not None:
+        options.scenarios = os.path.abspath(options.scenarios)
+        if options.noCache:
+            options.cacheDir = None
+        elif options.cacheDir is None:
+            from data import buildScenario
+            options.cacheDir = buildScenario.CACHE_DIR
+    try:
+        grid = buildGrid(options, Config.load(options.config, options.settings))
+    except (OSError, TypeError, ValueError) as e:
+        sys.exit("Invalid configuration: %s" % e)
+    for settings in grid:
+        if options.scenarios is not None:
+            continue
+        for fileName in (settings["config"].sumoConfigFile, settings["config"].demandFile):
+            if not os.path.exists(os.path.join(ROOT, "data", fileName)):
+                optParser.error("missing data/%s" % fileName)
+    if not options.fake:
+        import runner
+        if runner.traci is None:
+            sys.exit("Please set environment variable 'SUMO_HOME'")
+
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max(1, min(options.jobs, len(grid)))) as pool:
+        rows = list(pool.map(runScenario, grid))
+    printTable(rows)
+    print("%s runs in %.1f s" % (len(rows), time.perf_counter() - start))
+
+    if options.output:
+        with open(options.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    timeSeries.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Per-step time series of the parking areas: occupancy, reservations,
+threshold of free parks, free parks asked after a bad behaviour and vehicles
+that found the area full since the previous sample (waiting).
+
+Samples are written in preallocated NumPy arrays of chunkSteps rows. With a
+directory, every full chunk is saved there as a .npz file and the arrays are
+reused; without one, the arrays are a ring buffer keeping the last chunkSteps
+samples. Either way the memory does not grow with the length of the run.
+loadTimeSeries reads the chunks of a directory back into whole arrays.
+Requires NumPy.
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import glob
+
+import numpy as np
+
+SERIES = ("occupancy", "reservations", "threshold", "freeParks", "waiting")
+
+
+class TimeSeriesRecorder(object):
+
+    # areas: parking areas, in the order of the columns
+    # directory: where the chunks are saved, None to keep only the last chunkSteps samples
+    # every: one sample every this number of steps
+    def __init__(self, areas, directory=None, every=1, chunkSteps=1024):
+        self.areas = list(areas)
+        self.position = dict((parkArea, column) for column, parkArea in enumerate(self.areas))
+        self.directory = directory
+        self.every = every
+        self.chunkSteps = chunkSteps
+        self.times = np.zeros(chunkSteps, dtype=np.float64)
+        self.values = dict((name, np.zeros((chunkSteps, len(self.areas)), dtype=np.int32)) for name in SERIES)
+        self.waiting = np.zeros(len(self.areas), dtype=np.int32)  # Vehicles that found the area full since the last sample
+        self.steps = 0
+        self.row = 0  # Next row to write
+        self.wrapped = False  # The ring buffer has overwritten its oldest samples
+        self.chunks = 0  # Chunks saved in directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "areas.json"), "w") as f:
+                json.dump({"areas": self.areas, "every": every, "series": SERIES}, f)
+
+    def addWaiting(self, parkArea):
+        column = self.position.get(parkArea)
+        if column is not None:
+            self.waiting[column] += 1
+
+    # Function called at the end of every step, index is the ParkingIndex of the run
+    def sample(self, time, index):
+        self.steps += 1
+        if (self.steps - 1) % self.every:
+            return
+        if index.occupancyStale:
+            index.refreshOccupancy()
+        row = self.row
+        self.times[row] = time
+        # ParkingIndex keeps its areas in the same order
+        self.values["occupancy"][row] = np.frombuffer(index.occupancy, dtype=np.intc)
+        self.values["threshold"][row] = np.frombuffer(index.threshold, dtype=np.intc)
+        for name, counts in (("reservations", index.reservations), ("freeParks", index.freeParks)):
+            values = self.values[name][row]
+            values[:] = 0
+            for parkArea, count in counts.items():
+                column = self.position.get(parkArea)
+                if column is not None:
+                    values[column] = count
+        self.values["waiting"][row] = self.waiting
+        self.waiting[:] = 0
+
+        self.row += 1
+        if self.row == self.chunkSteps:
+            if self.directory is not None:
+                self.flush()
+            else:
+                self.row = 0
+                self.wrapped = True
+
+    # Function to save the samples not saved yet as a new chunk
+    def flush(self):
+        if self.directory is None or self.row == 0:
+            return
+        fileName = os.path.join(self.directory, "chunk%06i.npz" % self.chunks)
+        temporary = fileName + ".tmp.npz"
+        np.savez(temporary, time=self.times[:self.row],
+                 **dict((name, values[:self.row]) for name, values in self.values.items()))
+        os.replace(temporary, fileName)
+        self.chunks += 1
+        self.row = 0
+
+    def close(self):
+        self.flush()
+
+    # Function called on a recorder restored from a checkpoint: the chunks saved after it are dropped
+    def resume(self):
+        if self.directory is None:
+            return
+        for fileName in glob.glob(os.path.join(self.directory, "chunk[0-9]*.npz")):
+            number = os.path.basename(fileName)[len("chunk"):].split(".")[0]
+            if number.isdigit() and int(number) >= self.chunks:
+                os.remove(fileName)
+
+    # Function to get the samples in memory from the oldest one: name -> array (steps, areas)
+    def series(self):
+        if self.wrapped:
+            order = np.r_[self.row:self.chunkSteps, 0:self.row]
+        else:
+            order = np.arange(self.row)
+        result = {"areas": list(self.areas), "time": self.times[order]}
+        for name, values in self.values.items():
+            result[name] = values[order]
+        return result
+
+
+# Function to read the time series saved by a TimeSeriesRecorder: "areas", "time" and one array
+# (steps, areas) for each series
+def loadTimeSeries(directory):
+    with open(os.path.join(directory, "areas.json")) as f:
+        meta = json.load(f)
+    chunks = []
+    for fileName in sorted(glob.glob(os.path.join(directory, "chunk[0-9]*.npz"))):
+        if fileName.endswith(".tmp.npz"):
+            continue
+        with np.load(fileName) as chunk:
+            chunks.append(dict((name, chunk[name]) for name in chunk.files))
+    result = {"areas": meta["areas"]}
+    for name in ("time",) + tuple(meta["series"]):
+        if chunks:
+            result[name] = np.concatenate([chunk[name] for chunk in chunks])
+        elif name == "time":
+            result[name] = np.zeros(0, dtype=np.float64)
+        else:
+            result[name] = np.zeros((0, len(meta["areas"])), dtype=np.int32)
+    return result
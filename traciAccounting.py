@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    traciAccounting.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Counts the TraCI calls of the coordinator.
+
+AccountedTraci is given to runner.useBackend in place of the traci module or
+of a fakeTraci.FakeTraci and forwards every call to it. For each command
+(e.g. "vehicle.getStops") it counts the calls, the calls made by each
+function (e.g. "runner.run", "allocation.allocate") and keeps a
+histogram of the latencies in power of two buckets of microseconds. At every
+simulation step the calls of the previous step are divided by the vehicles
+of that step (the length of vehicle.getIDList), which gives the calls per
+vehicle per step.
+"""
+
+from __future__ import absolute_import
+
+import os
+import sys
+import time
+from array import array
+
+DOMAINS = ("vehicle", "parkingarea", "simulation")
+# Modules that only forward the calls of the coordinator, the caller is the function that called them
+ADAPTERS = ("traciAccounting", "vehicleSnapshot", "libsumoBackend")
+# Upper bounds of the latency buckets in microseconds, the last bucket has no bound
+BUCKETS = [2 ** exponent for exponent in range(21)]
+
+
+class AccountedTraci(object):
+
+    def __init__(self, backend, clock=time.perf_counter):
+        self.backend = backend
+        self.clock = clock
+        self.calls = {}  # command -> number of calls
+        self.seconds = {}  # command -> total latency
+        self.histograms = {}  # command -> calls in each bucket of BUCKETS
+        self.callers = {}  # (command, caller) -> number of calls
+        self.callerNames = {}  # code object -> ("module", "module.function")
+        self.stepCalls = 0
+        self.stepVehicles = 0
+        self.callsPerVehicle = array("d")  # One value for each step with vehicles
+        for name in DOMAINS:
+            setattr(self, name, AccountedDomain(self, name, getattr(backend, name)))
+        self.countedStep = self.wrap("simulationStep", backend.simulationStep)
+
+    # Anything else (start, close, constants, ...) is the one of the backend
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def simulationStep(self, step=0.):
+        if self.stepVehicles:
+            self.callsPerVehicle.append(self.stepCalls / self.stepVehicles)
+        self.stepCalls = 0
+        self.stepVehicles = 0
+        return self.countedStep(step)
+
+    # Function to count every call of function as command
+    def wrap(self, command, function):
+        self.calls[command] = 0
+        self.seconds[command] = 0.
+        histogram = self.histograms[command] = [0] * (len(BUCKETS) + 1)
+        vehicleList = command == "vehicle.getIDList"
+
+        def counted(*args, **kwargs):
+            start = self.clock()
+            result = function(*args, **kwargs)
+            elapsed = self.clock() - start
+            self.calls[command] += 1
+            self.seconds[command] += elapsed
+            histogram[bucket(elapsed)] += 1
+            self.stepCalls += 1
+            if vehicleList:
+                self.stepVehicles = len(result)
+            key = (command, self.caller(sys._getframe(1)))
+            self.callers[key] = self.callers.get(key, 0) + 1
+            return result
+        return counted
+
+    # Function to get the name of the first function of frame and its callers that is not in ADAPTERS
+    def caller(self, frame):
+        while True:
+            names = self.callerNames.get(frame.f_code)
+            if names is None:
+                module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+                names = self.callerNames[frame.f_code] = (module, "%s.%s" % (module, frame.f_code.co_name))
+            if names[0] not in ADAPTERS or frame.f_back is None:
+                return names[1]
+            frame = frame.f_back
+
+    # Function to get the accounting as JSON values
+    def asDict(self):
+        commands = {}
+        for command, calls in self.calls.items():
+            if not calls:
+                continue
+            commands[command] = {
+                "calls": calls,
+                "seconds": round(self.seconds[command], 6),
+                "p50Us": percentileBound(self.histograms[command], 0.5),
+                "p99Us": percentileBound(self.histograms[command], 0.99),
+                "histogram": self.histograms[command],
+                "callers": dict((caller, count) for (name, caller), count in self.callers.items()
+                                if name == command),
+            }
+        perVehicle = sorted(self.callsPerVehicle)
+        return {
+            "buckets": BUCKETS,
+            "commands": commands,
+            "calls": sum(self.calls.values()),
+            "callsPerVehicleMean": round(sum(perVehicle) / len(perVehicle), 3) if perVehicle else None,
+            "callsPerVehicleP50": perVehicle[int(round(0.5 * (len(perVehicle) - 1)))] if perVehicle else None,
+            "callsPerVehicleP99": perVehicle[int(round(0.99 * (len(perVehicle) - 1)))] if perVehicle else None,
+            "callsPerVehicleMax": perVehicle[-1] if perVehicle else None,
+        }
+
+    def summary(self):
+        values = self.asDict()
+        lines = ["%-40s %10s %10s %10s %10s" % ("command / caller", "calls", "seconds", "p50 us<=", "p99 us<=")]
+        for command, counts in sorted(values["commands"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append("%-40s %10i %10.3f %10s %10s" % (command, counts["calls"], counts["seconds"],
+                                                          counts["p50Us"], counts["p99Us"]))
+            for caller, calls in sorted(counts["callers"].items(), key=lambda item: -item[1]):
+                lines.append("  %-38s %10i" % (caller, calls))
+        lines.append("%s calls, calls per vehicle per step: mean %s, p50 %s, p99 %s, max %s" % (
+            values["calls"], values["callsPerVehicleMean"], formatRatio(values["callsPerVehicleP50"]),
+            formatRatio(values["callsPerVehicleP99"]), formatRatio(values["callsPerVehicleMax"])))
+        return "\n".join(lines)
+
+
+class AccountedDomain(object):
+
+    def __init__(self, accounting, name, domain):
+        self._accounting = accounting
+        self._name = name
+        self._domain = domain
+
+    # The methods are wrapped the first time they are used
+    def __getattr__(self, name):
+        attribute = getattr(self._domain, name)
+        if callable(attribute):
+            attribute = self._accounting.wrap("%s.%s" % (self._name, name), attribute)
+            setattr(self, name, attribute)
+        return attribute
+
+
+def bucket(seconds):
+    microseconds = int(seconds * 1e6)
+    return min(microseconds.bit_length(), len(BUCKETS))
+
+
+# Function to get the upper bound of the bucket where the fraction of the calls is reached
+def percentileBound(histogram, fraction):
+    target = fraction * sum(histogram)
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if count and seen >= target:
+            return BUCKETS[index] if index < len(BUCKETS) else None
+    return None
+
+
+def formatRatio(value):
+    return None if value is None else "%.2f" % value
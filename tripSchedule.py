@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    tripSchedule.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Compiled stop schedule of the trips in a route file.
+
+The route file is read once: vehicle ids are mapped to their position in the
+file and the <stop parkingArea=... duration=...> elements of every trip are
+stored in flat arrays (park areas interned as small ints) with per-vehicle
+offsets, so runner.py never walks the XML tree while simulating.
+"""
+
+from __future__ import absolute_import
+
+from array import array
+from lxml import etree
+
+
+class TripSchedule(object):
+
+    def __init__(self):
+        self.ids = []  # position in the route file -> vehicle id
+        self.index = {}  # vehicle id -> position in the route file
+        self.parkAreaNames = []  # interned park area -> name
+        self.parkAreaIndex = {}  # name -> interned park area
+        self.stopParkAreas = array("i")  # interned park area of every stop
+        self.stopDurations = array("i")  # duration of every stop
+        self.stopOffsets = array("i", [0])  # first stop of every vehicle, plus the end of the last one
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Function to compile the stops of every trip in a route file
+    @classmethod
+    def load(cls, routeFile):
+        schedule = cls()
+        for event, trip in etree.iterparse(routeFile, tag=("trip", "vehicle")):
+            schedule.addTrip(trip.attrib.get("id"),
+                             [(stop.attrib.get("parkingArea"), int(stop.attrib.get("duration")))
+                              for stop in trip.iterchildren("stop")])
+            trip.clear()
+        return schedule
+
+    def addTrip(self, idVehicle, stops):
+        self.index[idVehicle] = len(self.ids)
+        self.ids.append(idVehicle)
+        for parkArea, duration in stops:
+            self.stopParkAreas.append(self.intern(parkArea))
+            self.stopDurations.append(duration)
+        self.stopOffsets.append(len(self.stopParkAreas))
+
+    def intern(self, parkArea):
+        pos = self.parkAreaIndex.get(parkArea)
+        if pos is None:
+            pos = len(self.parkAreaNames)
+            self.parkAreaIndex[parkArea] = pos
+            self.parkAreaNames.append(parkArea)
+        return pos
+
+    def stopCount(self, posVehicle):
+        return self.stopOffsets[posVehicle + 1] - self.stopOffsets[posVehicle]
+
+    def _stop(self, posVehicle, stopPos):
+        if stopPos < 0 or stopPos >= self.stopCount(posVehicle):
+            return -1
+        return self.stopOffsets[posVehicle] + stopPos
+
+    # Function to get the park area of a stop, None if the vehicle does not have that stop
+    def parkArea(self, posVehicle, stopPos):
+        stop = self._stop(posVehicle, stopPos)
+        if stop < 0:
+            return None
+        return self.parkAreaNames[self.stopParkAreas[stop]]
+
+    def duration(self, posVehicle, stopPos):
+        stop = self._stop(posVehicle, stopPos)
+        if stop < 0:
+            return None
+        return self.stopDurations[stop]
+
+    # Function to save the new park area of a stop after a reroute
+    def setParkArea(self, posVehicle, stopPos, parkArea):
+        stop = self._stop(posVehicle, stopPos)
+        if stop < 0:
+            raise IndexError("Vehicle %s does not have stop %s" % (self.ids[posVehicle], stopPos))
+        self.stopParkAreas[stop] = self.intern(parkArea)
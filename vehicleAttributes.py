@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    vehicleAttributes.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Reputation and wallet of the vehicles, kept in Python.
+
+The values are read once from the <param> elements of the route file and
+updated as native ints and bools. SUMO only sees them when they are flushed,
+which runner.py does before a vehicle leaves the scenario.
+"""
+
+from __future__ import absolute_import
+
+from lxml import etree
+
+# Parameter -> (function converting the value written in the route file, value used when it is missing)
+PARAMETERS = {
+    "reviewStars": (int, "0"),
+    "wallet": (int, "0"),
+    "warning": (int, "0"),
+    "civil": (int, "0"),
+    "delay": (int, "0"),
+    "goodBehaviour": (lambda value: value != "False", "True"),
+}
+
+
+class Attributes(object):
+    __slots__ = tuple(PARAMETERS) + ("dirty",)
+
+    def __init__(self, params):
+        for key, (convert, default) in PARAMETERS.items():
+            setattr(self, key, convert(params.get(key, default)))
+        self.dirty = set()  # Parameters changed since the last flush
+
+    # Function to change a parameter, SUMO is updated by the next flush
+    def set(self, key, value):
+        setattr(self, key, value)
+        self.dirty.add(key)
+
+    def __repr__(self):
+        return "Attributes(%s)" % ", ".join("%s=%r" % (key, getattr(self, key)) for key in PARAMETERS)
+
+
+class AttributeCache(object):
+
+    def __init__(self):
+        self.index = {}  # vehicle id -> position in the route file
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    # Function to read the parameters of every trip in a route file
+    @classmethod
+    def load(cls, routeFile):
+        cache = cls()
+        for event, trip in etree.iterparse(routeFile, tag=("trip", "vehicle")):
+            cache.add(trip.attrib.get("id"),
+                      dict((param.attrib.get("key"), param.attrib.get("value"))
+                           for param in trip.iterchildren("param")))
+            trip.clear()
+        return cache
+
+    def add(self, idVehicle, params):
+        self.index[idVehicle] = len(self.records)
+        self.records.append(Attributes(params))
+
+    def get(self, idVehicle):
+        return self.records[self.index[idVehicle]]
+
+    # Function to write the changed parameters of a vehicle to SUMO
+    def flush(self, backend, idVehicle):
+        record = self.get(idVehicle)
+        for key in record.dirty:
+            backend.vehicle.setParameter(idVehicle, key, getattr(record, key))
+        record.dirty.clear()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    vehicleSnapshot.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Per-step view of the vehicle and parking area values read by the coordinator.
+
+VehicleSnapshot asks TraCI every time a value is needed.
+SubscribedVehicleSnapshot subscribes every vehicle on departure to its stops
+and its stop state, and every parking area to its occupancy, and reads all of
+them in one batch after each simulation step, so the step loop does not pay a
+round-trip per value.
+Reputation and wallet are not read from SUMO, see vehicleAttributes.py.
+"""
+
+from __future__ import absolute_import
+
+STOP_PARKING = 2  # Parking bit of the stop state
+
+
+class VehicleSnapshot(object):
+
+    def __init__(self, backend):
+        self.traci = backend
+
+    # Function called after every simulation step
+    def update(self):
+        pass
+
+    # Function called for the vehicles already running when a saved state is loaded
+    def subscribe(self, idVehicleList):
+        pass
+
+    def getStops(self, idVehicle):
+        return self.traci.vehicle.getStops(idVehicle, 0)
+
+    def isStoppedParking(self, idVehicle):
+        return self.traci.vehicle.isStoppedParking(idVehicle)
+
+    def replaceStop(self, idVehicle, stopPos, parkArea, duration):
+        self.traci.vehicle.replaceStop(idVehicle, stopPos, parkArea, flags=65, duration=duration,
+                                       startPos=0.0)
+
+    def getVehicleCount(self, parkArea):
+        return self.traci.parkingarea.getVehicleCount(parkArea)
+
+
+class SubscribedVehicleSnapshot(VehicleSnapshot):
+
+    def __init__(self, backend):
+        VehicleSnapshot.__init__(self, backend)
+        tc = backend.constants
+        self.varStops = tc.VAR_NEXT_STOPS2
+        self.varStopState = tc.VAR_STOPSTATE
+        self.varVehicleCount = tc.VAR_STOP_STARTING_VEHICLES_NUMBER
+        self.results = {}
+        self.staleStops = set()  # Vehicles whose stops changed during this step
+        for parkArea in backend.parkingarea.getIDList():
+            backend.parkingarea.subscribe(parkArea, [self.varVehicleCount])
+        self.areaResults = backend.parkingarea.getAllSubscriptionResults()
+
+    def update(self):
+        self.subscribe(self.traci.simulation.getDepartedIDList())
+        self.results = self.traci.vehicle.getAllSubscriptionResults()
+        self.areaResults = self.traci.parkingarea.getAllSubscriptionResults()
+        self.staleStops.clear()
+
+    def subscribe(self, idVehicleList):
+        vehicleDomain = self.traci.vehicle
+        for idVehicle in idVehicleList:
+            vehicleDomain.subscribe(idVehicle, [self.varStops, self.varStopState],
+                                    parameters={self.varStops: ("i", 0)})
+
+    def getStops(self, idVehicle):
+        result = self.results.get(idVehicle)
+        # libsumo cannot subscribe the stops (see libsumoBackend.py)
+        if result is None or idVehicle in self.staleStops or self.varStops not in result:
+            return VehicleSnapshot.getStops(self, idVehicle)
+        return result[self.varStops]
+
+    def isStoppedParking(self, idVehicle):
+        result = self.results.get(idVehicle)
+        if result is None:
+            return VehicleSnapshot.isStoppedParking(self, idVehicle)
+        return (result[self.varStopState] & STOP_PARKING) == STOP_PARKING
+
+    def replaceStop(self, idVehicle, stopPos, parkArea, duration):
+        VehicleSnapshot.replaceStop(self, idVehicle, stopPos, parkArea, duration)
+        self.staleStops.add(idVehicle)
+
+    def getVehicleCount(self, parkArea):
+        result = self.areaResults.get(parkArea)
+        if result is None:
+            return VehicleSnapshot.getVehicleCount(self, parkArea)
+        return result[self.varVehicleCount]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.dev/sumo
+# Copyright (C) 2011-2024 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials are made available under the
+# terms of the Eclipse Public License 2.0 which is available at
+# https://www.eclipse.org/legal/epl-2.0/
+# This Source Code may also be made available under the following Secondary
+# Licenses when the conditions for such availability set forth in the Eclipse
+# Public License 2.0 are satisfied: GNU General Public License, version 2
+# or later which is available at
+# https://www.gnu.org/licenses/old-licenses/gpl-2.0-standalone.html
+# SPDX-License-Identifier: EPL-2.0 OR GPL-2.0-or-later
+
+# @file    vehicleState.py
+# @author  Roberto Wang
+# @date    2024
+
+"""
+Per-vehicle coordinator state used by runner.py.
+
+Every vehicle gets a dense integer index the first time it is seen and a
+VehicleState record holding its flags and counters, so that membership checks
+and updates in the step loop cost O(1).
+"""
+
+from __future__ import absolute_import
+
+
+class VehicleState(object):
+    __slots__ = ("id", "index", "stopPos", "lastPark", "parkEnd", "reserved", "paid", "waiting",
+                 "changedRoute", "doNotPark")
+
+    def __init__(self, idVehicle, index):
+        self.id = idVehicle
+        self.index = index
+        self.stopPos = 0  # Which stop the vehicle reached
+        self.lastPark = None  # Last park of the vehicle
+        self.parkEnd = None  # Time step the vehicle must end its park
+        self.reserved = False  # The vehicle has a reservation
+        self.paid = False  # The vehicle paid the park
+        self.waiting = False  # The vehicle doesn't park
+        self.changedRoute = False  # The vehicle changed at least one time the route
+        self.doNotPark = False  # The vehicle did not park during sleep time
+
+    def __repr__(self):
+        return "VehicleState(%s)" % ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.__slots__)
+
+
+class VehicleTable(object):
+
+    # ids: vehicles known in advance, they get the indexes 0..len(ids) - 1 in that order
+    def __init__(self, ids=()):
+        self.index = {}  # id -> dense index
+        self.states = []  # dense index -> VehicleState
+        self.reservedCount = 0
+        self.changedRouteCount = 0
+        self.doNotParkCount = 0
+        for idVehicle in ids:
+            self.get(idVehicle)
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, idVehicle):
+        return idVehicle in self.index
+
+    def __iter__(self):
+        return iter(self.states)
+
+    # Function to get the state of a vehicle, it is created the first time the vehicle is seen
+    def get(self, idVehicle):
+        pos = self.index.get(idVehicle)
+        if pos is None:
+            pos = len(self.states)
+            self.index[idVehicle] = pos
+            self.states.append(VehicleState(idVehicle, pos))
+        return self.states[pos]
+
+    def reserve(self, state):
+        if not state.reserved:
+            state.reserved = True
+            self.reservedCount += 1
+
+    def release(self, state):
+        if state.reserved:
+            state.reserved = False
+            self.reservedCount -= 1
+
+    def markChangedRoute(self, state):
+        if not state.changedRoute:
+            state.changedRoute = True
+            self.changedRouteCount += 1
+
+    def markDoNotPark(self, state):
+        if not state.doNotPark:
+            state.doNotPark = True
+            self.doNotParkCount += 1